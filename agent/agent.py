@@ -1,4 +1,5 @@
 import os
+import re
 import sys
 import time
 import logging
@@ -25,7 +26,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import des messages proto
 from protos import osiris_pb2
 from protos import osiris_pb2_grpc
+from protos.result_codec import ResultEncoder
 from agent.oql.runner import OQLRunner
+from agent.spool import Spool
+from agent.oql.sources.linux_network_events import LinuxNetworkEventsSource
+from agent.collectors.linux.connection_tracker import DEFAULT_INTERVAL
+from agent.oql.sources.linux_process_events import LinuxProcessEventsSource
+from agent.collectors.linux.process_monitor import DEFAULT_EVENTS, DEFAULT_POLL_INTERVAL
 
 def setup_logging(config):
     """Configure le logging selon les paramètres du fichier de configuration."""
@@ -49,9 +56,69 @@ class Agent:
         self.agent_id = str(uuid.uuid4())
         self.hostname = socket.gethostname()
         self.os_info = f"{platform.system()} {platform.release()}"
+        # Critères de ciblage des requêtes de flotte (TargetSelector du Hive)
+        self.os_type = platform.system().lower()
+        self.version = str(config.get('agent', {}).get('version') or '')
+        self.labels = {str(key): str(value) for key, value in (config.get('agent', {}).get('labels') or {}).items()}
         self._load_certificates()
         self._setup_grpc_channel()
-        self.oql_runner = OQLRunner()
+        self.oql_runner = self._create_oql_runner()
+        self._setup_spool()
+        self._setup_result_encoder()
+        self._start_network_tracking()
+        self._start_process_events()
+
+    def _create_oql_runner(self):
+        """Crée le runner OQL ; les positions de lecture des logs survivent aux redémarrages."""
+        tailing = self.config.get('log_tailing', {})
+        initial_bytes = tailing.get('initial_bytes')
+        return OQLRunner(
+            state_directory=tailing.get('state_directory'),
+            initial_bytes=int(initial_bytes) if initial_bytes is not None else None
+        )
+
+    def _setup_spool(self):
+        """Ouvre le spool disque des résultats en attente d'envoi."""
+        spool_config = self.config.get('spool', {})
+        self.spool_batch_size = int(spool_config.get('batch_size', 500))
+        self.spool = Spool(
+            spool_config.get('directory', 'agent/spool'),
+            segment_size=int(spool_config.get('segment_size_mb', 16)) * 1024 * 1024,
+            max_size=int(spool_config.get('max_size_mb', 512)) * 1024 * 1024,
+            fsync=bool(spool_config.get('fsync', False))
+        )
+
+    def _setup_result_encoder(self):
+        """Configure l'encodage des résultats en lots de colonnes compressés."""
+        results_config = self.config.get('results', {})
+        self.result_batch_rows = int(results_config.get('batch_rows', 1000))
+        self.result_encoder = ResultEncoder(
+            compression=results_config.get('compression', 'zstd'),
+            level=int(results_config.get('compression_level', 3))
+        )
+
+    def _start_network_tracking(self):
+        """Démarre le suivi continu des connexions réseau s'il est activé (Linux)."""
+        tracking = self.config.get('network_tracking', {})
+        if not tracking.get('enabled') or platform.system() != 'Linux':
+            return
+        try:
+            LinuxNetworkEventsSource.start_tracker(float(tracking.get('interval', DEFAULT_INTERVAL)))
+        except Exception as e:
+            logging.error(f"Erreur lors du démarrage du suivi des connexions: {e}")
+
+    def _start_process_events(self):
+        """Démarre le suivi des créations et fins de processus s'il est activé (Linux)."""
+        process_events = self.config.get('process_events', {})
+        if not process_events.get('enabled') or platform.system() != 'Linux':
+            return
+        try:
+            LinuxProcessEventsSource.start_monitor(
+                events=process_events.get('events', DEFAULT_EVENTS),
+                poll_interval=float(process_events.get('poll_interval', DEFAULT_POLL_INTERVAL))
+            )
+        except Exception as e:
+            logging.error(f"Erreur lors du démarrage du suivi des processus: {e}")
 
     def _load_certificates(self):
         """Charge les certificats mTLS."""
@@ -90,7 +157,7 @@ class Agent:
                 certificate_chain=self.agent_cert.public_bytes(serialization.Encoding.PEM)
             )
             
-            # Créer le canal gRPC
+            # Créer le canal gRPC (les lots de résultats sont déjà compressés par l'agent)
             self.channel = grpc.secure_channel(
                 f"{self.config['hive']['host']}:{self.config['hive']['port']}",
                 credentials
@@ -109,10 +176,15 @@ class Agent:
             request = osiris_pb2.RegistrationRequest(
                 agent_id=self.agent_id,
                 hostname=self.hostname,
-                os_info=self.os_info
+                os_info=self.os_info,
+                os_type=self.os_type,
+                version=self.version,
+                labels=self.labels
             )
             response = self.stub.Register(request)
             logging.info(f"Enregistrement réussi auprès du Hive. Status: {response.status}")
+            # zstd seulement si le Hive sait le décoder
+            self.result_encoder.negotiate(response.compressions)
             return True
         except grpc.RpcError as e:
             logging.error(f"Erreur lors de l'enregistrement: {str(e)}")
@@ -123,35 +195,93 @@ class Agent:
         try:
             if instruction.HasField('query'):
                 logging.info(f"Exécution de la requête: {instruction.query}")
-                results = self.oql_runner.execute_query(instruction.query)
-                
-                # Envoyer les résultats au Hive
-                for result in results:
-                    query_result = osiris_pb2.QueryResult(
-                        query_id=instruction.query_id,
-                        result=result,
-                        summary=osiris_pb2.QuerySummary(
-                            query_id=instruction.query_id,
-                            status="completed"
-                        )
-                    )
-                    self.stub.SendQueryResults(query_result)
+                status = "completed"
+                try:
+                    self._spool_query_results(instruction.query_id, instruction.query)
+                except Exception as e:
+                    logging.error(f"Erreur lors de l'exécution de la requête: {e}")
+                    status = "failed"
                 
-                # Envoyer le résumé final
+                # Résumé final, seul message sans lignes : il termine la tâche côté Hive
                 final_result = osiris_pb2.QueryResult(
                     query_id=instruction.query_id,
                     summary=osiris_pb2.QuerySummary(
                         query_id=instruction.query_id,
-                        status="completed"
+                        status=status
                     )
                 )
-                self.stub.SendQueryResults(final_result)
+                self.spool.append(final_result.SerializeToString())
+                
+                self.flush_spool()
             
             return osiris_pb2.HeartbeatResponse(status="ok")
+        except grpc.RpcError:
+            raise
         except Exception as e:
             logging.error(f"Erreur lors du traitement du heartbeat: {e}")
             return osiris_pb2.HeartbeatResponse(status="error")
 
+    def _spool_query_results(self, query_id, query):
+        """
+        Exécute la requête et place ses résultats dans le spool, regroupés en lots de
+        colonnes typées et compressées : ils ne sont pas perdus si le Hive devient indisponible.
+        """
+        results = self.oql_runner.execute_query(query)
+        match = re.search(r"FROM\s+(\w+)", query, re.IGNORECASE)
+        source = match.group(1) if match else ''
+        batch, rows = [], []
+        try:
+            for result in results:
+                rows.append(result)
+                if len(rows) >= self.result_batch_rows:
+                    batch.append(self._encode_results(query_id, rows, source))
+                    rows = []
+                if len(batch) >= self.spool_batch_size:
+                    self.spool.append_many(batch)
+                    batch = []
+        finally:
+            # Les lignes déjà produites sont transmises même si la requête échoue
+            if rows:
+                batch.append(self._encode_results(query_id, rows, source))
+            if batch:
+                self.spool.append_many(batch)
+
+    def _encode_results(self, query_id, rows, source):
+        """Message QueryResult sérialisé portant un lot de lignes encodé."""
+        query_result = osiris_pb2.QueryResult(
+            query_id=query_id,
+            batch=self.result_encoder.encode(rows, source)
+        )
+        return query_result.SerializeToString()
+
+    def flush_spool(self) -> int:
+        """
+        Envoie les résultats en attente dans le spool, par lots, du plus ancien au
+        plus récent. Le curseur n'avance que sur les résultats acceptés par le Hive ;
+        un refus ou une erreur gRPC interrompt l'envoi, repris à la prochaine collecte.
+        """
+        sent = 0
+        while True:
+            batch = self.spool.read(max_records=self.spool_batch_size)
+            if not batch:
+                return sent
+            position, count = None, 0
+            try:
+                for position_after, payload in batch:
+                    query_result = osiris_pb2.QueryResult.FromString(payload)
+                    if query_result.HasField('batch'):
+                        # Lot encodé avant l'annonce des compressions du Hive
+                        query_result.batch.CopyFrom(self.result_encoder.recode(query_result.batch))
+                    response = self.stub.SendQueryResults(query_result)
+                    if response.status != "ok":
+                        logging.warning(f"Résultats refusés par le Hive (status: {response.status}), nouvel envoi ultérieur.")
+                        return sent + count
+                    position, count = position_after, count + 1
+            finally:
+                if position is not None:
+                    self.spool.commit(position, count)
+                    sent += count
+
     def run(self):
         """Boucle principale de l'agent."""
         while True:
@@ -161,10 +291,19 @@ class Agent:
                     time.sleep(5)
                     continue
 
+                # Envoi des résultats produits pendant l'indisponibilité du Hive
+                self.flush_spool()
+
                 # Boucle de heartbeat
                 while True:
                     try:
-                        response = self.stub.Heartbeat(osiris_pb2.HeartbeatRequest(agent_id=self.agent_id))
+                        response = self.stub.Heartbeat(osiris_pb2.HeartbeatRequest(
+                            agent_id=self.agent_id,
+                            hostname=self.hostname,
+                            os_type=self.os_type,
+                            version=self.version,
+                            labels=self.labels
+                        ))
                         if response.HasField('instruction'):
                             self.handle_heartbeat(response.instruction)
                     except grpc.RpcError as e:
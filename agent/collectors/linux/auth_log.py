@@ -1,140 +1,115 @@
-import subprocess
 import logging
-from typing import List, Dict, Any
+from collections import deque
 from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterator, Optional
+
+from collectors.linux.journal import journal_entry_to_event
+from collectors.linux.log_parser import LogParser
+from collectors.linux.log_tailer import LogTailer
 
 logger = logging.getLogger(__name__)
 
+# Nombre maximal d'événements lus mais pas encore retournés, par type
+MAX_PENDING_EVENTS = 100000
+
 class AuthLogCollector:
-    """Collecte les logs d'authentification Linux."""
+    """
+    Collecte les logs d'authentification Linux.
+    Chaque collecte ne lit que les lignes ajoutées depuis la précédente.
+    """
     
-    def __init__(self):
+    def __init__(self, state_file: Optional[str] = None, initial_bytes: Optional[int] = None):
         self.log_files = [
             '/var/log/auth.log',
             '/var/log/secure',
             '/var/log/messages'
         ]
+        # Positions de lecture conservées entre les collectes (persistées si state_file)
+        self.tailer = LogTailer(state_file=state_file, initial_bytes=initial_bytes)
+        self.parser = LogParser()
+        # Connexions lues par l'un des get_*_logins, en attente de l'autre
+        self._pending = {
+            'auth_failure': deque(maxlen=MAX_PENDING_EVENTS),
+            'auth_success': deque(maxlen=MAX_PENDING_EVENTS)
+        }
     
     def collect(self, hours_back: int = 24) -> List[Dict[str, Any]]:
-        """Collecte les logs d'authentification récents."""
-        results = []
-        
+        """Collecte les nouveaux événements d'authentification."""
+        return list(self.iter_events(hours_back))
+    
+    def iter_events(self, hours_back: int = 24) -> Iterator[Dict[str, Any]]:
+        """
+        Génère les nouveaux événements d'authentification. hours_back ne borne
+        que la première lecture du journal systemd.
+        """
         for log_file in self.log_files:
             try:
-                log_results = self._collect_auth_log(log_file, hours_back)
-                results.extend(log_results)
+                yield from self._collect_auth_log(log_file, hours_back)
             except Exception as e:
                 logger.error(f"Error collecting from {log_file}: {e}")
-        
-        return results
     
-    def _collect_auth_log(self, log_file: str, hours_back: int) -> List[Dict[str, Any]]:
-        """Collecte les logs d'un fichier spécifique."""
-        results = []
-        
-        try:
-            # Utiliser journalctl pour les logs système modernes
-            if log_file == '/var/log/messages':
-                cmd = [
-                    'journalctl', 
-                    '--since', f'{hours_back}h ago',
-                    '--no-pager',
-                    'SYSLOG_FACILITY=10'  # auth facility
-                ]
-            else:
-                # Pour les fichiers de log traditionnels
-                cmd = [
-                    'tail', 
-                    '-n', '1000', 
-                    log_file
-                ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                lines = result.stdout.splitlines()
-                
-                for line in lines:
-                    if self._is_auth_line(line):
-                        parsed = self._parse_auth_line(line)
-                        if parsed:
-                            results.append(parsed)
+    def _collect_auth_log(self, log_file: str, hours_back: int) -> Iterator[Dict[str, Any]]:
+        """Parse les nouvelles lignes d'un fichier spécifique."""
+        if log_file == '/var/log/messages':
+            # Journal systemd pour les systèmes modernes (entrées structurées)
+            yield from self._collect_journal(hours_back)
+            return
         
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Timeout collecting from {log_file}")
-        except Exception as e:
-            logger.error(f"Error running command for {log_file}: {e}")
-        
-        return results
+        # Pour les fichiers de log traditionnels : analyse ligne par ligne (le mode
+        # bloc n'est pas plus rapide et la position n'avance qu'au fil des lignes lues)
+        yield from self.tailer.follow(log_file, self.parser.parse_auth_line)
     
-    def _is_auth_line(self, line: str) -> bool:
-        """Détermine si une ligne contient des informations d'authentification."""
-        auth_keywords = [
-            'authentication failure',
-            'authentication success',
-            'login',
-            'logout',
-            'ssh',
-            'su:',
-            'sudo:',
-            'pam_',
-            'password'
-        ]
-        
-        line_lower = line.lower()
-        return any(keyword in line_lower for keyword in auth_keywords)
+    def _collect_journal(self, hours_back: int) -> Iterator[Dict[str, Any]]:
+        """Parse les nouvelles entrées auth/authpriv du journal systemd."""
+        entries = self.tailer.journal_entries(
+            'auth',
+            {'SYSLOG_FACILITY': [4, 10]},  # auth, authpriv facilities
+            since=datetime.now() - timedelta(hours=hours_back),
+            timeout=30
+        )
+        for entry in entries:
+            event = journal_entry_to_event(entry)
+            # Ligne au format syslog, pour les mêmes règles que les fichiers de log
+            local_time = datetime.fromtimestamp((event['realtime_usec'] or 0) / 1_000_000)
+            line = (f"{local_time:%b %d %H:%M:%S} {event['hostname']} "
+                    f"{event['service']}[{event['pid']}]: {event['message']}")
+            parsed = self.parser.parse_auth_line(line)
+            if parsed:
+                # Champs exacts du journal plutôt que ceux déduits du texte
+                parsed.update({
+                    'timestamp': event['timestamp'],
+                    'hostname': event['hostname'],
+                    'service': event['service'],
+                    'pid': event['pid'],
+                    'uid': event['uid'],
+                    'comm': event['comm'],
+                    'unit': event['unit']
+                })
+                yield parsed
     
-    def _parse_auth_line(self, line: str) -> Dict[str, Any]:
-        """Parse une ligne de log d'authentification."""
-        try:
-            # Parse basique - peut être amélioré selon le format exact
-            parts = line.split()
-            
-            if len(parts) < 4:
-                return None
-            
-            # Extraire la date et l'heure
-            date_str = ' '.join(parts[:3])
-            
-            # Identifier le type d'événement
-            event_type = 'unknown'
-            if 'authentication failure' in line.lower():
-                event_type = 'auth_failure'
-            elif 'authentication success' in line.lower():
-                event_type = 'auth_success'
-            elif 'login' in line.lower():
-                event_type = 'login'
-            elif 'logout' in line.lower():
-                event_type = 'logout'
-            elif 'ssh' in line.lower():
-                event_type = 'ssh'
-            
-            # Extraire l'utilisateur si possible
-            user = 'unknown'
-            for i, part in enumerate(parts):
-                if part in ['user', 'for', 'by'] and i + 1 < len(parts):
-                    user = parts[i + 1]
-                    break
-            
-            return {
-                'type': 'auth_log',
-                'event_type': event_type,
-                'timestamp': date_str,
-                'user': user,
-                'raw_line': line,
-                'source': 'auth_log'
-            }
-        
-        except Exception as e:
-            logger.error(f"Error parsing auth line: {e}")
-            return None
+    def _read_logins(self, hours: int):
+        """Lit les nouveaux événements et met de côté les connexions échouées et réussies."""
+        for log in self.iter_events(hours):
+            pending = self._pending.get(log.get('event_type'))
+            if pending is not None:
+                pending.append(log)
+    
+    def _take(self, event_type: str) -> List[Dict[str, Any]]:
+        logins = list(self._pending[event_type])
+        self._pending[event_type].clear()
+        return logins
+    
+    def get_logins(self, hours: int = 24) -> Dict[str, List[Dict[str, Any]]]:
+        """Nouvelles connexions échouées et réussies, lues en une seule fois."""
+        self._read_logins(hours)
+        return {'failed': self._take('auth_failure'), 'successful': self._take('auth_success')}
     
     def get_failed_logins(self, hours: int = 24) -> List[Dict[str, Any]]:
-        """Récupère les tentatives de connexion échouées."""
-        all_logs = self.collect(hours)
-        return [log for log in all_logs if log.get('event_type') == 'auth_failure']
+        """Récupère les nouvelles tentatives de connexion échouées (les réussies restent en attente)."""
+        self._read_logins(hours)
+        return self._take('auth_failure')
     
     def get_successful_logins(self, hours: int = 24) -> List[Dict[str, Any]]:
-        """Récupère les connexions réussies."""
-        all_logs = self.collect(hours)
-        return [log for log in all_logs if log.get('event_type') == 'auth_success'] 
\ No newline at end of file
+        """Récupère les nouvelles connexions réussies (les échouées restent en attente)."""
+        self._read_logins(hours)
+        return self._take('auth_success')
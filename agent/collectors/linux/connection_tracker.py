@@ -0,0 +1,199 @@
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
+
+from collectors.linux.socket_table import Socket, SocketTableReader
+
+logger = logging.getLogger(__name__)
+
+# Intervalle de relevé par défaut (secondes)
+DEFAULT_INTERVAL = 5.0
+
+# Nombre maximal d'événements en attente de collecte
+DEFAULT_MAX_EVENTS = 100000
+
+# Clé d'une connexion : (protocole, adresse locale, port local, adresse distante, port distant)
+ConnectionKey = Tuple[str, str, Optional[int], str, Optional[int]]
+
+
+def _isoformat(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat()
+
+
+class ConnectionTracker:
+    """
+    Suivi continu des connexions réseau.
+    Les tables de sockets sont relevées à intervalle régulier et comparées au
+    relevé précédent : seules les ouvertures et fermetures de connexions sont
+    émises, avec leurs dates de première et dernière observation. Une connexion
+    déjà fermée entre deux relevés est encore visible en TIME-WAIT et émise
+    comme fermeture sans ouverture observée.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, protocols: Optional[List[str]] = None,
+                 max_events: int = DEFAULT_MAX_EVENTS, reader: Optional[SocketTableReader] = None):
+        """
+        Args:
+            interval: Intervalle entre deux relevés (secondes)
+            protocols: Protocoles suivis (tcp et udp par défaut)
+            max_events: Nombre maximal d'événements en attente (les plus anciens sont perdus)
+            reader: Lecteur des tables de sockets
+        """
+        self.interval = interval
+        self.protocols = protocols or ['tcp', 'udp']
+        self.reader = reader or SocketTableReader()
+
+        # Connexion -> [première observation, dernière observation, entrée]
+        self._open: Dict[ConnectionKey, List[Any]] = {}
+        # Connexions en TIME-WAIT déjà signalées
+        self._time_wait: Set[ConnectionKey] = set()
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.polls = 0
+        self.dropped_events = 0
+
+    def start(self):
+        """Effectue un premier relevé puis démarre le suivi en arrière-plan."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.poll()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='connection-tracker', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le suivi en arrière-plan."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error polling socket tables: {e}")
+
+    def poll(self) -> int:
+        """Relève les tables de sockets et enregistre les changements. Retourne le nombre d'événements."""
+        now = time.time()
+        current: Dict[ConnectionKey, Socket] = {}
+        time_wait: Dict[ConnectionKey, Socket] = {}
+        for entry in self.reader.read(protocols=self.protocols, processes=False):
+            key = (entry.protocol, entry.local_address, entry.local_port, entry.peer_address, entry.peer_port)
+            # Sans inode : socket fermée côté processus (TIME-WAIT, orpheline)
+            if entry.inode:
+                current[key] = entry
+            else:
+                time_wait[key] = entry
+
+        events = []
+        with self._lock:
+            previous = self._open
+
+            # Nouvelles connexions : processus propriétaire résolu pour elles seules
+            opened = [key for key in current if key not in previous]
+            owners = self.reader.owners({current[key].inode for key in opened}) if opened else {}
+            names: Dict[int, Optional[str]] = {}
+            for key in opened:
+                entry = current[key]
+                owner = owners.get(entry.inode)
+                if owner is not None:
+                    pid, fd = owner
+                    if pid not in names:
+                        names[pid] = self.reader.process_name(pid)
+                    entry = entry._replace(pid=pid, process=names[pid], fd=fd)
+                previous[key] = [now, now, entry]
+                events.append(self._event('open', previous[key]))
+
+            # Connexions toujours présentes : mise à jour de la dernière observation et de l'état
+            closed = set()
+            for key, record in previous.items():
+                entry = current.get(key)
+                if entry is None:
+                    closed.add(key)
+                    continue
+                record[1] = now
+                if entry.state != record[2].state:
+                    record[2] = record[2]._replace(state=entry.state)
+
+            for key in closed:
+                record = previous.pop(key)
+                events.append(self._event('close', record, closed_at=now))
+
+            # Connexions ouvertes et fermées entre deux relevés
+            for key, entry in time_wait.items():
+                if key not in self._time_wait and key not in closed:
+                    events.append(self._event('close', [None, now, entry], closed_at=now))
+            self._time_wait = set(time_wait)
+
+            overflow = len(self._events) + len(events) - self._events.maxlen
+            if overflow > 0:
+                self.dropped_events += overflow
+            self._events.extend(events)
+            self.polls += 1
+
+        return len(events)
+
+    @staticmethod
+    def _event(event: str, record: List[Any], closed_at: Optional[float] = None) -> Dict[str, Any]:
+        first_seen, last_seen, entry = record
+        return {
+            'type': 'network_connection_event',
+            'event': event,
+            'protocol': entry.protocol,
+            'family': entry.family,
+            'state': entry.state,
+            'local_address': entry.local_address,
+            'local_port': entry.local_port,
+            'peer_address': entry.peer_address if entry.peer_port else '*',
+            'peer_port': entry.peer_port,
+            'uid': entry.uid,
+            'inode': entry.inode or None,
+            'pid': entry.pid,
+            'process_name': entry.process,
+            'first_seen': _isoformat(first_seen) if first_seen else None,
+            'last_seen': _isoformat(last_seen),
+            'closed_at': _isoformat(closed_at) if closed_at else None,
+            'duration': round(last_seen - first_seen, 3) if first_seen else None
+        }
+
+    def collect(self, predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        Retourne et retire les événements enregistrés depuis la collecte précédente.
+        Avec predicate, seuls les événements retenus sont retirés : les autres
+        restent en attente d'une collecte suivante.
+        """
+        with self._lock:
+            if predicate is None:
+                events = list(self._events)
+                self._events.clear()
+                return events
+            events, kept = [], []
+            for event in self._events:
+                (events if predicate(event) else kept).append(event)
+            self._events.clear()
+            self._events.extend(kept)
+        return events
+
+    def get_open_connections(self) -> List[Dict[str, Any]]:
+        """Connexions actuellement ouvertes, avec leurs dates d'observation."""
+        with self._lock:
+            return [self._event('open', list(record)) for record in self._open.values()]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'polls': self.polls,
+                'open_connections': len(self._open),
+                'pending_events': len(self._events),
+                'dropped_events': self.dropped_events,
+                'interval': self.interval
+            }
@@ -0,0 +1,187 @@
+import time
+import errno
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Any, Iterable, Optional
+
+from collectors.linux.proc_events import ProcConnector, ProcPoller, ProcessInfoCache, boot_time
+
+logger = logging.getLogger(__name__)
+
+# Intervalle entre deux relevés de /proc en mode dégradé (secondes)
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Nombre maximal d'événements en attente de collecte
+DEFAULT_MAX_EVENTS = 100000
+
+# Événements émis par défaut (les fork, très nombreux, sont suivis mais pas émis)
+DEFAULT_EVENTS = ('exec', 'exit')
+
+
+class ProcessEventMonitor:
+    """
+    Suivi des créations et fins de processus.
+    Les événements du connecteur de processus netlink (ou, sans privilèges,
+    des relevés successifs de /proc) sont enrichis puis conservés dans un
+    tampon circulaire, vidé à chaque collecte.
+    """
+
+    def __init__(self, events: Iterable[str] = DEFAULT_EVENTS, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 max_events: int = DEFAULT_MAX_EVENTS, use_netlink: bool = True, proc_root: str = '/proc'):
+        """
+        Args:
+            events: Types d'événements émis (fork, exec, exit)
+            poll_interval: Intervalle des relevés de /proc en mode dégradé (secondes)
+            max_events: Taille du tampon circulaire (les événements les plus anciens sont perdus)
+            use_netlink: Utiliser le connecteur netlink s'il est disponible
+            proc_root: Racine de procfs
+        """
+        self.events = set(events)
+        self.poll_interval = poll_interval
+        self.use_netlink = use_netlink
+        self.cache = ProcessInfoCache(proc_root)
+        self.proc_root = proc_root
+        self.method: Optional[str] = None
+
+        self._connector: Optional[ProcConnector] = None
+        self._poller: Optional[ProcPoller] = None
+        self._buffer = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._boot_time = boot_time()
+
+        self.received_events = 0
+        self.dropped_events = 0
+        self.lost_events = 0
+
+    def start(self):
+        """Démarre le suivi (netlink si possible, relevés de /proc sinon)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._connector = None
+        if self.use_netlink:
+            try:
+                self._connector = ProcConnector()
+                self.method = 'netlink'
+            except OSError as e:
+                logger.info(f"Process connector unavailable ({e}), falling back to /proc polling")
+        if self._connector is None:
+            self._poller = ProcPoller(self.proc_root)
+            self._poller.poll()
+            self.method = 'poll'
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='process-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le suivi."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._connector is not None:
+            self._connector.close()
+            self._connector = None
+
+    def _run(self):
+        if self._connector is not None:
+            while not self._stop.is_set():
+                try:
+                    self.handle(self._connector.receive())
+                except OSError as e:
+                    if e.errno == errno.ENOBUFS:
+                        # Tampon du socket saturé : des événements ont été perdus
+                        self.lost_events += 1
+                        continue
+                    logger.error(f"Error receiving process events: {e}")
+                    self._stop.wait(self.poll_interval)
+        else:
+            while not self._stop.wait(self.poll_interval):
+                try:
+                    self.handle(self._poller.poll())
+                except Exception as e:
+                    logger.error(f"Error polling processes: {e}")
+
+    def handle(self, raw_events: List[Dict[str, Any]]):
+        """Enrichit des événements bruts et les ajoute au tampon."""
+        events = []
+        now = time.time()
+        for raw in raw_events:
+            pid = raw['pid']
+            kind = raw['event']
+            monotonic_ns = raw.get('monotonic_ns')
+            when = self._boot_time + monotonic_ns / 1e9 if monotonic_ns and self._boot_time else now
+
+            if kind == 'fork':
+                # Le fils partage l'image de son parent jusqu'à son exec
+                info = self.cache.get(raw['ppid']) or self.cache.read(raw['ppid'])
+                info['ppid'] = raw['ppid']
+                info['started'] = when
+                self.cache.put(pid, info)
+            elif kind == 'exec':
+                started = (self.cache.get(pid) or {}).get('started', when)
+                info = self.cache.read(pid)
+                info['started'] = started
+                self.cache.put(pid, info)
+            else:
+                info = self.cache.pop(pid) or {}
+
+            if kind not in self.events:
+                continue
+
+            started = info.get('started')
+            events.append({
+                'type': 'process_event',
+                'event': kind,
+                'pid': pid,
+                'ppid': info.get('ppid'),
+                'name': info.get('name'),
+                'cmdline': info.get('cmdline'),
+                'exe': info.get('exe'),
+                'uid': info.get('uid'),
+                'exit_code': raw.get('exit_code'),
+                'signal': raw.get('signal'),
+                'duration': round(when - started, 3) if kind == 'exit' and started else None,
+                'timestamp': datetime.fromtimestamp(when, tz=timezone.utc).isoformat(),
+                'method': self.method
+            })
+
+        with self._lock:
+            self.received_events += len(raw_events)
+            overflow = len(self._buffer) + len(events) - self._buffer.maxlen
+            if overflow > 0:
+                self.dropped_events += overflow
+            self._buffer.extend(events)
+
+    def collect(self, predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        Retourne et retire les événements enregistrés depuis la collecte précédente.
+        Avec predicate, seuls les événements retenus sont retirés : les autres
+        restent en attente d'une collecte suivante.
+        """
+        with self._lock:
+            if predicate is None:
+                events = list(self._buffer)
+                self._buffer.clear()
+                return events
+            events, kept = [], []
+            for event in self._buffer:
+                (events if predicate(event) else kept).append(event)
+            self._buffer.clear()
+            self._buffer.extend(kept)
+        return events
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'method': self.method,
+                'received_events': self.received_events,
+                'pending_events': len(self._buffer),
+                'dropped_events': self.dropped_events,
+                'lost_events': self.lost_events
+            }
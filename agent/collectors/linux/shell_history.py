@@ -1,66 +1,58 @@
 import os
-import subprocess
 import logging
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional
+from datetime import datetime, timedelta, timezone
+
+from collectors.linux.history_parser import HISTORY_FILES, parse_history, parser_for
+from collectors.linux.log_tailer import LogTailer
 
 logger = logging.getLogger(__name__)
 
 class ShellHistoryCollector:
-    """Collecte l'historique des shells Linux."""
+    """
+    Collecte l'historique des shells Linux.
+    Chaque collecte ne lit que les commandes ajoutées depuis la précédente.
+    """
     
-    def __init__(self):
-        self.shell_files = [
-            '.bash_history',
-            '.zsh_history',
-            '.fish_history'
-        ]
+    def __init__(self, state_file: Optional[str] = None, initial_bytes: Optional[int] = None):
+        self.shell_files = list(HISTORY_FILES)
+        # Positions de lecture conservées entre les collectes (persistées si state_file)
+        self.tailer = LogTailer(state_file=state_file, initial_bytes=initial_bytes)
     
     def collect(self) -> List[Dict[str, Any]]:
-        """Collecte l'historique de tous les shells disponibles."""
-        results = []
-        
+        """Collecte les nouvelles commandes de tous les shells disponibles."""
+        return list(self.iter_commands())
+    
+    def iter_commands(self) -> Iterator[Dict[str, Any]]:
+        """Génère les nouvelles commandes de tous les shells disponibles."""
         for shell_file in self.shell_files:
             try:
-                shell_results = self._collect_shell_history(shell_file)
-                results.extend(shell_results)
+                yield from self._collect_shell_history(shell_file)
             except Exception as e:
                 logger.error(f"Error collecting {shell_file}: {e}")
-        
-        return results
     
-    def _collect_shell_history(self, shell_file: str) -> List[Dict[str, Any]]:
-        """Collecte l'historique d'un shell spécifique."""
-        results = []
+    def _collect_shell_history(self, shell_file: str) -> Iterator[Dict[str, Any]]:
+        """Nouvelles commandes d'un fichier d'historique (commandes multi-lignes comprises)."""
         home_dir = os.path.expanduser('~')
         history_path = os.path.join(home_dir, shell_file)
         
-        if not os.path.exists(history_path):
-            return results
-        
-        try:
-            with open(history_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            for i, line in enumerate(lines):
-                line = line.strip()
-                if line:
-                    results.append({
-                        'type': 'shell_history',
-                        'shell_file': shell_file,
-                        'command': line,
-                        'line_number': i + 1,
-                        'timestamp': datetime.now().isoformat(),
-                        'user': os.getenv('USER', 'unknown')
-                    })
+        if not os.path.isfile(history_path):
+            return
         
-        except Exception as e:
-            logger.error(f"Error reading {history_path}: {e}")
-        
-        return results
+        user = os.getenv('USER', 'unknown')
+        parser = parser_for(history_path)
+        for entry in parse_history(parser, self.tailer.read_raw_lines(history_path)):
+            entry.update({
+                'type': 'shell_history',
+                'shell_file': shell_file,
+                'user': user
+            })
+            yield entry
     
     def get_recent_commands(self, hours: int = 24) -> List[Dict[str, Any]]:
-        """Récupère les commandes récentes."""
-        # Cette méthode pourrait être améliorée pour utiliser les timestamps
-        # si disponibles dans les fichiers d'historique
-        return self.collect() 
\ No newline at end of file
+        """Nouvelles commandes horodatées des dernières heures (et celles sans horodatage)."""
+        since = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+        return [
+            command for command in self.iter_commands()
+            if command['timestamp'] is None or command['timestamp'] >= since
+        ]
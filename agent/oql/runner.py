@@ -1,6 +1,8 @@
+import os
 import logging
 import re
 import platform
+from typing import Dict, List, Optional
 from .sources.system import SystemInfoSource
 from .sources.processes import ProcessesSource
 from .sources.network import NetworkSource
@@ -8,12 +10,15 @@ from .sources.fs import FsSource
 from .sources.prefetch import PrefetchSource
 from .sources.amcache import AmcacheSource
 from .sources.yara_scan import YaraScanSource
+from .sources.offline import OfflineArtifactSource
 
 # Sources Linux
 from .sources.linux_system_logs import LinuxSystemLogsSource
 from .sources.linux_shell_history import LinuxShellHistorySource
 from .sources.linux_processes import LinuxProcessesSource
+from .sources.linux_process_events import LinuxProcessEventsSource
 from .sources.linux_network import LinuxNetworkSource
+from .sources.linux_network_events import LinuxNetworkEventsSource
 from .sources.linux_files import LinuxFilesSource
 from .sources.linux_services import LinuxServicesSource
 from .sources.linux_users import LinuxUsersSource
@@ -37,12 +42,15 @@ SOURCES = {
         'fs': FsSource,
         'prefetch': PrefetchSource,
         'amcache': AmcacheSource,
-        'yara_scan': YaraScanSource
+        'yara_scan': YaraScanSource,
+        'evidence': OfflineArtifactSource
     },
     'linux': {
         'system_info': SystemInfoSource,
         'processes': LinuxProcessesSource,
+        'process_events': LinuxProcessEventsSource,
         'network': LinuxNetworkSource,
+        'network_events': LinuxNetworkEventsSource,
         'fs': LinuxFilesSource,
         'yara_scan': YaraScanSource,
         'system_logs': LinuxSystemLogsSource,
@@ -50,14 +58,19 @@ SOURCES = {
         'services': LinuxServicesSource,
         'users': LinuxUsersSource,
         'cron_jobs': LinuxCronJobsSource,
-        'systemd_services': LinuxSystemdServicesSource
+        'systemd_services': LinuxSystemdServicesSource,
+        # Artefacts Windows/Linux lus depuis une racine de preuves (evidence_root)
+        'prefetch': PrefetchSource,
+        'amcache': AmcacheSource,
+        'evidence': OfflineArtifactSource
     },
     'darwin': {
         'system_info': SystemInfoSource,
         'processes': ProcessesSource,
         'network': NetworkSource,
         'fs': FsSource,
-        'yara_scan': YaraScanSource
+        'yara_scan': YaraScanSource,
+        'evidence': OfflineArtifactSource
     }
 }
 
@@ -66,14 +79,27 @@ class OQLRunner:
     Exécute les requêtes OQL et retourne les résultats.
     Supporte actuellement la syntaxe: SELECT * FROM <source> [WHERE path = '...' AND rule = '...']
     """
-    def __init__(self):
+    def __init__(self, state_directory: Optional[str] = None, initial_bytes: Optional[int] = None):
+        """
+        Args:
+            state_directory: Répertoire où persister les positions de lecture des logs
+                             et historiques shell (None pour les garder en mémoire)
+            initial_bytes: Pour un fichier jamais lu, nombre d'octets lus depuis la fin
+        """
         self.platform = self._detect_platform()
         self.sources = SOURCES.get(self.platform, SOURCES['linux'])  # Linux par défaut
+
+        def state_file(name: str) -> Optional[str]:
+            return os.path.join(state_directory, f"{name}.json") if state_directory else None
+
+        # Collecteurs partagés des sources incrémentales
+        LinuxSystemLogsSource.configure(state_file('system_logs'), initial_bytes, replace=True)
+        LinuxShellHistorySource.configure(state_file('shell_history'), initial_bytes, replace=True)
         self._sources = {
             "processes": ProcessesCollector(),
             "files": FilesCollector(),
-            "shell_history": ShellHistoryCollector(),
-            "auth_logs": AuthLogCollector(),
+            "shell_history": ShellHistoryCollector(state_file('shell_history_home'), initial_bytes),
+            "auth_logs": AuthLogCollector(state_file('auth_logs'), initial_bytes),
             "network_connections": NetworkConnectionsCollector(),
             "macos_persistence": MacPersistenceCollector(),
             "macos_unified_logs": MacUnifiedLogsCollector(),
@@ -187,10 +213,33 @@ class OQLRunner:
             username = params.get('username', None)
             shell_type = params.get('shell_type', None)
             source = source_class(username=username, shell_type=shell_type)
+        elif source_name == 'network' and source_class is LinuxNetworkSource:
+            # Filtres optionnels appliqués à la lecture des tables de sockets
+            states = [s.strip() for s in params['state'].split(',')] if 'state' in params else None
+            ports = [int(p) for p in params['port'].split(',')] if 'port' in params else None
+            protocols = [p.strip() for p in params['protocol'].split(',')] if 'protocol' in params else None
+            source = source_class(states=states, ports=ports, protocols=protocols)
+        elif source_name == 'process_events':
+            # Type d'événement (fork, exec, exit) et nom de processus optionnels
+            source = source_class(event=params.get('event'), name=params.get('name'))
+        elif source_name == 'network_events':
+            # Type d'événement (open, close) et intervalle du suivi (au démarrage)
+            interval = float(params['interval']) if 'interval' in params else None
+            source = source_class(event=params.get('event'), interval=interval)
         elif source_name == 'cron_jobs':
             # Paramètres optionnels pour les tâches cron
             user = params.get('user', None)
             source = source_class(user=user)
+        elif source_name in ('prefetch', 'amcache'):
+            # Analyse hors ligne si une racine de preuves est fournie
+            workers = int(params['workers']) if 'workers' in params else None
+            source = source_class(evidence_root=params.get('evidence_root'), workers=workers)
+        elif source_name == 'evidence':
+            if 'evidence_root' not in params:
+                raise ValueError("La source 'evidence' nécessite un paramètre 'evidence_root'")
+            artifacts = [a.strip() for a in params['artifact'].split(',')] if 'artifact' in params else None
+            workers = int(params['workers']) if 'workers' in params else None
+            source = source_class(params['evidence_root'], artifacts=artifacts, workers=workers)
         elif source_name == 'users':
             # Paramètres optionnels pour les utilisateurs
             include_shadow = params.get('include_shadow', 'true').lower() == 'true'
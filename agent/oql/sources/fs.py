@@ -4,7 +4,6 @@ import logging
 import datetime
 import platform
 import hashlib
-from google.protobuf.struct_pb2 import Struct
 
 def get_file_owner(filepath):
     """Tente de récupérer le propriétaire d'un fichier (multi-plateforme)."""
@@ -73,8 +72,8 @@ class FsSource:
                     if os.path.isfile(filepath):
                         md5_hash, sha256_hash = calculate_file_hashes(filepath)
                     
-                    s = Struct()
-                    s.update({
+                    # Dictionnaire plutôt que Struct : les entiers restent typés dans les lots de colonnes
+                    yield {
                         "path": filepath,
                         "filename": os.path.basename(filepath),
                         "directory": os.path.dirname(filepath),
@@ -87,8 +86,7 @@ class FsSource:
                         "ctime_iso": datetime.datetime.fromtimestamp(stats.st_ctime).isoformat(),
                         "md5": md5_hash,
                         "sha256": sha256_hash
-                    })
-                    yield s
+                    }
 
                 except FileNotFoundError:
                     # Le fichier a peut-être été supprimé entre le moment où glob l'a trouvé et où on le traite.
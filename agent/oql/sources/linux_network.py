@@ -3,20 +3,37 @@ Source OQL pour les informations réseau Linux
 """
 
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from collectors.linux import NetworkCollector
 
 logger = logging.getLogger(__name__)
 
 class LinuxNetworkSource:
-    """Source OQL pour les informations réseau Linux"""
+    """
+    Source OQL pour les informations réseau Linux
+    Avec un filtre sur l'état, le port ou le protocole, seules les connexions
+    sont retournées et le filtre est appliqué à la lecture des tables de sockets.
+    """
     
-    def __init__(self):
+    def __init__(self, states: Optional[List[str]] = None, ports: Optional[List[int]] = None,
+                 protocols: Optional[List[str]] = None):
+        self.states = states
+        self.ports = ports
+        self.protocols = protocols
         self.collector = NetworkCollector()
     
     def collect(self) -> List[Dict[str, Any]]:
         """Collecte les informations réseau Linux"""
         try:
+            if self.states or self.ports or self.protocols:
+                connections = self.collector.collect_connections(
+                    states=self.states, ports=self.ports, protocols=self.protocols
+                )
+                for connection in connections:
+                    connection['type'] = 'connection'
+                    connection['source'] = 'linux_network'
+                return connections
+            
             results = self.collector.collect()
             
             all_network_data = []
@@ -0,0 +1,50 @@
+"""
+Source OQL pour le suivi continu des connexions réseau Linux
+"""
+
+import logging
+from typing import Dict, List, Any, Optional
+from agent.collectors.linux.connection_tracker import ConnectionTracker, DEFAULT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Types d'événements émis par le suivi
+EVENT_TYPES = ('open', 'close')
+
+class LinuxNetworkEventsSource:
+    """
+    Source OQL pour le suivi continu des connexions réseau Linux
+    Le suivi démarre à la première requête (ou au lancement de l'agent) et se
+    poursuit en arrière-plan : chaque requête retourne les ouvertures et
+    fermetures de connexions survenues depuis la précédente.
+    """
+    
+    _tracker: Optional[ConnectionTracker] = None
+    
+    def __init__(self, event: Optional[str] = None, interval: Optional[float] = None):
+        if event and event not in EVENT_TYPES:
+            raise ValueError(f"Type d'événement réseau inconnu: {event} (valeurs possibles: {', '.join(EVENT_TYPES)})")
+        self.event = event
+        self.tracker = LinuxNetworkEventsSource.start_tracker(interval or DEFAULT_INTERVAL)
+    
+    @classmethod
+    def start_tracker(cls, interval: float = DEFAULT_INTERVAL) -> ConnectionTracker:
+        """Démarre le suivi partagé s'il ne l'est pas déjà."""
+        if cls._tracker is None:
+            cls._tracker = ConnectionTracker(interval=interval)
+            cls._tracker.start()
+            logger.info(f"Suivi des connexions réseau démarré (intervalle: {interval}s)")
+        return cls._tracker
+    
+    def collect(self) -> List[Dict[str, Any]]:
+        """Collecte les changements de connexions depuis la requête précédente"""
+        try:
+            # Filtrer par type d'événement si spécifié (open, close) : les autres
+            # événements restent en attente pour les requêtes suivantes
+            if self.event:
+                return self.tracker.collect(lambda event: event['event'] == self.event)
+            return self.tracker.collect()
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la collecte des événements réseau: {e}")
+            return []
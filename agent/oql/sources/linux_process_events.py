@@ -0,0 +1,54 @@
+"""
+Source OQL pour les événements de processus Linux (création et fin)
+"""
+
+import logging
+from typing import Dict, List, Any, Optional
+from agent.collectors.linux.process_monitor import ProcessEventMonitor
+
+logger = logging.getLogger(__name__)
+
+class LinuxProcessEventsSource:
+    """
+    Source OQL pour les événements de processus Linux
+    Le suivi démarre à la première requête (ou au lancement de l'agent) et se
+    poursuit en arrière-plan : chaque requête retourne les événements survenus
+    depuis la précédente, y compris ceux des processus déjà terminés.
+    """
+    
+    _monitor: Optional[ProcessEventMonitor] = None
+    
+    def __init__(self, event: Optional[str] = None, name: Optional[str] = None):
+        self.event = event
+        self.name = name
+        self.monitor = LinuxProcessEventsSource.start_monitor()
+        if event and event not in self.monitor.events:
+            raise ValueError(
+                f"Les événements '{event}' ne sont pas suivis "
+                f"(événements suivis: {', '.join(sorted(self.monitor.events))} ; voir process_events.events)"
+            )
+    
+    @classmethod
+    def start_monitor(cls, **kwargs) -> ProcessEventMonitor:
+        """Démarre le suivi partagé s'il ne l'est pas déjà."""
+        if cls._monitor is None:
+            cls._monitor = ProcessEventMonitor(**kwargs)
+            cls._monitor.start()
+            logger.info(f"Suivi des processus démarré (méthode: {cls._monitor.method})")
+        return cls._monitor
+    
+    def collect(self) -> List[Dict[str, Any]]:
+        """Collecte les événements de processus depuis la requête précédente"""
+        try:
+            # Filtrer par type d'événement (fork, exec, exit) et par nom de processus si
+            # spécifiés : les autres événements restent en attente pour les requêtes suivantes
+            if self.event or self.name:
+                return self.monitor.collect(self._matches)
+            return self.monitor.collect()
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la collecte des événements de processus: {e}")
+            return []
+    
+    def _matches(self, event: Dict[str, Any]) -> bool:
+        return (not self.event or event['event'] == self.event) and (not self.name or event.get('name') == self.name)
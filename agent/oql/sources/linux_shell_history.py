@@ -9,54 +9,41 @@ from collectors.linux import ShellHistoryCollector
 logger = logging.getLogger(__name__)
 
 class LinuxShellHistorySource:
-    """Source OQL pour l'historique shell Linux"""
+    """
+    Source OQL pour l'historique shell Linux
+    Le collecteur est partagé entre les requêtes : chacune ne retourne que les
+    commandes ajoutées depuis la précédente.
+    """
+    
+    _collector: Optional[ShellHistoryCollector] = None
     
     def __init__(self, username: Optional[str] = None, shell_type: Optional[str] = None):
         self.username = username
         self.shell_type = shell_type
-        self.collector = ShellHistoryCollector()
+        self.collector = LinuxShellHistorySource.configure()
+    
+    @classmethod
+    def configure(cls, state_file: Optional[str] = None, initial_bytes: Optional[int] = None,
+                  replace: bool = False) -> ShellHistoryCollector:
+        """Crée le collecteur partagé (positions persistées dans state_file)."""
+        if cls._collector is None or replace:
+            cls._collector = ShellHistoryCollector(state_file=state_file, initial_bytes=initial_bytes)
+        return cls._collector
     
     def collect(self) -> List[Dict[str, Any]]:
         """Collecte l'historique shell Linux"""
         try:
-            results = self.collector.collect()
-            
-            all_commands = []
-            
-            # Historique de l'utilisateur actuel
-            current_user_history = results.get('current_user_history', {})
-            for shell_file, shell_data in current_user_history.get('shell_files', {}).items():
-                if isinstance(shell_data, dict) and 'commands' in shell_data:
-                    for command in shell_data['commands']:
-                        command['source'] = 'current_user'
-                        command['shell_file'] = shell_file
-                        command['username'] = current_user_history.get('username', 'unknown')
-                        all_commands.append(command)
-            
-            # Historique de tous les utilisateurs (si root)
-            all_users_history = results.get('all_users_history', {})
-            for username, user_history in all_users_history.items():
-                for shell_file, shell_data in user_history.get('shell_files', {}).items():
-                    if isinstance(shell_data, dict) and 'commands' in shell_data:
-                        for command in shell_data['commands']:
-                            command['source'] = 'all_users'
-                            command['shell_file'] = shell_file
-                            command['username'] = username
-                            all_commands.append(command)
-            
-            # Filtrer par utilisateur si spécifié
-            if self.username:
-                all_commands = [cmd for cmd in all_commands if cmd.get('username') == self.username]
+            # Filtres appliqués au choix des fichiers lus : les commandes des autres
+            # utilisateurs et shells restent à lire pour les requêtes suivantes
+            results = self.collector.collect(username=self.username, shell_type=self.shell_type)
             
-            # Filtrer par type de shell si spécifié
-            if self.shell_type:
-                all_commands = [cmd for cmd in all_commands if self.shell_type in cmd.get('shell_file', '')]
+            all_commands = results.get('history_entries', [])
             
             # Trier par timestamp si disponible
-            all_commands.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+            all_commands.sort(key=lambda x: x.get('timestamp') or '', reverse=True)
             
             return all_commands
             
         except Exception as e:
             logger.error(f"Erreur lors de la collecte de l'historique shell: {e}")
-            return [] 
\ No newline at end of file
+            return []
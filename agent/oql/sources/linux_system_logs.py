@@ -2,60 +2,79 @@
 Source OQL pour les logs système Linux
 """
 
+import os
 import logging
-from typing import Dict, List, Any, Optional
+from itertools import chain, islice
+from typing import Dict, List, Any, Iterator, Optional
 from collectors.linux import SystemLogsCollector
 
 logger = logging.getLogger(__name__)
 
 class LinuxSystemLogsSource:
-    """Source OQL pour les logs système Linux"""
-    
+    """
+    Source OQL pour les logs système Linux
+    Le collecteur est partagé entre les requêtes : chacune ne retourne que les
+    entrées apparues depuis la précédente. Seuls les fichiers demandés sont
+    lus, et au plus max_lines entrées : les suivantes restent à lire pour la
+    requête suivante.
+    """
+
+    _collector: Optional[SystemLogsCollector] = None
+
     def __init__(self, log_file: Optional[str] = None, max_lines: int = 1000):
         self.log_file = log_file
         self.max_lines = max_lines
-        self.collector = SystemLogsCollector()
-    
+        self.collector = LinuxSystemLogsSource.configure()
+
+    @classmethod
+    def configure(cls, state_file: Optional[str] = None, initial_bytes: Optional[int] = None,
+                  replace: bool = False) -> SystemLogsCollector:
+        """Crée le collecteur partagé (positions persistées dans state_file)."""
+        if cls._collector is None or replace:
+            cls._collector = SystemLogsCollector(state_file=state_file, initial_bytes=initial_bytes)
+        return cls._collector
+
     def collect(self) -> List[Dict[str, Any]]:
         """Collecte les logs système Linux"""
         try:
-            results = self.collector.collect()
-            
-            # Si un fichier spécifique est demandé
+            # Si un fichier spécifique est demandé, seul celui-ci est lu
             if self.log_file:
-                if self.log_file in results.get('log_files', {}):
-                    log_data = results['log_files'][self.log_file]
-                    return log_data.get('recent_entries', [])[:self.max_lines]
-                else:
+                if self.log_file not in self.collector.log_files or not os.path.exists(self.log_file):
                     logger.warning(f"Fichier de log {self.log_file} non trouvé")
                     return []
-            
-            # Retourner tous les logs récents
-            all_logs = []
-            
-            # Logs système
-            for log_file, log_data in results.get('log_files', {}).items():
-                if isinstance(log_data, dict) and 'recent_entries' in log_data:
-                    for entry in log_data['recent_entries']:
-                        entry['source_file'] = log_file
-                        all_logs.append(entry)
-            
-            # Logs dmesg
-            dmesg_data = results.get('dmesg', {})
-            if isinstance(dmesg_data, dict) and 'recent_entries' in dmesg_data:
-                for entry in dmesg_data['recent_entries']:
+                return list(islice(self._file_entries(self.log_file), self.max_lines))
+
+            # Logs système, puis journal systemd
+            entries = chain(
+                chain.from_iterable(self._file_entries(log_file) for log_file in self.collector.log_files),
+                self._journal_entries()
+            )
+            all_logs = list(islice(entries, self.max_lines))
+
+            # Logs dmesg (relevé complet, non incrémental)
+            remaining = self.max_lines - len(all_logs)
+            if remaining > 0:
+                dmesg_data = self.collector._collect_dmesg()
+                for entry in dmesg_data.get('recent_entries', [])[:remaining]:
                     entry['source'] = 'dmesg'
                     all_logs.append(entry)
-            
-            # Logs journalctl
-            journalctl_data = results.get('journalctl', {})
-            if isinstance(journalctl_data, dict) and 'recent_entries' in journalctl_data:
-                for entry in journalctl_data['recent_entries']:
-                    entry['source'] = 'journalctl'
-                    all_logs.append(entry)
-            
-            return all_logs[:self.max_lines]
-            
+
+            return all_logs
+
         except Exception as e:
             logger.error(f"Erreur lors de la collecte des logs système: {e}")
-            return [] 
\ No newline at end of file
+            return []
+
+    def _file_entries(self, log_file: str) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(log_file):
+            return
+        for entry in self.collector.iter_log_events(log_file):
+            entry['source_file'] = log_file
+            yield entry
+
+    def _journal_entries(self) -> Iterator[Dict[str, Any]]:
+        if not self.collector.journal_available():
+            return
+        for entry in self.collector.iter_journal_events():
+            entry['source'] = 'journalctl'
+            yield entry
@@ -0,0 +1,458 @@
+"""
+Mode hors ligne des sources OQL : analyse d'artefacts depuis une racine de
+preuves (image montée ou répertoire de collecte triage extrait) plutôt que
+depuis le système en cours d'exécution.
+
+Les fichiers découverts sont répartis sur un pool de processus ; les
+fonctions d'analyse sont définies au niveau du module pour être sérialisables.
+Les lignes reviennent des processus par blocs, via une file bornée : un gros
+artefact n'est jamais entièrement chargé en mémoire.
+"""
+
+import glob
+import gzip
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from collectors.linux.history_parser import parse_history, parser_for
+from collectors.linux.log_parser import LogParser
+
+try:
+    import pypf
+except ImportError:
+    pypf = None
+
+try:
+    from Registry import Registry
+except ImportError:
+    Registry = None
+
+logger = logging.getLogger(__name__)
+
+# Motifs (relatifs à la racine de preuves, insensibles à la casse) par type d'artefact
+ARTIFACT_PATTERNS = {
+    'prefetch': ["Windows/Prefetch/*.pf"],
+    'amcache': ["Windows/appcompat/Programs/Amcache.hve"],
+    'browser_history': [
+        "Users/*/AppData/Local/Google/Chrome/User Data/*/History",
+        "Users/*/AppData/Local/Microsoft/Edge/User Data/*/History",
+        "Users/*/AppData/Roaming/Mozilla/Firefox/Profiles/*/places.sqlite",
+        "home/*/.config/google-chrome/*/History",
+        "home/*/.config/chromium/*/History",
+        "home/*/.mozilla/firefox/*/places.sqlite",
+    ],
+    'shell_history': [
+        "root/.bash_history",
+        "root/.zsh_history",
+        "home/*/.bash_history",
+        "home/*/.zsh_history",
+        "root/.local/share/fish/fish_history",
+        "home/*/.local/share/fish/fish_history",
+    ],
+    'linux_logs': [
+        "var/log/auth.log*",
+        "var/log/secure*",
+        "var/log/syslog*",
+        "var/log/messages*",
+    ],
+    'linux_users': ["etc/passwd"],
+    'cron_jobs': [
+        "etc/crontab",
+        "etc/cron.d/*",
+        "var/spool/cron/*",
+        "var/spool/cron/crontabs/*",
+    ],
+}
+
+# Époque des horodatages WebKit (Chrome/Edge) : microsecondes depuis 1601
+_WEBKIT_EPOCH = datetime(1601, 1, 1, tzinfo=timezone.utc)
+
+# Nombre de lignes par bloc renvoyé par les processus d'analyse
+ROW_CHUNK_SIZE = 5000
+
+
+def _filetime_to_datetime(value: Any) -> Optional[datetime]:
+    """Convertit un FILETIME Windows (centaines de nanosecondes depuis 1601, entier ou 8 octets)."""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        if len(value) != 8:
+            raise ValueError(f"FILETIME invalide : {len(value)} octets")
+        value = int.from_bytes(value, "little")
+    if not value:
+        return None
+    return _WEBKIT_EPOCH + timedelta(microseconds=value // 10)
+
+
+def _case_insensitive(pattern: str) -> str:
+    """Convertit un motif glob en motif insensible à la casse."""
+    converted = []
+    in_class = False
+    for char in pattern:
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        if char.isalpha() and not in_class:
+            converted.append(f"[{char.lower()}{char.upper()}]")
+        else:
+            converted.append(char)
+    return ''.join(converted)
+
+
+def find_artifacts(evidence_root: str, artifacts: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """Liste (type d'artefact, chemin) présents sous la racine de preuves."""
+    found = []
+    seen = set()
+    for artifact in artifacts or ARTIFACT_PATTERNS:
+        if artifact not in ARTIFACT_PATTERNS:
+            raise ValueError(f"Artefact hors ligne inconnu : {artifact}")
+        for pattern in ARTIFACT_PATTERNS[artifact]:
+            full_pattern = os.path.join(glob.escape(evidence_root), _case_insensitive(pattern))
+            for path in glob.glob(full_pattern):
+                if os.path.isfile(path) and path not in seen:
+                    seen.add(path)
+                    found.append((artifact, path))
+    return found
+
+
+def parse_prefetch(path: str) -> Iterator[Dict[str, Any]]:
+    """Analyse un fichier Prefetch (.pf)."""
+    if pypf is None:
+        raise ImportError("Le module 'pypf' est requis pour analyser les fichiers Prefetch.")
+
+    pf_file = pypf.file()
+    pf_file.open(path)
+    try:
+        yield {
+            "source_path": path,
+            "executable_filename": pf_file.executable_filename,
+            "prefetch_hash": pf_file.prefetch_hash,
+            "run_count": pf_file.run_count,
+            "last_run_time_iso": pf_file.get_last_run_time_as_datetime().isoformat() if pf_file.last_run_time else None,
+            "volumes_count": pf_file.number_of_volumes,
+            "filenames_loaded": list(pf_file.filenames),
+        }
+    finally:
+        pf_file.close()
+
+
+def parse_amcache(path: str) -> Iterator[Dict[str, Any]]:
+    """Analyse un fichier Amcache.hve (ancien format File\\{volume} et Root\\InventoryApplicationFile)."""
+    if Registry is None:
+        raise ImportError("Le module 'python-registry' est requis pour analyser Amcache.hve.")
+
+    reg = Registry.Registry(path)
+    root = reg.root()
+
+    def value(key, name):
+        try:
+            return key.value(name).value()
+        except Registry.RegistryValueNotFoundException:
+            return None
+
+    def file_entry(file_entry_key, volume_key):
+        # Ancien format : valeurs identifiées par des numéros, "17" est un FILETIME
+        program_path = value(file_entry_key, "15")
+        if program_path is None:
+            return None
+        last_modified = _filetime_to_datetime(value(file_entry_key, "17"))
+        return {
+            "source_path": path,
+            "volume_guid": volume_key.name(),
+            "file_id": file_entry_key.name(),
+            "program_path": program_path,
+            "sha1": (value(file_entry_key, "101") or "")[4:] or None,
+            "last_modified_time_utc_iso": last_modified.isoformat() if last_modified else None,
+        }
+
+    def inventory_entry(file_entry_key):
+        program_path = value(file_entry_key, "LowerCaseLongPath")
+        if program_path is None:
+            return None
+        return {
+            "source_path": path,
+            "file_id": file_entry_key.name(),
+            "program_path": program_path,
+            "sha1": (value(file_entry_key, "FileId") or "")[4:] or None,
+            "program_id": value(file_entry_key, "ProgramId"),
+            "last_modified_time_utc_iso": file_entry_key.timestamp().isoformat(),
+        }
+
+    def parse_entry(parse, file_entry_key, *args):
+        # Une entrée incomplète ou corrompue est ignorée sans interrompre l'analyse du fichier
+        try:
+            return parse(file_entry_key, *args)
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de l'entrée Amcache {file_entry_key.name()}: {e}")
+            return None
+
+    for key in root.subkeys():
+        # Ancien format : Root\File\{volume}\{entrée}
+        if key.name() == "File":
+            for volume_key in key.subkeys():
+                for file_entry_key in volume_key.subkeys():
+                    row = parse_entry(file_entry, file_entry_key, volume_key)
+                    if row is not None:
+                        yield row
+
+        # Format Windows 10+ : Root\InventoryApplicationFile\{entrée}
+        elif key.name() == "InventoryApplicationFile":
+            for file_entry_key in key.subkeys():
+                row = parse_entry(inventory_entry, file_entry_key)
+                if row is not None:
+                    yield row
+
+
+def parse_browser_history(path: str) -> Iterator[Dict[str, Any]]:
+    """Analyse une base d'historique Chrome/Edge (History) ou Firefox (places.sqlite), en lecture seule."""
+    is_firefox = os.path.basename(path).lower() == "places.sqlite"
+    lowered = path.lower()
+    browser = "firefox" if is_firefox else ("edge" if "microsoft/edge" in lowered.replace("\\", "/") else "chrome")
+
+    # immutable=1 : aucune écriture ni verrou sur la preuve (pas de copie nécessaire)
+    conn = sqlite3.connect(f"file:{quote(path)}?mode=ro&immutable=1", uri=True)
+    try:
+        if is_firefox:
+            rows = conn.execute("SELECT url, title, last_visit_date, visit_count FROM moz_places WHERE last_visit_date IS NOT NULL")
+        else:
+            rows = conn.execute("SELECT url, title, last_visit_time, visit_count FROM urls")
+
+        for url, title, visit_time, visit_count in rows:
+            if not visit_time:
+                last_visit = None
+            elif is_firefox:
+                last_visit = datetime.fromtimestamp(visit_time / 1000000, tz=timezone.utc)
+            else:
+                last_visit = _WEBKIT_EPOCH + timedelta(microseconds=visit_time)
+            yield {
+                "source_path": path,
+                "browser": browser,
+                "url": url,
+                "title": title,
+                "last_visit": last_visit.isoformat() if last_visit else None,
+                "visit_count": visit_count,
+            }
+    finally:
+        conn.close()
+
+
+def _open_text(path: str):
+    """Ouvre un fichier texte, décompressé s'il s'agit d'une archive de rotation .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace", buffering=1024 * 1024)
+
+
+def _home_user(path: str) -> Optional[str]:
+    parts = path.replace("\\", "/").split("/")
+    for i, part in enumerate(parts[:-1]):
+        if part in ("home", "Users") and i + 1 < len(parts):
+            return parts[i + 1]
+        if part == "root" and i == len(parts) - 2:
+            return "root"
+    return None
+
+
+def parse_shell_history(path: str) -> Iterator[Dict[str, Any]]:
+    """Analyse un historique bash, zsh, fish, tcsh ou ksh (commandes multi-lignes comprises)."""
+    username = _home_user(path)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        lines = ((line_number, line.rstrip(b"\r\n")) for line_number, line in enumerate(f, 1))
+        for entry in parse_history(parser_for(path[:-3] if path.endswith(".gz") else path), lines):
+            entry["source_path"] = path
+            entry["username"] = username
+            yield entry
+
+
+def parse_log_file(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lit un journal texte (éventuellement compressé) ligne par ligne. Les lignes
+    syslog sont analysées, l'année des horodatages étant déduite de la date de
+    modification du fichier.
+    """
+    parser = LogParser(reference=datetime.fromtimestamp(os.path.getmtime(path)))
+    with _open_text(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            record = {"source_path": path, "line_number": line_number, "line": line}
+            entry = parser.parse_line(line)
+            if entry is not None:
+                del entry["raw_line"]
+                record.update(entry)
+            yield record
+
+
+def parse_passwd(path: str) -> Iterator[Dict[str, Any]]:
+    """Analyse /etc/passwd."""
+    with _open_text(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split(":")
+            if len(fields) < 7 or line.startswith("#"):
+                continue
+            yield {
+                "source_path": path,
+                "username": fields[0],
+                "uid": int(fields[2]) if fields[2].isdigit() else fields[2],
+                "gid": int(fields[3]) if fields[3].isdigit() else fields[3],
+                "gecos": fields[4],
+                "home": fields[5],
+                "shell": fields[6],
+            }
+
+
+def parse_crontab(path: str) -> Iterator[Dict[str, Any]]:
+    """Analyse une crontab (système ou utilisateur)."""
+    system_crontab = "/etc/" in path.replace("\\", "/")
+    owner = None if system_crontab else os.path.basename(path)
+    with _open_text(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#") or re.match(r'^[A-Za-z_][A-Za-z0-9_]*\s*=', line):
+                continue
+            fields = line.split(None, 6 if system_crontab else 5)
+            if line.startswith("@"):
+                schedule, rest = fields[0], fields[1:]
+            else:
+                schedule, rest = " ".join(fields[:5]), fields[5:]
+            if system_crontab and rest:
+                user, command = rest[0], " ".join(rest[1:])
+            else:
+                user, command = owner, " ".join(rest)
+            yield {
+                "source_path": path,
+                "line_number": line_number,
+                "schedule": schedule,
+                "user": user,
+                "command": command,
+            }
+
+
+PARSERS: Dict[str, Callable[[str], Iterator[Dict[str, Any]]]] = {
+    'prefetch': parse_prefetch,
+    'amcache': parse_amcache,
+    'browser_history': parse_browser_history,
+    'shell_history': parse_shell_history,
+    'linux_logs': parse_log_file,
+    'linux_users': parse_passwd,
+    'cron_jobs': parse_crontab,
+}
+
+
+def iter_artifact_chunks(task: Tuple[str, str, str], chunk_rows: int = ROW_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Lignes d'un artefact, par blocs d'au plus chunk_rows lignes."""
+    artifact, path, evidence_root = task
+    relative_path = os.path.relpath(path, evidence_root)
+    rows = []
+    try:
+        for row in PARSERS[artifact](path):
+            row["artifact"] = artifact
+            row["evidence_root"] = evidence_root
+            row["source_path"] = relative_path
+            rows.append(row)
+            if len(rows) >= chunk_rows:
+                yield rows
+                rows = []
+    except Exception as e:
+        logger.error(f"Impossible d'analyser l'artefact {artifact} {path}: {e}")
+        rows.append({
+            "artifact": artifact,
+            "evidence_root": evidence_root,
+            "source_path": relative_path,
+            "error": str(e),
+        })
+    if rows:
+        yield rows
+
+
+def parse_artifact(task: Tuple[str, str, str], results, stop, chunk_rows: int = ROW_CHUNK_SIZE) -> int:
+    """
+    Analyse un artefact (exécuté dans un processus du pool). Les blocs de lignes
+    sont placés dans la file results, suivis de None ; l'analyse s'interrompt
+    si stop est positionné (consommateur arrêté). Retourne le nombre de lignes.
+    """
+    count = 0
+    try:
+        for rows in iter_artifact_chunks(task, chunk_rows):
+            if stop.is_set():
+                break
+            results.put(rows)
+            count += len(rows)
+    finally:
+        results.put(None)
+    return count
+
+
+class OfflineArtifactSource:
+    """
+    Source OQL analysant les artefacts d'une ou plusieurs racines de preuves.
+    evidence_root peut être un motif glob (ex. '/data/triage/*') pour traiter
+    toutes les collectes d'une flotte en une requête.
+    """
+
+    def __init__(self, evidence_root: str, artifacts: Optional[List[str]] = None, workers: Optional[int] = None,
+                 chunk_rows: int = ROW_CHUNK_SIZE):
+        self.evidence_roots = sorted(path for path in glob.glob(evidence_root) if os.path.isdir(path))
+        if not self.evidence_roots:
+            raise ValueError(f"Racine de preuves introuvable : {evidence_root}")
+        self.artifacts = artifacts
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.chunk_rows = chunk_rows
+
+    def collect(self) -> Iterator[Dict[str, Any]]:
+        tasks = [
+            (artifact, path, root)
+            for root in self.evidence_roots
+            for artifact, path in find_artifacts(root, self.artifacts)
+        ]
+        logger.info(f"Analyse hors ligne de {len(tasks)} artefacts dans {len(self.evidence_roots)} racine(s) de preuves")
+
+        if self.workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                for rows in iter_artifact_chunks(task, self.chunk_rows):
+                    yield from rows
+            return
+
+        workers = min(self.workers, len(tasks))
+        with multiprocessing.Manager() as manager:
+            # File bornée : les processus attendent que les blocs précédents soient consommés
+            results = manager.Queue(maxsize=workers * 2)
+            stop = manager.Event()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(parse_artifact, task, results, stop, self.chunk_rows) for task in tasks]
+                try:
+                    remaining = len(futures)
+                    while remaining:
+                        try:
+                            rows = results.get(timeout=1)
+                        except queue.Empty:
+                            # Processus du pool disparu sans signaler sa fin
+                            for future in futures:
+                                if future.done() and future.exception() is not None:
+                                    raise future.exception()
+                            continue
+                        if rows is None:
+                            remaining -= 1
+                        else:
+                            yield from rows
+                finally:
+                    # Consommateur arrêté (LIMIT) ou erreur : interrompre et débloquer les processus
+                    stop.set()
+                    for future in futures:
+                        future.cancel()
+                    while not all(future.done() for future in futures):
+                        try:
+                            results.get(timeout=0.1)
+                        except queue.Empty:
+                            pass
@@ -9,24 +9,37 @@ except ImportError:
     pypf = None
 
 from .fs import FsSource
+from .offline import OfflineArtifactSource, parse_prefetch
 
 class PrefetchSource:
     """
     Une source de données OQL qui trouve et analyse les fichiers Prefetch de Windows.
+    Avec evidence_root, les fichiers sont lus depuis une racine de preuves
+    (image montée ou collecte extraite), quelle que soit la plateforme.
     """
     PREFETCH_GLOB = "C:\\Windows\\Prefetch\\*.pf"
 
-    def __init__(self):
+    def __init__(self, evidence_root=None, workers=None):
         if not pypf:
             raise ImportError("Le module 'pypf' est requis mais non installé. Impossible d'utiliser la source 'prefetch'.")
+        self.evidence_root = evidence_root
+        self.workers = workers
 
     def collect(self):
         """
         Collecte et analyse les fichiers Prefetch.
-        Ne fait rien si l'OS n'est pas Windows.
+        Ne fait rien si l'OS n'est pas Windows et qu'aucune racine de preuves n'est fournie.
         """
+        if self.evidence_root:
+            offline_source = OfflineArtifactSource(self.evidence_root, artifacts=['prefetch'], workers=self.workers)
+            for row in offline_source.collect():
+                s = Struct()
+                s.update(row)
+                yield s
+            return
+
         if platform.system() != "Windows":
-            logging.warning("La source 'prefetch' est uniquement compatible avec Windows. La requête est ignorée.")
+            logging.warning("La source 'prefetch' est uniquement compatible avec Windows (ou avec evidence_root). La requête est ignorée.")
             return
 
         logging.info(f"Recherche des fichiers Prefetch avec le glob: {self.PREFETCH_GLOB}")
@@ -42,28 +55,11 @@ class PrefetchSource:
                 continue
 
             try:
-                # Ouvrir et parser le fichier prefetch
-                pf_file = pypf.file()
-                pf_file.open(filepath)
-
-                s = Struct()
-                s.update({
-                    "source_path": filepath,
-                    "executable_filename": pf_file.executable_filename,
-                    "prefetch_hash": pf_file.prefetch_hash,
-                    "run_count": pf_file.run_count,
-                    "last_run_time_iso": pf_file.get_last_run_time_as_datetime().isoformat() if pf_file.last_run_time else None,
-                    # On peut ajouter d'autres run times si nécessaire
-                    # "run_times_iso": [rt.isoformat() for rt in pf_file.get_run_times_as_datetimes()],
-                    "volumes_count": pf_file.number_of_volumes,
-                })
-                
-                # Ajouter les noms des fichiers chargés par l'exécutable
-                filenames_loaded = list(pf_file.filenames)
-                s.update({"filenames_loaded": filenames_loaded})
-
-                yield s
+                for row in parse_prefetch(filepath):
+                    s = Struct()
+                    s.update(row)
+                    yield s
 
             except Exception as e:
                 logging.error(f"Impossible de parser le fichier Prefetch {filepath}: {e}", exc_info=False)
-                continue 
\ No newline at end of file
+                continue
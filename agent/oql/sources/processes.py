@@ -1,7 +1,6 @@
 import psutil
 import datetime
 import logging
-from google.protobuf.struct_pb2 import Struct
 
 logger = logging.getLogger(__name__)
 
@@ -31,8 +30,7 @@ class ProcessesSource:
                 else:
                     create_time_iso = None
 
-                s = Struct()
-                s.update({
+                yield {
                     "pid": proc_info['pid'],
                     "ppid": proc_info['ppid'],
                     "name": proc_info['name'],
@@ -41,8 +39,7 @@ class ProcessesSource:
                     "creation_time_iso": create_time_iso,
                     "status": proc_info['status'],
                     "username": proc_info['username'],
-                })
-                yield s
+                }
 
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 # Le processus a peut-être terminé ou nous n'avons pas les droits, on l'ignore.
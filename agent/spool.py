@@ -0,0 +1,238 @@
+"""
+Spool disque de l'agent.
+
+Les résultats produits par l'agent sont ajoutés à des segments en ajout seul
+(chaque enregistrement : longueur, CRC32 puis données) avant d'être envoyés
+au Hive ; ils survivent ainsi aux indisponibilités du Hive et aux redémarrages
+de l'agent. L'envoi lit les enregistrements par lots, du plus ancien au plus
+récent, et n'avance le curseur persistant qu'une fois le lot transmis
+(livraison au moins une fois). La taille totale est bornée : les segments les
+plus anciens sont supprimés au-delà de la limite.
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# En-tête d'un enregistrement : longueur des données, CRC32 des données
+RECORD_HEADER = struct.Struct('<II')
+
+SEGMENT_SUFFIX = '.seg'
+CURSOR_FILE = 'cursor.json'
+
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+# Position dans le spool : (numéro de segment, offset de fin d'enregistrement)
+SpoolPosition = Tuple[int, int]
+
+
+class Spool:
+    """Spool persistant d'enregistrements binaires, segmenté, borné et vidé par lots."""
+
+    def __init__(self, directory: str, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 max_size: int = DEFAULT_MAX_SIZE, fsync: bool = False):
+        """
+        Args:
+            directory: Répertoire des segments et du curseur
+            segment_size: Taille (octets) au-delà de laquelle un nouveau segment est ouvert
+            max_size: Taille totale maximale (octets) ; les segments les plus anciens sont supprimés au-delà
+            fsync: Forcer l'écriture sur disque après chaque ajout
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_size = max_size
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._segments: Dict[int, int] = {}  # numéro -> taille
+        self._writer = None
+        self._writer_segment: Optional[int] = None
+        self._cursor: SpoolPosition = (0, 0)
+
+        self.appended_records = 0
+        self.sent_records = 0
+        self.evicted_segments = 0
+        self.evicted_bytes = 0
+        self.corrupted_segments = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:016d}{SEGMENT_SUFFIX}")
+
+    def _load(self):
+        for name in os.listdir(self.directory):
+            number = name[:-len(SEGMENT_SUFFIX)]
+            if name.endswith(SEGMENT_SUFFIX) and number.isdigit():
+                self._segments[int(number)] = os.path.getsize(os.path.join(self.directory, name))
+
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE), 'r', encoding='utf-8') as f:
+                cursor = json.load(f)
+            self._cursor = (int(cursor['segment']), int(cursor['offset']))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Error loading spool cursor from {self.directory}: {e}")
+
+        # Segments déjà envoyés (arrêt entre l'envoi et la suppression)
+        for segment in sorted(self._segments):
+            if segment < self._cursor[0]:
+                self._delete_segment(segment)
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, CURSOR_FILE)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'segment': self._cursor[0], 'offset': self._cursor[1]}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error saving spool cursor to {path}: {e}")
+
+    def _delete_segment(self, segment: int):
+        if segment == self._writer_segment:
+            self._writer.close()
+            self._writer = None
+            self._writer_segment = None
+        try:
+            os.remove(self._segment_path(segment))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error removing spool segment {segment}: {e}")
+        self._segments.pop(segment, None)
+
+    def append(self, payload: bytes):
+        """Ajoute un enregistrement."""
+        self.append_many([payload])
+
+    def append_many(self, payloads: Iterable[bytes]):
+        """Ajoute des enregistrements en une seule écriture."""
+        records = [RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload for payload in payloads]
+        if not records:
+            return
+        data = b''.join(records)
+
+        with self._lock:
+            if self._writer is None or self._segments[self._writer_segment] >= self.segment_size:
+                self._open_writer()
+            self._writer.write(data)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+            self._segments[self._writer_segment] += len(data)
+            self.appended_records += len(records)
+            self._evict()
+
+    def _open_writer(self):
+        """Ouvre un nouveau segment (jamais un segment existant, dont la fin peut être incomplète)."""
+        if self._writer is not None:
+            self._writer.close()
+        segment = max(max(self._segments, default=-1) + 1, self._cursor[0])
+        self._writer = open(self._segment_path(segment), 'ab')
+        self._writer_segment = segment
+        self._segments[segment] = 0
+
+    def _evict(self):
+        """Supprime les segments les plus anciens au-delà de la taille maximale."""
+        total = sum(self._segments.values())
+        for segment in sorted(self._segments):
+            if total <= self.max_size or segment == self._writer_segment:
+                break
+            size = self._segments[segment]
+            self._delete_segment(segment)
+            total -= size
+            self.evicted_segments += 1
+            self.evicted_bytes += size
+            logger.warning(f"Spool full, dropped segment {segment} ({size} bytes)")
+            if self._cursor[0] <= segment:
+                self._cursor = (segment + 1, 0)
+                self._save_cursor()
+
+    def read(self, max_records: int = 1000, max_bytes: int = 4 * 1024 * 1024) -> List[Tuple[SpoolPosition, bytes]]:
+        """
+        Prochain lot d'enregistrements non envoyés, du plus ancien au plus récent,
+        avec la position suivant chacun (à passer à commit() une fois envoyé).
+        """
+        batch: List[Tuple[SpoolPosition, bytes]] = []
+        size = 0
+        with self._lock:
+            segments = [segment for segment in sorted(self._segments) if segment >= self._cursor[0]]
+
+        for segment in segments:
+            offset = self._cursor[1] if segment == self._cursor[0] else 0
+            try:
+                with open(self._segment_path(segment), 'rb') as f:
+                    f.seek(offset)
+                    while len(batch) < max_records and size < max_bytes:
+                        header = f.read(RECORD_HEADER.size)
+                        if len(header) < RECORD_HEADER.size:
+                            break
+                        length, crc = RECORD_HEADER.unpack(header)
+                        payload = f.read(length)
+                        if len(payload) < length or zlib.crc32(payload) != crc:
+                            if segment != self._writer_segment:
+                                # Fin incomplète ou corrompue (arrêt brutal) : le reste du segment est ignoré
+                                self.corrupted_segments += 1
+                                logger.warning(f"Corrupted record in spool segment {segment} at offset {offset}")
+                            break
+                        offset += RECORD_HEADER.size + length
+                        size += len(payload)
+                        batch.append(((segment, offset), payload))
+            except FileNotFoundError:
+                # Segment supprimé entre-temps (éviction)
+                continue
+            if len(batch) >= max_records or size >= max_bytes or segment == self._writer_segment:
+                break
+        return batch
+
+    def commit(self, position: SpoolPosition, records: int = 0):
+        """Marque comme envoyés les enregistrements jusqu'à position ; les segments terminés sont supprimés."""
+        with self._lock:
+            if position < self._cursor:
+                return
+            self._cursor = position
+            self.sent_records += records
+            for segment in sorted(self._segments):
+                if segment >= position[0]:
+                    break
+                self._delete_segment(segment)
+            # Segment inactif entièrement envoyé
+            segment, offset = position
+            if segment != self._writer_segment and offset >= self._segments.get(segment, 0):
+                self._delete_segment(segment)
+                self._cursor = (segment + 1, 0)
+            self._save_cursor()
+
+    def pending_bytes(self) -> int:
+        """Taille (octets) des segments restant à envoyer, approximativement."""
+        with self._lock:
+            return sum(self._segments.values()) - self._cursor[1]
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                self._writer_segment = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'segments': len(self._segments),
+                'size': sum(self._segments.values()),
+                'appended_records': self.appended_records,
+                'sent_records': self.sent_records,
+                'evicted_segments': self.evicted_segments,
+                'evicted_bytes': self.evicted_bytes,
+                'corrupted_segments': self.corrupted_segments
+            }
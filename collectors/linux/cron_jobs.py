@@ -4,10 +4,31 @@ Collecte les tâches cron système et utilisateur
 """
 
 import os
-import re
 from datetime import datetime
 from typing import Dict, List, Any
 from .base import LinuxCollector
+from ..pattern_matcher import RegexMatcher
+
+# Patterns de commandes suspectes
+SUSPICIOUS_JOB_PATTERNS = RegexMatcher([
+    r'\b(wget|curl)\s+.*\b(http|https)://',
+    r'\b(nc|netcat)\s+.*\b(connect|listen)',
+    r'\b(ssh|scp)\s+.*\b(root@|admin@)',
+    r'\b(sudo|su)\s+.*\b(root|admin)',
+    r'\b(chmod|chown)\s+.*\b777|666',
+    r'\b(rm|del)\s+.*\b(-rf|/rf)',
+    r'\b(passwd|password)\s+.*\b(root|admin)',
+    r'\b(service|systemctl)\s+.*\b(stop|disable)',
+    r'\b(ufw|iptables)\s+.*\b(disable|stop)',
+    r'\b(base64|openssl)\s+.*\b(decode|decrypt)',
+    r'\b(python|perl|ruby)\s+.*\b(-c|-e)',
+    r'\b(eval|exec)\s+.*\b(\$|`)',
+    r'\b(echo|printf)\s+.*\b(\$|`)',
+    r'\b(backdoor|trojan|malware|virus)\b',
+    r'\b(keylogger|logger|spy)\b',
+    r'\b(exploit|payload|shell)\b',
+    r'\b(miner|mining)\b'
+])
 
 class CronJobsCollector(LinuxCollector):
     """Collecteur pour les tâches cron Linux"""
@@ -261,34 +282,10 @@ class CronJobsCollector(LinuxCollector):
         """Analyse les tâches cron suspectes"""
         suspicious_jobs = []
         
-        # Patterns de commandes suspectes
-        suspicious_patterns = [
-            r'\b(wget|curl)\s+.*\b(http|https)://',
-            r'\b(nc|netcat)\s+.*\b(connect|listen)',
-            r'\b(ssh|scp)\s+.*\b(root@|admin@)',
-            r'\b(sudo|su)\s+.*\b(root|admin)',
-            r'\b(chmod|chown)\s+.*\b777|666',
-            r'\b(rm|del)\s+.*\b(-rf|/rf)',
-            r'\b(passwd|password)\s+.*\b(root|admin)',
-            r'\b(service|systemctl)\s+.*\b(stop|disable)',
-            r'\b(ufw|iptables)\s+.*\b(disable|stop)',
-            r'\b(base64|openssl)\s+.*\b(decode|decrypt)',
-            r'\b(python|perl|ruby)\s+.*\b(-c|-e)',
-            r'\b(eval|exec)\s+.*\b(\$|`)',
-            r'\b(echo|printf)\s+.*\b(\$|`)',
-            r'\b(backdoor|trojan|malware|virus)\b',
-            r'\b(keylogger|logger|spy)\b',
-            r'\b(exploit|payload|shell)\b',
-            r'\b(miner|mining)\b'
-        ]
-        
-        # Compiler les patterns
-        compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in suspicious_patterns]
-        
         # Analyser les tâches système
         system_jobs = results.get('system_crontab', {}).get('jobs', [])
         for job in system_jobs:
-            suspicious_flags = self._check_job_suspicious(job, compiled_patterns)
+            suspicious_flags = self._check_job_suspicious(job)
             if suspicious_flags:
                 suspicious_jobs.append({
                     'job': job,
@@ -301,7 +298,7 @@ class CronJobsCollector(LinuxCollector):
         for username, user_crontab in results.get('user_crontabs', {}).items():
             if isinstance(user_crontab, dict) and 'jobs' in user_crontab:
                 for job in user_crontab['jobs']:
-                    suspicious_flags = self._check_job_suspicious(job, compiled_patterns)
+                    suspicious_flags = self._check_job_suspicious(job)
                     if suspicious_flags:
                         suspicious_jobs.append({
                             'job': job,
@@ -323,7 +320,7 @@ class CronJobsCollector(LinuxCollector):
                                     'raw_line': line.strip(),
                                     'source_file': file_info['path']
                                 }
-                                suspicious_flags = self._check_job_suspicious(job, compiled_patterns)
+                                suspicious_flags = self._check_job_suspicious(job)
                                 if suspicious_flags:
                                     suspicious_jobs.append({
                                         'job': job,
@@ -334,15 +331,14 @@ class CronJobsCollector(LinuxCollector):
         
         return suspicious_jobs
     
-    def _check_job_suspicious(self, job: Dict[str, Any], patterns: List[re.Pattern]) -> List[str]:
+    def _check_job_suspicious(self, job: Dict[str, Any], patterns: RegexMatcher = SUSPICIOUS_JOB_PATTERNS) -> List[str]:
         """Vérifie si une tâche est suspecte"""
         suspicious_flags = []
         command = job.get('command', '')
         
         # Vérifier les patterns suspects
-        for pattern in patterns:
-            if pattern.search(command):
-                suspicious_flags.append(f"Commande suspecte: {pattern.pattern}")
+        for pattern in patterns.find_all(command):
+            suspicious_flags.append(f"Commande suspecte: {pattern}")
         
         # Vérifier les tâches qui s'exécutent très fréquemment
         time_analysis = job.get('time_analysis', {})
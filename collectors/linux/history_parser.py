@@ -0,0 +1,241 @@
+"""
+Analyse en flux des historiques de shells.
+
+Chaque analyseur reçoit les lignes brutes (octets) une à une via feed() et
+produit les commandes complètes, y compris les commandes sur plusieurs lignes ;
+flush() termine la dernière commande en fin de lecture. Les lignes peuvent
+provenir d'une lecture incrémentale (LogTailer) ou d'un fichier entier.
+
+Formats pris en charge :
+    bash   lignes « #horodatage » (HISTTIMEFORMAT) suivies de la commande
+    zsh    format étendu « : début:durée;commande », continuation par « \\ »
+    fish   YAML simplifié « - cmd: ... » / « when: ... »
+    tcsh   lignes « #+horodatage » facultatives
+    ksh    une commande par ligne
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+# Format étendu zsh : « : 1700000000:0;commande »
+ZSH_EXTENDED_RE = re.compile(rb'^: (\d+):\d+;(.*)$', re.DOTALL)
+
+# Séquences d'échappement de fish (\\n, \\\\)
+FISH_ESCAPE_RE = re.compile(r'\\(.)')
+FISH_ESCAPES = {'n': '\n', '\\': '\\'}
+
+# Octet de « métafication » de zsh : l'octet suivant est xoré avec 32
+ZSH_META = 0x83
+
+
+def _timestamp(seconds) -> Optional[str]:
+    try:
+        return datetime.fromtimestamp(int(seconds), tz=timezone.utc).isoformat()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode('utf-8', 'replace')
+
+
+def unmetafy(raw: bytes) -> bytes:
+    """Décode les octets « métafiés » de l'historique zsh (caractères non ASCII)."""
+    if ZSH_META not in raw:
+        return raw
+    output = bytearray()
+    meta = False
+    for byte in raw:
+        if meta:
+            output.append(byte ^ 32)
+            meta = False
+        elif byte == ZSH_META:
+            meta = True
+        else:
+            output.append(byte)
+    return bytes(output)
+
+
+class HistoryParser:
+    """Analyseur incrémental d'un historique : une commande par ligne non vide."""
+
+    shell_type = 'sh'
+
+    def entry(self, line_number: int, command: str, timestamp: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            'command': command,
+            'timestamp': timestamp,
+            'shell_type': self.shell_type,
+            'line_number': line_number
+        }
+
+    def feed(self, line_number: int, line: bytes) -> Iterator[Dict[str, Any]]:
+        """Consomme une ligne (sans fin de ligne) et produit les commandes terminées."""
+        command = _decode(line).strip()
+        if command and not command.startswith('#'):
+            yield self.entry(line_number, command)
+
+    def flush(self) -> Iterator[Dict[str, Any]]:
+        """Produit la commande en cours en fin de lecture."""
+        return iter(())
+
+
+class BashHistoryParser(HistoryParser):
+    """
+    Historique bash. Avec horodatages, une commande s'étend jusqu'à la ligne
+    « #horodatage » suivante (commandes multi-lignes de lithist) ; sans
+    horodatage, chaque ligne est une commande.
+    """
+
+    shell_type = 'bash'
+
+    def __init__(self):
+        self._timestamp: Optional[str] = None
+        self._start = 0
+        self._lines: List[str] = []
+        self._timestamped = False
+
+    def feed(self, line_number: int, line: bytes) -> Iterator[Dict[str, Any]]:
+        if line[:1] == b'#' and line[1:].isdigit():
+            yield from self.flush()
+            self._timestamp = _timestamp(line[1:])
+            self._timestamped = True
+            return
+
+        if not self._timestamped:
+            command = _decode(line).strip()
+            if command and not command.startswith('#'):
+                yield self.entry(line_number, command)
+            return
+
+        if not self._lines:
+            self._start = line_number
+        self._lines.append(_decode(line))
+
+    def flush(self) -> Iterator[Dict[str, Any]]:
+        if self._lines:
+            command = '\n'.join(self._lines).strip()
+            if command:
+                yield self.entry(self._start, command, self._timestamp)
+        self._lines = []
+        self._timestamp = None
+
+
+class ZshHistoryParser(HistoryParser):
+    """Historique zsh (simple ou étendu), lignes terminées par « \\ » pour les commandes multi-lignes."""
+
+    shell_type = 'zsh'
+
+    def __init__(self):
+        self._timestamp: Optional[str] = None
+        self._start = 0
+        self._lines: List[bytes] = []
+
+    def feed(self, line_number: int, line: bytes) -> Iterator[Dict[str, Any]]:
+        line = unmetafy(line)
+        if not self._lines:
+            if not line.strip():
+                return
+            self._start = line_number
+            self._timestamp = None
+            match = ZSH_EXTENDED_RE.match(line)
+            if match:
+                self._timestamp = _timestamp(match.group(1))
+                line = match.group(2)
+
+        if line.endswith(b'\\'):
+            self._lines.append(line[:-1])
+            return
+        self._lines.append(line)
+        yield from self.flush()
+
+    def flush(self) -> Iterator[Dict[str, Any]]:
+        if self._lines:
+            command = _decode(b'\n'.join(self._lines)).strip()
+            if command:
+                yield self.entry(self._start, command, self._timestamp)
+        self._lines = []
+        self._timestamp = None
+
+
+class FishHistoryParser(HistoryParser):
+    """Historique fish : entrées « - cmd: ... » suivies de « when: ... » et « paths: »."""
+
+    shell_type = 'fish'
+
+    def __init__(self):
+        self._command: Optional[str] = None
+        self._timestamp: Optional[str] = None
+        self._start = 0
+
+    def feed(self, line_number: int, line: bytes) -> Iterator[Dict[str, Any]]:
+        if line.startswith(b'- cmd: '):
+            yield from self.flush()
+            self._start = line_number
+            self._command = FISH_ESCAPE_RE.sub(
+                lambda match: FISH_ESCAPES.get(match.group(1), match.group(0)), _decode(line[7:])
+            )
+        elif line.startswith(b'  when: ') and self._command is not None:
+            self._timestamp = _timestamp(line[8:].strip())
+
+    def flush(self) -> Iterator[Dict[str, Any]]:
+        if self._command:
+            yield self.entry(self._start, self._command, self._timestamp)
+        self._command = None
+        self._timestamp = None
+
+
+class TcshHistoryParser(HistoryParser):
+    """Historique tcsh : ligne « #+horodatage » facultative avant chaque commande."""
+
+    shell_type = 'tcsh'
+
+    def __init__(self):
+        self._timestamp: Optional[str] = None
+
+    def feed(self, line_number: int, line: bytes) -> Iterator[Dict[str, Any]]:
+        if line[:2] == b'#+' and line[2:].isdigit():
+            self._timestamp = _timestamp(line[2:])
+            return
+        command = _decode(line).strip()
+        if command and not command.startswith('#'):
+            yield self.entry(line_number, command, self._timestamp)
+        self._timestamp = None
+
+
+class KshHistoryParser(HistoryParser):
+    shell_type = 'ksh'
+
+
+# Fichiers d'historique (relatifs au répertoire personnel) et leur analyseur
+HISTORY_FILES: Dict[str, Type[HistoryParser]] = {
+    '.bash_history': BashHistoryParser,
+    '.zsh_history': ZshHistoryParser,
+    '.local/share/fish/fish_history': FishHistoryParser,
+    '.fish_history': FishHistoryParser,
+    '.tcsh_history': TcshHistoryParser,
+    '.history': TcshHistoryParser,
+    '.ksh_history': KshHistoryParser,
+    '.sh_history': KshHistoryParser,
+}
+
+
+def parser_for(path: str) -> HistoryParser:
+    """Analyseur adapté au nom du fichier d'historique (bash par défaut)."""
+    normalized = path.replace('\\', '/')
+    for name, parser_class in HISTORY_FILES.items():
+        if normalized.endswith('/' + name) or normalized == name:
+            return parser_class()
+    if 'zsh' in normalized:
+        return ZshHistoryParser()
+    if 'fish' in normalized:
+        return FishHistoryParser()
+    return BashHistoryParser()
+
+
+def parse_history(parser: HistoryParser, lines: Iterable[Tuple[int, bytes]]) -> Iterator[Dict[str, Any]]:
+    """Commandes de lignes (numéro, octets), la dernière étant terminée en fin de lecture."""
+    for line_number, line in lines:
+        yield from parser.feed(line_number, line)
+    yield from parser.flush()
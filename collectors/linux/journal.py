@@ -0,0 +1,248 @@
+"""
+Lecture structurée du journal systemd.
+
+Les entrées sont lues champ par champ (_PID, _UID, _COMM, __REALTIME_TIMESTAMP...)
+via la bibliothèque systemd-python si elle est installée, sinon depuis le
+format d'export de journalctl (« -o export »), qui est aussi celui des
+fichiers de test exportés. Les filtres sur les champs (SYSLOG_FACILITY,
+_SYSTEMD_UNIT...) sont appliqués par le journal lui-même et la lecture
+reprend après un curseur.
+"""
+
+import json
+import logging
+import struct
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+try:
+    from systemd import journal as systemd_journal
+except ImportError:
+    systemd_journal = None
+
+logger = logging.getLogger(__name__)
+
+# Filtres : champ -> valeur ou liste de valeurs (OU pour un même champ, ET entre champs)
+Matches = Dict[str, Union[str, int, List[Union[str, int]]]]
+
+# Niveaux syslog (PRIORITY) -> niveau Osiris
+PRIORITY_LEVELS = {
+    '0': 'error', '1': 'error', '2': 'error', '3': 'error',
+    '4': 'warning', '5': 'info', '6': 'info', '7': 'debug'
+}
+
+
+def parse_export_stream(stream: BinaryIO) -> Iterator[Dict[str, str]]:
+    """
+    Entrées du format d'export journald : champs « NOM=valeur », ou pour les
+    valeurs binaires « NOM », longueur sur 8 octets (petit-boutiste) et données ;
+    une ligne vide termine chaque entrée.
+    """
+    entry: Dict[str, str] = {}
+    readline = stream.readline
+    while True:
+        line = readline()
+        if not line:
+            break
+        if line == b'\n':
+            if entry:
+                yield entry
+                entry = {}
+            continue
+
+        separator = line.find(b'=')
+        if separator == -1:
+            name = line.rstrip(b'\n')
+            size = struct.unpack('<Q', stream.read(8))[0]
+            value = stream.read(size)
+            stream.read(1)
+        else:
+            name = line[:separator]
+            value = line[separator + 1:]
+            if value.endswith(b'\n'):
+                value = value[:-1]
+        entry[name.decode('ascii', 'replace')] = value.decode('utf-8', 'replace')
+
+    if entry:
+        yield entry
+
+
+def parse_json_stream(stream: BinaryIO) -> Iterator[Dict[str, str]]:
+    """Entrées de « journalctl -o json » (un objet JSON par ligne)."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError:
+            continue
+        entry = {}
+        for name, value in raw.items():
+            if isinstance(value, list):
+                # Valeur binaire (tableau d'octets) ou champ répété (première valeur)
+                if value and all(isinstance(item, int) for item in value):
+                    value = bytes(value).decode('utf-8', 'replace')
+                else:
+                    value = value[0] if value else ''
+            entry[name] = '' if value is None else str(value)
+        yield entry
+
+
+def read_journal_file(path: str) -> Iterator[Dict[str, str]]:
+    """Entrées d'un journal exporté (format export ou JSON, détecté au premier octet)."""
+    with open(path, 'rb') as f:
+        first = f.read(1)
+        f.seek(0)
+        parser = parse_json_stream if first == b'{' else parse_export_stream
+        yield from parser(f)
+
+
+def entry_matches(entry: Dict[str, str], matches: Optional[Matches]) -> bool:
+    """Vérifie une entrée contre les filtres (pour les journaux exportés)."""
+    for name, values in (matches or {}).items():
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        if entry.get(name) not in {str(value) for value in values}:
+            return False
+    return True
+
+
+def journal_entry_to_event(entry: Dict[str, str]) -> Dict[str, Any]:
+    """Convertit une entrée brute du journal en événement Osiris (horodatage exact)."""
+    realtime = entry.get('__REALTIME_TIMESTAMP')
+    timestamp = None
+    if realtime and realtime.isdigit():
+        timestamp = datetime.fromtimestamp(int(realtime) / 1_000_000, tz=timezone.utc).isoformat()
+
+    def as_int(name: str) -> Optional[int]:
+        value = entry.get(name)
+        return int(value) if value and value.lstrip('-').isdigit() else None
+
+    message = entry.get('MESSAGE', '')
+    return {
+        'timestamp': timestamp,
+        'realtime_usec': int(realtime) if realtime and realtime.isdigit() else None,
+        'hostname': entry.get('_HOSTNAME'),
+        'service': entry.get('SYSLOG_IDENTIFIER') or entry.get('_COMM'),
+        'pid': as_int('_PID'),
+        'uid': as_int('_UID'),
+        'gid': as_int('_GID'),
+        'comm': entry.get('_COMM'),
+        'exe': entry.get('_EXE'),
+        'cmdline': entry.get('_CMDLINE'),
+        'unit': entry.get('_SYSTEMD_UNIT'),
+        'facility': as_int('SYSLOG_FACILITY'),
+        'priority': as_int('PRIORITY'),
+        'boot_id': entry.get('_BOOT_ID'),
+        'message': message,
+        'level': PRIORITY_LEVELS.get(entry.get('PRIORITY', ''), 'info'),
+        'cursor': entry.get('__CURSOR')
+    }
+
+
+class JournalReader:
+    """Lecteur d'entrées du journal systemd avec filtres et reprise sur curseur."""
+
+    def __init__(self, matches: Optional[Matches] = None, directory: Optional[str] = None,
+                 files: Optional[List[str]] = None, timeout: Optional[float] = None):
+        """
+        Args:
+            matches: Filtres sur les champs, ex. {'SYSLOG_FACILITY': [4, 10], '_SYSTEMD_UNIT': 'ssh.service'}
+            directory: Répertoire de journaux à lire (analyse hors ligne)
+            files: Fichiers de journal à lire (analyse hors ligne)
+            timeout: Durée maximale (secondes) de lecture via journalctl
+        """
+        self.matches = matches or {}
+        self.directory = directory
+        self.files = files
+        self.timeout = timeout
+
+    def _match_pairs(self) -> List[str]:
+        pairs = []
+        for name, values in self.matches.items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            pairs.extend(f"{name}={value}" for value in values)
+        return pairs
+
+    def entries(self, cursor: Optional[str] = None, since: Optional[datetime] = None) -> Iterator[Dict[str, str]]:
+        """
+        Entrées postérieures au curseur, ou à since à défaut. Chaque entrée
+        contient son curseur (__CURSOR) pour la reprise.
+        """
+        if systemd_journal is not None:
+            yield from self._native_entries(cursor, since)
+        else:
+            yield from self._export_entries(cursor, since)
+
+    def _native_entries(self, cursor: Optional[str], since: Optional[datetime]) -> Iterator[Dict[str, str]]:
+        kwargs: Dict[str, Any] = {}
+        if self.directory:
+            kwargs['path'] = self.directory
+        if self.files:
+            kwargs['files'] = self.files
+        reader = systemd_journal.Reader(**kwargs)
+        try:
+            for pair in self._match_pairs():
+                reader.add_match(pair)
+
+            if cursor:
+                reader.seek_cursor(cursor)
+                # seek_cursor positionne sur l'entrée déjà lue : on la saute
+                entry = reader.get_next()
+                if entry and not reader.test_cursor(cursor):
+                    yield self._normalize(entry)
+            elif since is not None:
+                reader.seek_realtime(since)
+
+            for entry in reader:
+                yield self._normalize(entry)
+        finally:
+            reader.close()
+
+    @staticmethod
+    def _normalize(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Ramène les valeurs converties par systemd-python à leur forme texte du journal."""
+        normalized = {}
+        for name, value in entry.items():
+            if name == '__MONOTONIC_TIMESTAMP':
+                continue
+            if isinstance(value, datetime):
+                value = int(value.timestamp() * 1_000_000)
+            elif isinstance(value, bytes):
+                value = value.decode('utf-8', 'replace')
+            elif isinstance(value, list):
+                value = value[0] if value else ''
+            normalized[name] = str(value)
+        return normalized
+
+    def _export_entries(self, cursor: Optional[str], since: Optional[datetime]) -> Iterator[Dict[str, str]]:
+        cmd = ['journalctl', '--no-pager', '--output', 'export']
+        if self.directory:
+            cmd += ['--directory', self.directory]
+        for path in self.files or ():
+            cmd += ['--file', path]
+        if cursor:
+            cmd += ['--after-cursor', cursor]
+        elif since is not None:
+            cmd += ['--since', since.strftime('%Y-%m-%d %H:%M:%S')]
+        cmd += self._match_pairs()
+
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            logger.debug(f"Cannot run journalctl: {e}")
+            return
+
+        try:
+            yield from parse_export_stream(process.stdout)
+            process.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning("Timeout reading journal export")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
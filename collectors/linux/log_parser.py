@@ -0,0 +1,220 @@
+"""
+Analyse des lignes de logs Linux : syslog (RFC 3164 et horodatage RFC 3339
+de rsyslog), RFC 5424, dmesg et événements d'authentification.
+
+Les expressions régulières sont compilées une seule fois. Le niveau de
+sévérité et le type d'événement d'authentification sont déterminés par
+recherche de sous-chaînes dans une seule copie en minuscules de la ligne
+(plus rapide qu'une expression insensible à la casse avec le moteur re). La
+conversion des horodatages est mise en cache par minute.
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from .journal import PRIORITY_LEVELS
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
+}
+
+# Mots-clés de sévérité, par priorité décroissante (le premier trouvé l'emporte)
+SEVERITY_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('error', ('error', 'failed', 'failure')),
+    ('warning', ('warn',)),
+    ('debug', ('debug',)),
+)
+
+# Mots-clés identifiant une ligne d'authentification
+AUTH_KEYWORDS = (
+    'authentication failure', 'authentication success', 'login', 'logout',
+    'ssh', 'su:', 'sudo:', 'pam_', 'password'
+)
+
+# Types d'événements d'authentification, par priorité décroissante
+AUTH_EVENT_TYPES = (
+    ('auth_failure', 'authentication failure'),
+    ('auth_success', 'authentication success'),
+    ('login', 'login'),
+    ('logout', 'logout'),
+    ('ssh', 'ssh'),
+)
+
+_SYSLOG_PATTERN = (
+    r'^(?:(?P<bsd>[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d)|(?P<iso>\d{4}-\d\d-\d\dT\S+))'
+    r' (?P<host>\S+) (?P<tag>[^:\[\s]+)(?:\[(?P<pid>\d+)\])?: ?(?P<msg>.*)'
+)
+_RFC5424_PATTERN = (
+    r'^<(?P<pri>\d{1,3})>1 (?P<ts>\S+) (?P<host>\S+) (?P<app>\S+) (?P<procid>\S+) '
+    r'(?P<msgid>\S+) (?P<sd>-|(?:\[.*?\])+) ?(?P<msg>.*)'
+)
+_DMESG_PATTERN = r'^\[\s*(?P<ts>\d+\.\d+)\]\s*(?P<msg>.*)'
+
+SYSLOG_RE = re.compile(_SYSLOG_PATTERN)
+RFC5424_RE = re.compile(_RFC5424_PATTERN)
+DMESG_RE = re.compile(_DMESG_PATTERN)
+
+# Utilisateur visé : « for [invalid user] alice », « user bob », « by carol »
+# (mot précédé d'une espace : pas de \b, coûteux pour le moteur d'expressions)
+USER_RE = re.compile(r' (?:for|by|user) (?:invalid user |user )?([^\s(]+)')
+
+# Taille maximale du cache des horodatages convertis (une entrée par minute)
+TIMESTAMP_CACHE_SIZE = 65536
+
+
+def classify_severity(message: str) -> str:
+    """Niveau d'une ligne d'après ses mots-clés (une seule copie en minuscules)."""
+    lowered = message.lower()
+    for level, keywords in SEVERITY_KEYWORDS:
+        for keyword in keywords:
+            if keyword in lowered:
+                return level
+    return 'info'
+
+
+def classify_auth(line: str) -> Optional[str]:
+    """Type d'événement d'authentification de la ligne, None si elle n'en est pas un."""
+    lowered = line.lower()
+    for keyword in AUTH_KEYWORDS:
+        if keyword in lowered:
+            break
+    else:
+        return None
+    for event_type, keyword in AUTH_EVENT_TYPES:
+        if keyword in lowered:
+            return event_type
+    return 'unknown'
+
+
+def extract_user(line: str) -> str:
+    match = USER_RE.search(line)
+    return 'unknown' if match is None else match.group(1)
+
+
+class YearInference:
+    """
+    Année des horodatages syslog qui n'en ont pas : celle de la référence
+    (date de lecture ou de modification du fichier), ou la précédente pour
+    un mois postérieur à la référence (logs de décembre lus en janvier).
+    """
+
+    def __init__(self, reference: Optional[datetime] = None):
+        """
+        Args:
+            reference: Date de référence, None pour la date courante à chaque inférence
+        """
+        self.reference = reference
+
+    def year(self, month: int) -> int:
+        reference = self.reference or datetime.now()
+        return reference.year - 1 if month > reference.month else reference.year
+
+
+class LogParser:
+    """Analyseur de lignes de logs avec inférence d'année et cache d'horodatages."""
+
+    def __init__(self, reference: Optional[datetime] = None):
+        """
+        Args:
+            reference: Date de référence pour l'année des horodatages syslog (date courante par défaut)
+        """
+        self.years = YearInference(reference)
+        self._timestamps: Dict[str, Optional[str]] = {}
+
+    def syslog_timestamp(self, value) -> Optional[str]:
+        """
+        Horodatage « Jan 15 10:30:45 » (texte ou octets) en ISO 8601. La partie
+        jusqu'à la minute est convertie une fois puis mise en cache.
+        """
+        text = value.decode('ascii') if isinstance(value, bytes) else value
+        minute = text[:12]
+        prefix = self._timestamps.get(minute)
+        if prefix is None:
+            if minute in self._timestamps:
+                return None
+            month = MONTHS.get(text[:3])
+            try:
+                prefix = datetime(
+                    self.years.year(month), month, int(text[4:6]), int(text[7:9]), int(text[10:12])
+                ).isoformat()[:-2] if month else None
+            except ValueError:
+                prefix = None
+            if len(self._timestamps) >= TIMESTAMP_CACHE_SIZE:
+                self._timestamps.clear()
+            self._timestamps[minute] = prefix
+            if prefix is None:
+                return None
+        return prefix + text[13:15]
+
+    def parse_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Analyse une ligne syslog (RFC 3164, RFC 3339 ou RFC 5424)."""
+        match = SYSLOG_RE.match(line)
+        if match is not None:
+            bsd, iso, hostname, service, pid, message = match.groups()
+            return {
+                'timestamp': self.syslog_timestamp(bsd) if bsd else iso,
+                'hostname': hostname,
+                'service': service,
+                'pid': int(pid) if pid else None,
+                'message': message,
+                'level': classify_severity(message),
+                'raw_line': line
+            }
+
+        match = RFC5424_RE.match(line)
+        if match is not None:
+            pri, timestamp, hostname, app, procid, msgid, _, message = match.groups()
+            return {
+                'timestamp': None if timestamp == '-' else timestamp,
+                'hostname': None if hostname == '-' else hostname,
+                'service': None if app == '-' else app,
+                'pid': int(procid) if procid.isdigit() else None,
+                'msgid': None if msgid == '-' else msgid,
+                'facility': int(pri) >> 3,
+                'message': message,
+                'level': PRIORITY_LEVELS[str(int(pri) & 7)],
+                'raw_line': line
+            }
+        return None
+
+    def parse_dmesg_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Analyse une ligne dmesg « [secondes] message »."""
+        match = DMESG_RE.match(line)
+        if match is None:
+            return None
+        timestamp, message = match.groups()
+        return {
+            'timestamp': float(timestamp),
+            'message': message,
+            'level': classify_severity(message),
+            'raw_line': line
+        }
+
+    def parse_auth_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Analyse une ligne d'authentification, None si elle n'en est pas une."""
+        event_type = classify_auth(line)
+        if event_type is None:
+            return None
+        match = SYSLOG_RE.match(line)
+        if match is not None:
+            bsd, iso, hostname, service, pid, _ = match.groups()
+            timestamp = self.syslog_timestamp(bsd) if bsd else iso
+        else:
+            parts = line.split(None, 3)
+            if len(parts) < 4:
+                return None
+            timestamp = ' '.join(parts[:3])
+            hostname = service = pid = None
+        return {
+            'type': 'auth_log',
+            'event_type': event_type,
+            'timestamp': timestamp,
+            'hostname': hostname,
+            'service': service,
+            'pid': int(pid) if pid else None,
+            'user': extract_user(line),
+            'raw_line': line,
+            'source': 'auth_log'
+        }
@@ -0,0 +1,271 @@
+"""
+Lecture incrémentale des fichiers de logs et du journal systemd.
+
+Pour chaque fichier, la position de lecture (périphérique, inode, offset) est
+conservée entre deux collectes, et éventuellement persistée dans un fichier
+d'état : seuls les octets ajoutés depuis la dernière lecture sont lus, par
+blocs de grande taille. Une rotation (changement d'inode) termine la lecture de
+l'ancien fichier s'il est retrouvé ; une troncature ou une réécriture sur place
+(détectée par l'empreinte des octets précédant la position) reprend au début.
+Pour journald, le curseur de la dernière entrée lue est conservé de la même façon.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from .journal import JournalReader, Matches
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Taille des blocs lus dans les fichiers de logs
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Nombre d'octets précédant la position de lecture servant d'empreinte
+FINGERPRINT_SIZE = 64
+
+# Extensions des archives de rotation compressées (inode différent, non lues)
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz', '.zst')
+
+
+class LogTailer:
+    """Positions de lecture des fichiers de logs et curseurs journald."""
+
+    def __init__(self, state_file: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 initial_bytes: Optional[int] = None):
+        """
+        Args:
+            state_file: Fichier JSON où persister les positions, None pour les garder en mémoire
+            chunk_size: Taille (octets) des blocs lus
+            initial_bytes: Pour un fichier jamais lu, nombre d'octets lus depuis la fin
+                           (None pour lire le fichier entier)
+        """
+        self.state_file = state_file
+        self.chunk_size = chunk_size
+        self.initial_bytes = initial_bytes
+
+        self._files: Dict[str, Dict[str, int]] = {}
+        self._journal: Dict[str, str] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        self.bytes_read = 0
+        self.lines_read = 0
+        self.rotations = 0
+        self.truncations = 0
+
+        if state_file:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self._files = state.get('files', {})
+            self._journal = state.get('journal', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading log tailer state from {self.state_file}: {e}")
+
+    def save(self):
+        """Persiste les positions si elles ont changé (écriture atomique)."""
+        if not self.state_file or not self._dirty:
+            return
+        with self._lock:
+            # Copie : les positions peuvent avancer pendant l'écriture (lectures concurrentes),
+            # l'indicateur est donc effacé avant la copie et non après l'écriture
+            self._dirty = False
+            state = {
+                'files': {key: dict(value) for key, value in list(self._files.items())},
+                'journal': dict(self._journal)
+            }
+            tmp_file = f"{self.state_file}.tmp"
+            try:
+                directory = os.path.dirname(self.state_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(tmp_file, self.state_file)
+            except OSError as e:
+                self._dirty = True
+                logger.error(f"Error saving log tailer state to {self.state_file}: {e}")
+
+    def reset(self, path: Optional[str] = None):
+        """Oublie la position d'un fichier (ou toutes les positions)."""
+        with self._lock:
+            if path is None:
+                self._files.clear()
+                self._journal.clear()
+            else:
+                self._files.pop(os.path.abspath(path), None)
+            self._dirty = True
+
+    def read_lines(self, path: str) -> Iterator[str]:
+        """
+        Lignes ajoutées au fichier depuis la dernière lecture. La position avance
+        au fil des lignes consommées ; une dernière ligne incomplète est relue
+        à la collecte suivante.
+        """
+        for _, line in self.read_raw_lines(path):
+            yield line.decode('utf-8', 'replace')
+
+    def read_raw_lines(self, path: str) -> Iterator[Tuple[int, bytes]]:
+        """(numéro de ligne, octets) des lignes ajoutées depuis la dernière lecture."""
+        for state, block in self._blocks(path):
+            lines = block.split(b'\n')
+            lines.pop()
+            for line in lines:
+                state['offset'] += len(line) + 1
+                state['line'] += 1
+                self.lines_read += 1
+                yield state['line'], line.rstrip(b'\r')
+
+    def follow(self, path: str, parser: Callable[[str], Optional[T]]) -> Iterator[T]:
+        """Événements parsés des nouvelles lignes du fichier (lignes non reconnues ignorées)."""
+        for line in self.read_lines(path):
+            event = parser(line)
+            if event is not None:
+                yield event
+
+    def _blocks(self, path: str) -> Iterator[Tuple[Dict[str, int], bytes]]:
+        """
+        (état, bloc) des octets non lus du fichier, rotation et troncature
+        comprises. À chaque bloc, state['offset'] désigne son début : l'appelant
+        l'avance de ce qu'il a consommé.
+        """
+        key = os.path.abspath(path)
+        try:
+            f = open(path, 'rb')
+        except OSError as e:
+            logger.debug(f"Cannot open {path}: {e}")
+            return
+
+        try:
+            with f:
+                st = os.fstat(f.fileno())
+                state = self._files.get(key)
+                skip_partial = False
+
+                if state is None:
+                    offset = 0
+                    if self.initial_bytes is not None and st.st_size > self.initial_bytes:
+                        # Un octet de plus : la première ligne lue, tronquée ou vide, est ignorée
+                        offset = st.st_size - self.initial_bytes - 1
+                        skip_partial = True
+                elif state['inode'] != st.st_ino or state['dev'] != st.st_dev:
+                    # Rotation : fin de l'ancien fichier, puis le nouveau depuis le début
+                    self.rotations += 1
+                    rotated = self._find_rotated(path, state)
+                    if rotated:
+                        try:
+                            with open(rotated, 'rb') as old:
+                                yield from self._read_blocks(old, state, state['offset'])
+                        except OSError as e:
+                            logger.warning(f"Cannot read rotated log {rotated}: {e}")
+                    offset = 0
+                elif st.st_size < state['offset'] or self._rewritten(f, state):
+                    # Troncature (copytruncate) ou contenu réécrit : reprise au début
+                    self.truncations += 1
+                    offset = 0
+                else:
+                    offset = state['offset']
+
+                line = state.get('line', 0) if state and offset else 0
+                state = {'dev': st.st_dev, 'inode': st.st_ino, 'offset': offset, 'line': line}
+                self._files[key] = state
+                self._dirty = True
+                try:
+                    yield from self._read_blocks(f, state, offset, skip_partial)
+                finally:
+                    state['fingerprint'] = self._fingerprint(f, state['offset'])
+                    # Après la mise à jour : un save() d'un autre thread pendant la lecture a pu effacer l'indicateur
+                    self._dirty = True
+        finally:
+            self.save()
+
+    @staticmethod
+    def _fingerprint(f, offset: int) -> int:
+        """Empreinte des octets précédant la position de lecture."""
+        start = max(0, offset - FINGERPRINT_SIZE)
+        f.seek(start)
+        return zlib.crc32(f.read(offset - start))
+
+    def _rewritten(self, f, state: Dict[str, int]) -> bool:
+        """Vrai si les octets précédant la position enregistrée ont changé (fichier réécrit sur place)."""
+        fingerprint = state.get('fingerprint')
+        return bool(state['offset']) and fingerprint is not None and self._fingerprint(f, state['offset']) != fingerprint
+
+    def _read_blocks(self, f, state: Dict[str, int], offset: int,
+                     skip_partial: bool = False) -> Iterator[Tuple[Dict[str, int], bytes]]:
+        f.seek(offset)
+        state['offset'] = offset
+        state.setdefault('line', 0)
+        pending = b''
+        while True:
+            chunk = f.read(self.chunk_size)
+            if not chunk:
+                break
+            self.bytes_read += len(chunk)
+            if pending:
+                chunk = pending + chunk
+            end = chunk.rfind(b'\n') + 1
+            block, pending = chunk[:end], chunk[end:]
+            if skip_partial and block:
+                # Première ligne d'une lecture démarrée au milieu du fichier
+                skip = block.index(b'\n') + 1
+                state['offset'] += skip
+                block = block[skip:]
+                skip_partial = False
+            if block:
+                yield state, block
+
+    def _find_rotated(self, path: str, state: Dict[str, int]) -> Optional[str]:
+        """Retrouve l'ancien fichier (même inode) après rotation : auth.log.1, messages-20240101..."""
+        for candidate in sorted(glob.glob(glob.escape(path) + '[.-]*')):
+            if candidate.endswith(COMPRESSED_SUFFIXES):
+                continue
+            try:
+                st = os.stat(candidate)
+            except OSError:
+                continue
+            if st.st_ino == state['inode'] and st.st_dev == state['dev']:
+                return candidate
+        return None
+
+    def journal_entries(self, key: str, matches: Optional[Matches] = None, since: Optional[datetime] = None,
+                        timeout: Optional[float] = None) -> Iterator[Dict[str, str]]:
+        """
+        Entrées journald postérieures au dernier curseur enregistré sous key.
+        Sans curseur, la lecture démarre à since. Le curseur avance au fil des
+        entrées consommées.
+        """
+        reader = JournalReader(matches, timeout=timeout)
+        try:
+            for entry in reader.entries(cursor=self._journal.get(key), since=since):
+                cursor = entry.get('__CURSOR')
+                if cursor:
+                    self._journal[key] = cursor
+                    self._dirty = True
+                self.lines_read += 1
+                yield entry
+        finally:
+            self.save()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'files': len(self._files),
+            'journal_cursors': len(self._journal),
+            'bytes_read': self.bytes_read,
+            'lines_read': self.lines_read,
+            'rotations': self.rotations,
+            'truncations': self.truncations
+        }
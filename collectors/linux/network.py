@@ -6,14 +6,16 @@ Collecte les connexions réseau, interfaces, etc.
 import os
 import re
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from .base import LinuxCollector
+from .socket_table import Socket, SocketTableReader, format_endpoint
 
 class NetworkCollector(LinuxCollector):
     """Collecteur pour les informations réseau Linux"""
     
     def __init__(self):
         super().__init__()
+        self.socket_reader = SocketTableReader()
     
     def collect(self) -> Dict[str, Any]:
         """Collecte les informations réseau"""
@@ -45,7 +47,7 @@ class NetworkCollector(LinuxCollector):
         results['arp_table'] = self._collect_arp_table()
         
         # Collecter les ports en écoute
-        results['listening_ports'] = self._collect_listening_ports()
+        results['listening_ports'] = self._collect_listening_ports(results['connections'])
         
         # Analyser les connexions suspectes
         results['suspicious_connections'] = self._analyze_suspicious_connections(results['connections'])
@@ -141,58 +143,47 @@ class NetworkCollector(LinuxCollector):
         
         return stats
     
-    def _collect_network_connections(self) -> List[Dict[str, Any]]:
-        """Collecte les connexions réseau"""
+    def _collect_network_connections(self, states: Optional[List[str]] = None,
+                                     ports: Optional[List[int]] = None,
+                                     protocols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Collecte les connexions réseau (tables de /proc/net, filtres appliqués à la lecture)"""
         connections = []
         
         try:
-            # Utiliser ss pour les connexions
-            result = self.execute_command(['ss', '-tuln', '--numeric'])
-            
-            if result['success']:
-                lines = result['stdout'].split('\n')
-                
-                for line in lines[1:]:  # Ignorer l'en-tête
-                    if line.strip():
-                        # Parse: tcp    LISTEN 0      128    127.0.0.1:631       0.0.0.0:*
-                        parts = line.split()
-                        if len(parts) >= 5:
-                            connection = {
-                                'protocol': parts[0],
-                                'state': parts[1],
-                                'recv_q': int(parts[2]),
-                                'send_q': int(parts[3]),
-                                'local_address': parts[4],
-                                'peer_address': parts[5] if len(parts) > 5 else '*:*'
-                            }
-                            connections.append(connection)
-            
-            # Collecter les connexions établies avec ss -tuln
-            result = self.execute_command(['ss', '-tuln', '--numeric', '--processes'])
-            
-            if result['success']:
-                lines = result['stdout'].split('\n')
-                
-                for line in lines[1:]:
-                    if line.strip():
-                        # Parse avec processus: tcp    ESTAB 0      0      192.168.1.100:22      192.168.1.1:12345    users:(("sshd",pid=1234,fd=3))
-                        match = re.search(r'users:\(\("([^"]+)",pid=(\d+),fd=(\d+)\)\)', line)
-                        if match:
-                            # Trouver la connexion correspondante
-                            for conn in connections:
-                                if conn['local_address'] in line and conn['peer_address'] in line:
-                                    conn['process'] = {
-                                        'name': match.group(1),
-                                        'pid': int(match.group(2)),
-                                        'fd': int(match.group(3))
-                                    }
-                                    break
+            for entry in self.socket_reader.read(protocols=protocols, states=states, ports=ports):
+                connections.append(self._connection_from_socket(entry))
         
         except Exception as e:
             self.logger.error(f"Erreur lors de la collecte des connexions réseau: {e}")
         
         return connections
     
+    def collect_connections(self, states: Optional[List[str]] = None, ports: Optional[List[int]] = None,
+                            protocols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Collecte uniquement les connexions réseau, filtrées sur l'état, le port et le protocole"""
+        return self._collect_network_connections(states=states, ports=ports, protocols=protocols)
+    
+    def _connection_from_socket(self, entry: Socket) -> Dict[str, Any]:
+        """Connexion au format de ss (adresses « ip:port ») avec ports et processus"""
+        return {
+            'protocol': entry.protocol,
+            'family': entry.family,
+            'state': entry.state,
+            'recv_q': entry.recv_q,
+            'send_q': entry.send_q,
+            'local_address': format_endpoint(entry.local_address, entry.local_port),
+            'peer_address': format_endpoint(entry.peer_address, entry.peer_port) if entry.peer_port else '*:*',
+            'local_port': entry.local_port,
+            'peer_port': entry.peer_port,
+            'uid': entry.uid,
+            'inode': entry.inode,
+            'process': {
+                'name': entry.process,
+                'pid': entry.pid,
+                'fd': entry.fd
+            } if entry.pid is not None else None
+        }
+    
     def _collect_routing_table(self) -> Dict[str, Any]:
         """Collecte la table de routage"""
         routing = {}
@@ -293,42 +284,19 @@ class NetworkCollector(LinuxCollector):
         
         return arp_table
     
-    def _collect_listening_ports(self) -> List[Dict[str, Any]]:
-        """Collecte les ports en écoute"""
+    def _collect_listening_ports(self, connections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Ports en écoute (TCP LISTEN et UDP non connecté) parmi les connexions collectées"""
         listening_ports = []
         
-        try:
-            # Utiliser ss pour les ports en écoute
-            result = self.execute_command(['ss', '-tuln', '--listening', '--numeric', '--processes'])
-            
-            if result['success']:
-                lines = result['stdout'].split('\n')
-                
-                for line in lines[1:]:  # Ignorer l'en-tête
-                    if line.strip():
-                        # Parse: tcp    LISTEN 0      128    127.0.0.1:631       0.0.0.0:*    users:(("cupsd",pid=1234,fd=3))
-                        parts = line.split()
-                        if len(parts) >= 5:
-                            port_info = {
-                                'protocol': parts[0],
-                                'state': parts[1],
-                                'local_address': parts[4],
-                                'process': None
-                            }
-                            
-                            # Extraire les informations du processus
-                            match = re.search(r'users:\(\("([^"]+)",pid=(\d+),fd=(\d+)\)\)', line)
-                            if match:
-                                port_info['process'] = {
-                                    'name': match.group(1),
-                                    'pid': int(match.group(2)),
-                                    'fd': int(match.group(3))
-                                }
-                            
-                            listening_ports.append(port_info)
-        
-        except Exception as e:
-            self.logger.error(f"Erreur lors de la collecte des ports en écoute: {e}")
+        for conn in connections:
+            if conn['state'] == 'LISTEN' or (conn['protocol'] == 'udp' and conn['state'] == 'UNCONN'):
+                listening_ports.append({
+                    'protocol': conn['protocol'],
+                    'state': conn['state'],
+                    'local_address': conn['local_address'],
+                    'local_port': conn['local_port'],
+                    'process': conn['process']
+                })
         
         return listening_ports
     
@@ -368,14 +336,9 @@ class NetworkCollector(LinuxCollector):
             local_addr = conn.get('local_address', '')
             peer_addr = conn.get('peer_address', '')
             
-            for addr in [local_addr, peer_addr]:
-                if ':' in addr:
-                    try:
-                        port = int(addr.split(':')[1])
-                        if port in suspicious_ports:
-                            suspicious_flags.append(f"Port suspect: {port} ({suspicious_ports[port]})")
-                    except:
-                        pass
+            for port in (conn.get('local_port'), conn.get('peer_port')):
+                if port in suspicious_ports:
+                    suspicious_flags.append(f"Port suspect: {port} ({suspicious_ports[port]})")
             
             # Vérifier les adresses suspectes
             for pattern in suspicious_patterns:
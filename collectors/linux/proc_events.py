@@ -0,0 +1,217 @@
+"""
+Événements de création et de fin de processus Linux.
+
+Le connecteur de processus du noyau (netlink, NETLINK_CONNECTOR) notifie
+chaque fork, exec et exit, y compris pour les processus trop brefs pour
+apparaître dans un relevé de la table des processus. Il nécessite
+CAP_NET_ADMIN ; à défaut (tests sans privilèges, conteneurs), les
+événements sont déduits par comparaison de relevés successifs de /proc.
+
+Les événements exec sont enrichis (ligne de commande, exécutable, parent,
+utilisateur) par une lecture de /proc mise en cache, qui sert aussi à
+décrire les processus à leur fin, lorsque /proc/<pid> a disparu.
+"""
+
+import logging
+import os
+import socket
+import struct
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Connecteur de processus (linux/connector.h, linux/cn_proc.h)
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+NLMSG_DONE = 3
+
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+
+NLMSG_HEADER = struct.Struct('=IHHII')
+CN_MSG_HEADER = struct.Struct('=IIIIHH')
+PROC_EVENT_HEADER = struct.Struct('=IIQ')
+PROC_EVENT_OFFSET = NLMSG_HEADER.size + CN_MSG_HEADER.size
+PROC_EVENT_DATA = PROC_EVENT_OFFSET + PROC_EVENT_HEADER.size
+
+# Taille du tampon de réception du socket netlink (rafales de fork)
+RECEIVE_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Nombre de processus gardés dans le cache d'enrichissement
+PROCESS_CACHE_SIZE = 8192
+
+
+class ProcessInfoCache:
+    """Informations /proc des processus (cmdline, exe, ppid, uid), en cache LRU borné."""
+
+    def __init__(self, proc_root: str = '/proc', size: int = PROCESS_CACHE_SIZE):
+        self.proc_root = proc_root
+        self.size = size
+        self._cache: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+
+    def read(self, pid: int) -> Dict[str, Any]:
+        """Relit /proc/<pid> (après un exec) et met le cache à jour."""
+        base = os.path.join(self.proc_root, str(pid))
+        info: Dict[str, Any] = {'name': None, 'cmdline': None, 'exe': None, 'ppid': None, 'uid': None}
+
+        try:
+            with open(os.path.join(base, 'status'), 'r') as f:
+                for line in f:
+                    if line.startswith('Name:'):
+                        info['name'] = line[5:].strip()
+                    elif line.startswith('PPid:'):
+                        info['ppid'] = int(line[5:])
+                    elif line.startswith('Uid:'):
+                        info['uid'] = int(line[4:].split()[0])
+                        break
+        except (OSError, ValueError):
+            # Processus déjà terminé : informations du cache (fork) si disponibles
+            return dict(self._cache.get(pid, info))
+
+        try:
+            with open(os.path.join(base, 'cmdline'), 'rb') as f:
+                info['cmdline'] = f.read().rstrip(b'\0').replace(b'\0', b' ').decode('utf-8', 'replace')
+        except OSError:
+            pass
+        try:
+            info['exe'] = os.readlink(os.path.join(base, 'exe'))
+        except OSError:
+            pass
+
+        self.put(pid, info)
+        return dict(info)
+
+    def get(self, pid: int) -> Optional[Dict[str, Any]]:
+        info = self._cache.get(pid)
+        return dict(info) if info is not None else None
+
+    def put(self, pid: int, info: Dict[str, Any]):
+        self._cache[pid] = info
+        self._cache.move_to_end(pid)
+        if len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+
+    def pop(self, pid: int) -> Optional[Dict[str, Any]]:
+        return self._cache.pop(pid, None)
+
+
+class ProcConnector:
+    """Abonnement netlink au connecteur de processus du noyau."""
+
+    def __init__(self, timeout: float = 1.0):
+        """
+        Args:
+            timeout: Durée maximale d'attente d'un message (secondes)
+
+        Raises:
+            OSError: Netlink indisponible ou privilèges insuffisants (CAP_NET_ADMIN)
+        """
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+            self.sock.bind((0, CN_IDX_PROC))
+            self._send_control(PROC_CN_MCAST_LISTEN)
+            self.sock.settimeout(timeout)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def _send_control(self, operation: int):
+        payload = struct.pack('=I', operation)
+        message = (
+            NLMSG_HEADER.pack(PROC_EVENT_OFFSET + len(payload), NLMSG_DONE, 0, 0, 0)
+            + CN_MSG_HEADER.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0)
+            + payload
+        )
+        self.sock.send(message)
+
+    def close(self):
+        try:
+            self._send_control(PROC_CN_MCAST_IGNORE)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def receive(self) -> List[Dict[str, Any]]:
+        """
+        Événements bruts du prochain message (liste vide à l'expiration du délai).
+        Seuls les processus sont retenus, pas les threads.
+
+        Raises:
+            OSError: Erreur de réception, dont ENOBUFS si des événements ont été perdus
+        """
+        try:
+            data = self.sock.recv(65536)
+        except socket.timeout:
+            return []
+        return list(self.parse(data))
+
+    @staticmethod
+    def parse(data: bytes) -> Iterator[Dict[str, Any]]:
+        """Événements fork, exec et exit d'un tampon de messages netlink."""
+        offset = 0
+        while offset + PROC_EVENT_DATA <= len(data):
+            length = NLMSG_HEADER.unpack_from(data, offset)[0]
+            if length < PROC_EVENT_DATA:
+                break
+            what, _, timestamp_ns = PROC_EVENT_HEADER.unpack_from(data, offset + PROC_EVENT_OFFSET)
+            body = offset + PROC_EVENT_DATA
+
+            if what == PROC_EVENT_FORK:
+                parent_pid, parent_tgid, child_pid, child_tgid = struct.unpack_from('=4I', data, body)
+                if child_pid == child_tgid:
+                    yield {'event': 'fork', 'pid': child_tgid, 'ppid': parent_tgid,
+                           'monotonic_ns': timestamp_ns}
+            elif what == PROC_EVENT_EXEC:
+                pid, tgid = struct.unpack_from('=2I', data, body)
+                if pid == tgid:
+                    yield {'event': 'exec', 'pid': tgid, 'monotonic_ns': timestamp_ns}
+            elif what == PROC_EVENT_EXIT:
+                pid, tgid, exit_code, exit_signal = struct.unpack_from('=4I', data, body)
+                if pid == tgid:
+                    # exit_code est le statut de wait() : code de sortie et signal éventuel
+                    yield {'event': 'exit', 'pid': tgid, 'exit_code': exit_code >> 8,
+                           'signal': exit_code & 0x7f or None, 'monotonic_ns': timestamp_ns}
+
+            offset += (length + 3) & ~3
+
+
+class ProcPoller:
+    """Événements déduits de relevés successifs de /proc (sans privilèges)."""
+
+    def __init__(self, proc_root: str = '/proc'):
+        self.proc_root = proc_root
+        self._pids: Optional[Set[int]] = None
+
+    def _list_pids(self) -> Set[int]:
+        pids = set()
+        with os.scandir(self.proc_root) as entries:
+            for entry in entries:
+                if entry.name.isdigit():
+                    pids.add(int(entry.name))
+        return pids
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Processus apparus (exec) et disparus (exit) depuis le relevé précédent."""
+        pids = self._list_pids()
+        previous, self._pids = self._pids, pids
+        if previous is None:
+            return []
+        events = [{'event': 'exec', 'pid': pid} for pid in sorted(pids - previous)]
+        events.extend({'event': 'exit', 'pid': pid, 'exit_code': None, 'signal': None}
+                      for pid in sorted(previous - pids))
+        return events
+
+
+def boot_time() -> Optional[float]:
+    """Date de démarrage (epoch) pour convertir les horodatages monotones du noyau."""
+    try:
+        return time.time() - time.clock_gettime(time.CLOCK_MONOTONIC)
+    except (AttributeError, OSError):
+        return None
@@ -4,11 +4,25 @@ Collecte les informations sur les processus en cours d'exécution
 """
 
 import os
-import re
 import psutil
 from datetime import datetime
 from typing import Dict, List, Any
 from .base import LinuxCollector
+from ..pattern_matcher import RegexMatcher
+
+# Patterns de noms de processus suspects
+SUSPICIOUS_PROCESS_NAMES = RegexMatcher([
+    r'\b(nc|netcat|ncat)\b',
+    r'\b(ssh|sshd)\b',
+    r'\b(telnet|rsh|rlogin)\b',
+    r'\b(backdoor|trojan|malware|virus)\b',
+    r'\b(keylogger|logger)\b',
+    r'\b(miner|mining)\b',
+    r'\b(bot|botnet)\b',
+    r'\b(shell|reverse)\b',
+    r'\b(exploit|payload)\b',
+    r'\b(stealer|spyware)\b'
+])
 
 class ProcessesCollector(LinuxCollector):
     """Collecteur pour les processus Linux (multi-OS safe)"""
@@ -252,35 +266,17 @@ class ProcessesCollector(LinuxCollector):
         """Analyse les processus suspects"""
         suspicious_processes = []
         
-        # Patterns de noms de processus suspects
-        suspicious_names = [
-            r'\b(nc|netcat|ncat)\b',
-            r'\b(ssh|sshd)\b',
-            r'\b(telnet|rsh|rlogin)\b',
-            r'\b(backdoor|trojan|malware|virus)\b',
-            r'\b(keylogger|logger)\b',
-            r'\b(miner|mining)\b',
-            r'\b(bot|botnet)\b',
-            r'\b(shell|reverse)\b',
-            r'\b(exploit|payload)\b',
-            r'\b(stealer|spyware)\b'
-        ]
-        
-        # Compiler les patterns
-        compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in suspicious_names]
-        
         for proc in processes:
             suspicious_flags = []
             
             # Vérifier le nom du processus
             proc_name = proc.get('name', '').lower()
-            for pattern in compiled_patterns:
-                if pattern.search(proc_name):
-                    suspicious_flags.append(f"Nom suspect: {proc_name}")
+            for _ in SUSPICIOUS_PROCESS_NAMES.match_indices(proc_name):
+                suspicious_flags.append(f"Nom suspect: {proc_name}")
             
             # Vérifier la ligne de commande
             cmdline = ' '.join(proc.get('cmdline', [])).lower()
-            if any(pattern.search(cmdline) for pattern in compiled_patterns):
+            if SUSPICIOUS_PROCESS_NAMES.search(cmdline):
                 suspicious_flags.append("Ligne de commande suspecte")
             
             # Vérifier les connexions réseau
@@ -1,28 +1,54 @@
 """
 Collecteur pour l'historique des shells Linux
-Collecte .bash_history, .zsh_history, etc. avec support des timestamps
+Collecte .bash_history, .zsh_history, fish_history, etc. avec support des timestamps
 """
 
 import os
-import re
-import pwd
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Tuple
 from .base import LinuxCollector
+from .history_parser import HISTORY_FILES, parse_history, parser_for
+from .log_tailer import LogTailer
+from ..pattern_matcher import RegexMatcher
+
+# Patterns de commandes suspectes
+SUSPICIOUS_COMMAND_PATTERNS = RegexMatcher([
+    r'\b(wget|curl)\s+.*\b(http|https)://',
+    r'\b(nc|netcat|ncat)\s+.*\b(connect|listen)',
+    r'\b(ssh|scp)\s+.*\b(root@|admin@)',
+    r'\b(telnet|rsh|rlogin)\b',
+    r'\b(sudo|su)\s+.*\b(root|admin)',
+    r'\b(chmod|chown)\s+.*\b777|666',
+    r'\b(rm|del)\s+.*\b(-rf|/rf)',
+    r'\b(passwd|password)\s+.*\b(root|admin)',
+    r'\b(service|systemctl)\s+.*\b(stop|disable)',
+    r'\b(ufw|iptables)\s+.*\b(disable|stop)',
+    r'\b(crontab|at)\s+.*\b(-e|-r)',
+    r'\b(ssh-keygen|ssh-copy-id)',
+    r'\b(base64|openssl)\s+.*\b(decode|decrypt)',
+    r'\b(python|perl|ruby)\s+.*\b(-c|-e)',
+    r'\b(eval|exec)\s+.*\b(\$|`)',
+    r'\b(echo|printf)\s+.*\b(\$|`)',
+    r'\b(backdoor|trojan|malware|virus)\b',
+    r'\b(keylogger|logger|spy)\b',
+    r'\b(exploit|payload|shell)\b',
+    r'\b(miner|mining)\b'
+])
 
 class ShellHistoryCollector(LinuxCollector):
-    """Collecteur pour l'historique des shells Linux"""
+    """
+    Collecteur pour l'historique des shells Linux
+    Les fichiers sont lus de façon incrémentale (seules les commandes ajoutées
+    depuis la collecte précédente sont analysées) et en parallèle.
+    """
     
-    def __init__(self):
+    def __init__(self, state_file: Optional[str] = None, max_workers: int = 8,
+                 initial_bytes: Optional[int] = None):
         super().__init__()
-        # Fichiers d'historique supportés
-        self.history_files = {
-            '.bash_history': self._parse_bash_history,
-            '.zsh_history': self._parse_zsh_history,
-            '.fish_history': self._parse_fish_history,
-            '.tcsh_history': self._parse_tcsh_history,
-            '.ksh_history': self._parse_ksh_history
-        }
+        # Fichiers d'historique supportés (relatifs au répertoire personnel)
+        self.history_files = HISTORY_FILES
+        self.tailer = LogTailer(state_file=state_file, initial_bytes=initial_bytes)
+        self.max_workers = max_workers
     
     def _geteuid(self):
         # Méthode utilitaire multi-OS
@@ -31,8 +57,12 @@ class ShellHistoryCollector(LinuxCollector):
         except AttributeError:
             return 0  # Par défaut, root sur Windows ou OS sans geteuid
     
-    def collect(self) -> Dict[str, Any]:
-        """Collecte l'historique des shells"""
+    def collect(self, username: Optional[str] = None, shell_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Collecte les nouvelles commandes de l'historique des shells.
+        Les filtres username et shell_type choisissent les fichiers lus : les
+        positions des autres fichiers n'avancent pas.
+        """
         results = {
             'system_info': self.get_system_info(),
             'history_entries': [],
@@ -43,8 +73,9 @@ class ShellHistoryCollector(LinuxCollector):
         
         try:
             # Collecter l'historique de tous les utilisateurs
-            all_history = self._collect_all_users_history()
+            all_history, users_analyzed = self._collect_all_users_history(username, shell_type)
             results['history_entries'] = all_history
+            results['users_analyzed'] = users_analyzed
             
             # Analyser les commandes suspectes
             results['suspicious_commands'] = self._analyze_suspicious_commands(all_history)
@@ -57,273 +88,105 @@ class ShellHistoryCollector(LinuxCollector):
         
         return results
     
-    def _collect_all_users_history(self) -> List[Dict[str, Any]]:
-        """Collecte l'historique de tous les utilisateurs"""
+    def _collect_all_users_history(self, username: Optional[str] = None,
+                                   shell_type: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Collecte l'historique des utilisateurs (tous par défaut), fichiers analysés en parallèle"""
         all_history = []
+        users_analyzed = set()
         
         try:
-            # Obtenir la liste des utilisateurs
-            users = self._get_users_list()
+            # Un même fichier n'est lu qu'une fois (répertoires personnels partagés)
+            history_files = {}
+            for user in self._get_users_list():
+                if username and user['username'] != username:
+                    continue
+                for path in self._user_history_files(user['home'], shell_type):
+                    history_files.setdefault(path, user['username'])
+            if not history_files:
+                return all_history, []
             
-            for user in users:
-                try:
-                    user_history = self._collect_user_history(user)
-                    if user_history:
-                        all_history.extend(user_history)
-                        results['users_analyzed'].append(user['username'])
-                except Exception as e:
-                    self.logger.error(f"Erreur lors de la collecte de l'historique pour {user['username']}: {e}")
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(history_files))) as executor:
+                futures = {
+                    executor.submit(self._parse_history_file, path, username): (path, username)
+                    for path, username in history_files.items()
+                }
+                for future in as_completed(futures):
+                    path, username = futures[future]
+                    try:
+                        entries = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Erreur lors de la lecture de {path}: {e}")
+                        continue
+                    if entries:
+                        all_history.extend(entries)
+                        users_analyzed.add(username)
         
         except Exception as e:
             self.logger.error(f"Erreur lors de la collecte de l'historique: {e}")
         
-        return all_history
+        return all_history, sorted(users_analyzed)
     
     def _get_users_list(self) -> List[Dict[str, Any]]:
-        """Obtient la liste des utilisateurs du système"""
+        """Obtient la liste des utilisateurs du système (nom et répertoire personnel)"""
         users = []
         
         try:
-            # Utiliser la méthode de la classe de base qui gère pwd
-            if hasattr(self, 'get_users_list'):
-                users = self.get_users_list()
-            else:
-                # Fallback si la méthode n'existe pas
-                try:
-                    import pwd
-                    for user_entry in pwd.getpwall():
-                        users.append({
-                            'username': user_entry.pw_name,
-                            'uid': user_entry.pw_uid,
-                            'home': user_entry.pw_dir
-                        })
-                except ImportError:
-                    self.logger.warning("Module pwd non disponible sur ce système.")
-                    return []
+            for username in self.get_users_list():
+                user_info = self.get_user_info(username)
+                if user_info and user_info.get('home_dir'):
+                    users.append({
+                        'username': username,
+                        'uid': user_info.get('uid'),
+                        'home': user_info['home_dir']
+                    })
         except Exception as e:
             self.logger.error(f"Erreur lors de la récupération des utilisateurs: {e}")
         
         return users
     
+    def _user_history_files(self, home_dir: str, shell_type: Optional[str] = None) -> List[str]:
+        """Fichiers d'historique présents dans un répertoire personnel (d'un shell donné si shell_type)"""
+        paths = []
+        for filename, parser_class in self.history_files.items():
+            if shell_type and parser_class.shell_type != shell_type:
+                continue
+            file_path = os.path.join(home_dir, filename)
+            if os.path.isfile(file_path):
+                paths.append(file_path)
+        return paths
+    
     def _collect_user_history(self, username: str, home_dir: str) -> List[Dict[str, Any]]:
-        """Collecte l'historique d'un utilisateur spécifique"""
+        """Collecte les nouvelles commandes d'un utilisateur spécifique"""
         user_entries = []
         
-        for filename, parser_func in self.history_files.items():
-            file_path = os.path.join(home_dir, filename)
-            
-            if os.path.exists(file_path):
-                try:
-                    entries = parser_func(file_path, username)
-                    user_entries.extend(entries)
-                except Exception as e:
-                    self.logger.error(f"Erreur lors de la lecture de {file_path}: {e}")
+        for file_path in self._user_history_files(home_dir):
+            try:
+                user_entries.extend(self._parse_history_file(file_path, username))
+            except Exception as e:
+                self.logger.error(f"Erreur lors de la lecture de {file_path}: {e}")
         
         return user_entries
     
-    def _parse_bash_history(self, file_path: str, username: str) -> List[Dict[str, Any]]:
-        """Parse l'historique bash avec support des timestamps"""
+    def _parse_history_file(self, file_path: str, username: str) -> List[Dict[str, Any]]:
+        """Analyse les lignes ajoutées à un fichier d'historique depuis la dernière lecture"""
         entries = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                # Vérifier si c'est un timestamp bash (format: #1234567890)
-                timestamp = None
-                command = line
-                
-                if line.startswith('#') and line[1:].isdigit():
-                    try:
-                        timestamp = datetime.fromtimestamp(int(line[1:]))
-                        # La commande suivante correspond à ce timestamp
-                        if i + 1 < len(lines):
-                            command = lines[i + 1].strip()
-                            i += 1
-                    except ValueError:
-                        pass
-                
-                if command and not command.startswith('#'):
-                    entries.append({
-                        'username': username,
-                        'command': command,
-                        'timestamp': timestamp.isoformat() if timestamp else None,
-                        'shell_type': 'bash',
-                        'file_path': file_path,
-                        'line_number': i + 1
-                    })
-                
-                i += 1
-        
-        except Exception as e:
-            self.logger.error(f"Erreur lors du parsing bash de {file_path}: {e}")
-        
-        return entries
-    
-    def _parse_zsh_history(self, file_path: str, username: str) -> List[Dict[str, Any]]:
-        """Parse l'historique zsh avec timestamps"""
-        entries = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Format zsh: : timestamp:0;command
-                    match = re.match(r'^: (\d+):(\d+);(.+)$', line)
-                    if match:
-                        timestamp_sec, timestamp_usec, command = match.groups()
-                        try:
-                            timestamp = datetime.fromtimestamp(
-                                int(timestamp_sec) + int(timestamp_usec) / 1000000
-                            )
-                        except ValueError:
-                            timestamp = None
-                        
-                        entries.append({
-                            'username': username,
-                            'command': command,
-                            'timestamp': timestamp.isoformat() if timestamp else None,
-                            'shell_type': 'zsh',
-                            'file_path': file_path,
-                            'line_number': line_num
-                        })
-                    else:
-                        # Format simple sans timestamp
-                        entries.append({
-                            'username': username,
-                            'command': line,
-                            'timestamp': None,
-                            'shell_type': 'zsh',
-                            'file_path': file_path,
-                            'line_number': line_num
-                        })
-        
-        except Exception as e:
-            self.logger.error(f"Erreur lors du parsing zsh de {file_path}: {e}")
-        
-        return entries
-    
-    def _parse_fish_history(self, file_path: str, username: str) -> List[Dict[str, Any]]:
-        """Parse l'historique fish"""
-        entries = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Format fish: - cmd: command
-                    match = re.match(r'^- cmd: (.+)$', line)
-                    if match:
-                        command = match.group(1)
-                        entries.append({
-                            'username': username,
-                            'command': command,
-                            'timestamp': None,  # Fish ne stocke pas les timestamps par défaut
-                            'shell_type': 'fish',
-                            'file_path': file_path,
-                            'line_number': line_num
-                        })
-        
-        except Exception as e:
-            self.logger.error(f"Erreur lors du parsing fish de {file_path}: {e}")
-        
-        return entries
-    
-    def _parse_tcsh_history(self, file_path: str, username: str) -> List[Dict[str, Any]]:
-        """Parse l'historique tcsh"""
-        entries = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        entries.append({
-                            'username': username,
-                            'command': line,
-                            'timestamp': None,
-                            'shell_type': 'tcsh',
-                            'file_path': file_path,
-                            'line_number': line_num
-                        })
-        
-        except Exception as e:
-            self.logger.error(f"Erreur lors du parsing tcsh de {file_path}: {e}")
-        
-        return entries
-    
-    def _parse_ksh_history(self, file_path: str, username: str) -> List[Dict[str, Any]]:
-        """Parse l'historique ksh"""
-        entries = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        entries.append({
-                            'username': username,
-                            'command': line,
-                            'timestamp': None,
-                            'shell_type': 'ksh',
-                            'file_path': file_path,
-                            'line_number': line_num
-                        })
-        
-        except Exception as e:
-            self.logger.error(f"Erreur lors du parsing ksh de {file_path}: {e}")
-        
+        for entry in parse_history(parser_for(file_path), self.tailer.read_raw_lines(file_path)):
+            entry['username'] = username
+            entry['file_path'] = file_path
+            entries.append(entry)
         return entries
     
     def _analyze_suspicious_commands(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Analyse les commandes suspectes"""
         suspicious_commands = []
         
-        # Patterns de commandes suspectes
-        suspicious_patterns = [
-            r'\b(wget|curl)\s+.*\b(http|https)://',
-            r'\b(nc|netcat|ncat)\s+.*\b(connect|listen)',
-            r'\b(ssh|scp)\s+.*\b(root@|admin@)',
-            r'\b(telnet|rsh|rlogin)\b',
-            r'\b(sudo|su)\s+.*\b(root|admin)',
-            r'\b(chmod|chown)\s+.*\b777|666',
-            r'\b(rm|del)\s+.*\b(-rf|/rf)',
-            r'\b(passwd|password)\s+.*\b(root|admin)',
-            r'\b(service|systemctl)\s+.*\b(stop|disable)',
-            r'\b(ufw|iptables)\s+.*\b(disable|stop)',
-            r'\b(crontab|at)\s+.*\b(-e|-r)',
-            r'\b(ssh-keygen|ssh-copy-id)',
-            r'\b(base64|openssl)\s+.*\b(decode|decrypt)',
-            r'\b(python|perl|ruby)\s+.*\b(-c|-e)',
-            r'\b(eval|exec)\s+.*\b(\$|`)',
-            r'\b(echo|printf)\s+.*\b(\$|`)',
-            r'\b(backdoor|trojan|malware|virus)\b',
-            r'\b(keylogger|logger|spy)\b',
-            r'\b(exploit|payload|shell)\b',
-            r'\b(miner|mining)\b'
-        ]
-        
-        # Compiler les patterns
-        compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in suspicious_patterns]
-        
         for entry in entries:
             command = entry.get('command', '')
             suspicious_flags = []
             
             # Vérifier les patterns suspects
-            for i, pattern in enumerate(compiled_patterns):
-                if pattern.search(command):
-                    suspicious_flags.append(f"Pattern suspect {i+1}: {suspicious_patterns[i]}")
+            for i in SUSPICIOUS_COMMAND_PATTERNS.match_indices(command):
+                suspicious_flags.append(f"Pattern suspect {i+1}: {SUSPICIOUS_COMMAND_PATTERNS.patterns[i]}")
             
             # Vérifier les commandes exécutées par root
             if entry.get('username') == 'root':
@@ -391,9 +254,10 @@ class ShellHistoryCollector(LinuxCollector):
                     }
                 user_stats[username]['total_commands'] += 1
                 user_stats[username]['shells_used'].add(entry.get('shell_type', 'unknown'))
-                
-                # Convertir les ensembles en listes pour la sérialisation JSON
-                user_stats[username]['shells_used'] = list(user_stats[username]['shells_used'])
+            
+            # Convertir les ensembles en listes pour la sérialisation JSON
+            for stats in user_stats.values():
+                stats['shells_used'] = sorted(stats['shells_used'])
             
             return {
                 'total_entries': len(entries),
@@ -0,0 +1,274 @@
+"""
+Lecture native des tables de sockets Linux.
+
+Les tables /proc/net/{tcp,tcp6,udp,udp6,unix} sont lues directement au lieu
+d'exécuter « ss » et d'analyser sa sortie texte. Les filtres sur l'état et
+le port sont appliqués sur les champs bruts, avant tout décodage d'adresse ;
+les adresses, souvent répétées, sont décodées une fois puis mises en cache.
+Les sockets sont rattachées à leur processus par un seul parcours de
+/proc/*/fd (liens « socket:[inode] »). Les états portent les noms de ss
+(ESTAB, LISTEN, UNCONN...).
+"""
+
+import logging
+import os
+import socket
+import struct
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Table -> (protocole, famille)
+TABLES = {
+    'tcp': ('tcp', 'inet'),
+    'tcp6': ('tcp', 'inet6'),
+    'udp': ('udp', 'inet'),
+    'udp6': ('udp', 'inet6'),
+    'unix': ('unix', 'unix'),
+}
+
+# États TCP du noyau (champ « st » en hexadécimal) -> nom ss
+TCP_STATES = {
+    '01': 'ESTAB', '02': 'SYN-SENT', '03': 'SYN-RECV', '04': 'FIN-WAIT-1',
+    '05': 'FIN-WAIT-2', '06': 'TIME-WAIT', '07': 'UNCONN', '08': 'CLOSE-WAIT',
+    '09': 'LAST-ACK', '0A': 'LISTEN', '0B': 'CLOSING', '0C': 'NEW-SYN-RECV'
+}
+STATE_CODES = {name: code for code, name in TCP_STATES.items()}
+
+# Autres noms acceptés dans les filtres (netstat, psutil)
+STATE_ALIASES = {
+    'ESTABLISHED': 'ESTAB', 'LISTENING': 'LISTEN', 'CLOSE': 'UNCONN', 'NONE': 'UNCONN',
+    'SYN-RECEIVED': 'SYN-RECV', 'CLOSED': 'UNCONN'
+}
+
+# Drapeau __SO_ACCEPTCON d'une socket unix en écoute
+UNIX_ACCEPTCON = 0x10000
+UNIX_CONNECTED = '03'
+
+# Taille maximale du cache des adresses décodées
+ADDRESS_CACHE_SIZE = 65536
+
+
+class Socket(NamedTuple):
+    """Entrée d'une table de sockets."""
+    protocol: str
+    family: str
+    state: str
+    local_address: str
+    local_port: Optional[int]
+    peer_address: str
+    peer_port: Optional[int]
+    recv_q: int
+    send_q: int
+    uid: Optional[int]
+    inode: int
+    pid: Optional[int] = None
+    process: Optional[str] = None
+    fd: Optional[int] = None
+
+
+def normalize_state(state: str) -> str:
+    """Nom d'état ss d'un nom saisi (« established », « TIME_WAIT »...)."""
+    state = state.strip().upper().replace('_', '-')
+    return STATE_ALIASES.get(state, state)
+
+
+def _decode_address(raw: str) -> str:
+    """Adresse hexadécimale de /proc/net (mots de 32 bits dans l'ordre de l'hôte)."""
+    if len(raw) == 8:
+        return socket.inet_ntop(socket.AF_INET, struct.pack('=I', int(raw, 16)))
+    words = [int(raw[i:i + 8], 16) for i in range(0, 32, 8)]
+    return socket.inet_ntop(socket.AF_INET6, struct.pack('=4I', *words))
+
+
+def format_endpoint(address: str, port: Optional[int]) -> str:
+    """Adresse et port au format de ss : « 10.0.0.1:22 », « [::1]:631 », « 0.0.0.0:* »."""
+    if ':' in address:
+        address = f"[{address}]"
+    return f"{address}:{port if port else '*'}"
+
+
+class SocketTableReader:
+    """Lecteur des tables de sockets de /proc/net avec filtres et rattachement aux processus."""
+
+    def __init__(self, proc_root: str = '/proc'):
+        """
+        Args:
+            proc_root: Racine de procfs (autre point de montage, conteneur)
+        """
+        self.proc_root = proc_root
+        self._addresses: Dict[str, str] = {}
+
+    def read(self, protocols: Optional[Iterable[str]] = None, states: Optional[Iterable[str]] = None,
+             ports: Optional[Iterable[int]] = None, processes: bool = True) -> List[Socket]:
+        """
+        Sockets des tables demandées.
+
+        Args:
+            protocols: Tables à lire (tcp, tcp6, udp, udp6, unix ; « tcp » et « udp »
+                       incluent IPv6), toutes les tables inet par défaut
+            states: États retenus (noms ss ou alias), tous par défaut
+            ports: Ports retenus (port local ou distant), tous par défaut
+            processes: Rattacher les sockets à leur processus (pid, nom, descripteur)
+        """
+        tables = self._tables(protocols)
+        wanted_states = {normalize_state(state) for state in states} if states else None
+        wanted_ports = {int(port) for port in ports} if ports else None
+
+        sockets = []
+        for table in tables:
+            sockets.extend(self.iter_table(table, wanted_states, wanted_ports))
+
+        if processes and sockets:
+            owners = self.owners({entry.inode for entry in sockets if entry.inode})
+            names: Dict[int, Optional[str]] = {}
+            for index, entry in enumerate(sockets):
+                owner = owners.get(entry.inode)
+                if owner is None:
+                    continue
+                pid, fd = owner
+                if pid not in names:
+                    names[pid] = self.process_name(pid)
+                sockets[index] = entry._replace(pid=pid, process=names[pid], fd=fd)
+        return sockets
+
+    @staticmethod
+    def _tables(protocols: Optional[Iterable[str]]) -> List[str]:
+        if not protocols:
+            return ['tcp', 'tcp6', 'udp', 'udp6']
+        tables = []
+        for protocol in protocols:
+            protocol = protocol.strip().lower()
+            for table in (protocol, protocol + '6') if protocol in ('tcp', 'udp') else (protocol,):
+                if table in TABLES and table not in tables:
+                    tables.append(table)
+        return tables
+
+    def iter_table(self, table: str, states: Optional[Set[str]] = None,
+                   ports: Optional[Set[int]] = None) -> Iterator[Socket]:
+        """Sockets d'une table de /proc/net, filtrées sur l'état et le port avant décodage."""
+        path = os.path.join(self.proc_root, 'net', table)
+        try:
+            f = open(path, 'r', buffering=1024 * 1024)
+        except OSError as e:
+            logger.debug(f"Cannot open {path}: {e}")
+            return
+
+        with f:
+            next(f, None)  # En-tête
+            if table == 'unix':
+                if ports:
+                    return
+                yield from self._unix_sockets(f, states)
+                return
+
+            protocol, family = TABLES[table]
+            if len(self._addresses) >= ADDRESS_CACHE_SIZE:
+                self._addresses.clear()
+            codes = {STATE_CODES[state] for state in states if state in STATE_CODES} if states else None
+            addresses = self._addresses
+            for line in f:
+                fields = line.split()
+                if len(fields) < 10:
+                    continue
+                code = fields[3]
+                if codes is not None and code not in codes:
+                    continue
+                local, peer = fields[1], fields[2]
+                local_port = int(local[-4:], 16)
+                peer_port = int(peer[-4:], 16)
+                if ports is not None and local_port not in ports and peer_port not in ports:
+                    continue
+
+                local_address = addresses.get(local[:-5])
+                if local_address is None:
+                    local_address = addresses[local[:-5]] = _decode_address(local[:-5])
+                peer_address = addresses.get(peer[:-5])
+                if peer_address is None:
+                    peer_address = addresses[peer[:-5]] = _decode_address(peer[:-5])
+                send_q, recv_q = fields[4].split(':')
+
+                yield Socket(
+                    protocol=protocol,
+                    family=family,
+                    state=TCP_STATES.get(code, code),
+                    local_address=local_address,
+                    local_port=local_port,
+                    peer_address=peer_address,
+                    peer_port=peer_port or None,
+                    recv_q=int(recv_q, 16),
+                    send_q=int(send_q, 16),
+                    uid=int(fields[7]),
+                    inode=int(fields[9])
+                )
+
+    @staticmethod
+    def _unix_sockets(lines: Iterable[str], states: Optional[Set[str]]) -> Iterator[Socket]:
+        # Num RefCount Protocol Flags Type St Inode [Path]
+        for line in lines:
+            fields = line.split(None, 7)
+            if len(fields) < 7:
+                continue
+            if int(fields[3], 16) & UNIX_ACCEPTCON:
+                state = 'LISTEN'
+            elif fields[5] == UNIX_CONNECTED:
+                state = 'ESTAB'
+            else:
+                state = 'UNCONN'
+            if states is not None and state not in states:
+                continue
+            yield Socket(
+                protocol='unix',
+                family='unix',
+                state=state,
+                local_address=fields[7].rstrip('\n') if len(fields) > 7 else '',
+                local_port=None,
+                peer_address='',
+                peer_port=None,
+                recv_q=0,
+                send_q=0,
+                uid=None,
+                inode=int(fields[6])
+            )
+
+    def owners(self, inodes: Optional[Set[int]] = None) -> Dict[int, Tuple[int, int]]:
+        """
+        inode de socket -> (pid, descripteur), en un seul parcours de /proc/*/fd.
+        Seuls les processus accessibles sont vus (droits root pour tous).
+        """
+        owners: Dict[int, Tuple[int, int]] = {}
+        try:
+            processes = os.scandir(self.proc_root)
+        except OSError as e:
+            logger.debug(f"Cannot list {self.proc_root}: {e}")
+            return owners
+
+        with processes:
+            for process in processes:
+                if not process.name.isdigit():
+                    continue
+                pid = int(process.name)
+                try:
+                    with os.scandir(os.path.join(process.path, 'fd')) as descriptors:
+                        for descriptor in descriptors:
+                            try:
+                                link = os.readlink(descriptor.path)
+                            except OSError:
+                                continue
+                            if not link.startswith('socket:['):
+                                continue
+                            inode = int(link[8:-1])
+                            if (inodes is None or inode in inodes) and inode not in owners:
+                                owners[inode] = (pid, int(descriptor.name))
+                except OSError:
+                    # Processus terminé ou inaccessible
+                    continue
+        return owners
+
+    def process_name(self, pid: int) -> Optional[str]:
+        """Nom court (comm) d'un processus, None s'il est terminé ou inaccessible."""
+        try:
+            with open(os.path.join(self.proc_root, str(pid), 'comm'), 'r') as f:
+                return f.read().rstrip('\n')
+        except OSError:
+            return None
@@ -4,16 +4,25 @@ Collecte les logs depuis /var/log/syslog, /var/log/auth.log, etc.
 """
 
 import os
-import re
-from datetime import datetime
-from typing import Dict, List, Any
+import shutil
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterator, Optional
 from .base import LinuxCollector
+from .journal import journal_entry_to_event, systemd_journal
+from .log_parser import LogParser
+from .log_tailer import LogTailer
 
 class SystemLogsCollector(LinuxCollector):
-    """Collecteur pour les logs système Linux"""
+    """
+    Collecteur pour les logs système Linux
+    Les fichiers et le journal systemd sont lus de façon incrémentale : chaque
+    collecte ne traite que les entrées ajoutées depuis la précédente.
+    """
     
-    def __init__(self):
+    def __init__(self, state_file: Optional[str] = None, initial_bytes: Optional[int] = None):
         super().__init__()
+        self.tailer = LogTailer(state_file=state_file, initial_bytes=initial_bytes)
+        self.parser = LogParser()
         self.log_files = [
             '/var/log/syslog',
             '/var/log/auth.log',
@@ -62,7 +71,7 @@ class SystemLogsCollector(LinuxCollector):
         results['dmesg'] = dmesg_data
         
         # Collecter les logs systemd (si disponible)
-        journalctl_data = self._collect_journalctl()
+        journalctl_data = self._collect_journal()
         results['journalctl'] = journalctl_data
         
         # Générer un résumé
@@ -71,75 +80,36 @@ class SystemLogsCollector(LinuxCollector):
         return results
     
     def _parse_log_file(self, log_file: str) -> Dict[str, Any]:
-        """Parse un fichier de log système"""
+        """Parse les nouvelles lignes d'un fichier de log système"""
         try:
             file_info = self.get_file_info(log_file)
-            entries = []
-            
-            # Lire les dernières lignes du fichier
-            lines = self.read_file_lines(log_file, max_lines=1000)
-            
-            for line in lines:
-                entry = self._parse_log_line(line)
-                if entry:
-                    entries.append(entry)
+            # Toutes les nouvelles entrées : la position de lecture les a déjà dépassées
+            recent_entries = list(self.iter_log_events(log_file))
+            first_entry = recent_entries[0] if recent_entries else None
             
             return {
                 'file_info': file_info,
-                'total_entries': len(entries),
-                'recent_entries': entries[-100:],  # Dernières 100 entrées
-                'first_entry': entries[0] if entries else None,
-                'last_entry': entries[-1] if entries else None
+                'total_entries': len(recent_entries),
+                'recent_entries': recent_entries,
+                'first_entry': first_entry,
+                'last_entry': recent_entries[-1] if recent_entries else None
             }
             
         except Exception as e:
             self.logger.error(f"Erreur lors du parsing du fichier {log_file}: {e}")
             return {'error': str(e)}
     
-    def _parse_log_line(self, line: str) -> Dict[str, Any]:
-        """Parse une ligne de log système"""
-        try:
-            # Pattern pour les logs syslog standard
-            # Format: Jan 15 10:30:45 hostname service: message
-            pattern = r'^(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\s+(\S+)\s+([^:]+):\s*(.*)$'
-            match = re.match(pattern, line)
-            
-            if match:
-                timestamp_str, hostname, service, message = match.groups()
-                
-                # Convertir le timestamp
-                try:
-                    # Ajouter l'année actuelle si elle n'est pas présente
-                    if len(timestamp_str.split()) == 2:
-                        timestamp_str = f"{datetime.now().year} {timestamp_str}"
-                    
-                    timestamp = datetime.strptime(timestamp_str, "%Y %b %d %H:%M:%S")
-                except:
-                    timestamp = None
-                
-                # Détecter le niveau de log
-                level = 'info'
-                if any(word in message.lower() for word in ['error', 'failed', 'failure']):
-                    level = 'error'
-                elif any(word in message.lower() for word in ['warning', 'warn']):
-                    level = 'warning'
-                elif any(word in message.lower() for word in ['debug']):
-                    level = 'debug'
-                
-                return {
-                    'timestamp': timestamp.isoformat() if timestamp else None,
-                    'hostname': hostname,
-                    'service': service.strip(),
-                    'message': message,
-                    'level': level,
-                    'raw_line': line
-                }
-            
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"Erreur lors du parsing de la ligne: {line[:100]}... - {e}")
-            return None
+    def iter_log_events(self, log_file: str) -> Iterator[Dict[str, Any]]:
+        """
+        Génère les entrées parsées ajoutées au fichier depuis la dernière lecture.
+        La position avance ligne par ligne : les lignes non consommées sont
+        relues à la collecte suivante.
+        """
+        return self.tailer.follow(log_file, self.parser.parse_line)
+    
+    def _parse_log_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Parse une ligne de log système (syslog RFC 3164, RFC 3339 ou RFC 5424)"""
+        return self.parser.parse_line(line)
     
     def _collect_dmesg(self) -> Dict[str, Any]:
         """Collecte les logs du kernel via dmesg"""
@@ -172,116 +142,44 @@ class SystemLogsCollector(LinuxCollector):
             self.logger.error(f"Erreur lors de la collecte dmesg: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _parse_dmesg_line(self, line: str) -> Dict[str, Any]:
+    def _parse_dmesg_line(self, line: str) -> Optional[Dict[str, Any]]:
         """Parse une ligne de dmesg"""
-        try:
-            # Pattern pour dmesg: [timestamp] message
-            pattern = r'^\[(\d+\.\d+)\]\s*(.*)$'
-            match = re.match(pattern, line)
-            
-            if match:
-                timestamp_float, message = match.groups()
-                timestamp = float(timestamp_float)
-                
-                # Détecter le niveau
-                level = 'info'
-                if any(word in message.lower() for word in ['error', 'failed', 'failure']):
-                    level = 'error'
-                elif any(word in message.lower() for word in ['warning', 'warn']):
-                    level = 'warning'
-                
-                return {
-                    'timestamp': timestamp,
-                    'message': message,
-                    'level': level,
-                    'raw_line': line
-                }
-            
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"Erreur lors du parsing dmesg: {line[:100]}... - {e}")
-            return None
+        return self.parser.parse_dmesg_line(line)
     
-    def _collect_journalctl(self) -> Dict[str, Any]:
-        """Collecte les logs systemd via journalctl"""
+    def _collect_journal(self) -> Dict[str, Any]:
+        """Collecte les entrées structurées du journal systemd"""
         try:
             # Vérifier si systemd est disponible
-            result = self.execute_command(['which', 'journalctl'], timeout=5)
-            if not result['success']:
-                return {'available': False, 'reason': 'journalctl not found'}
+            if not self.journal_available():
+                return {'available': False, 'reason': 'journal not available'}
             
-            # Collecter les logs récents
-            result = self.execute_command([
-                'journalctl', '--no-pager', '--since', '1 hour ago', 
-                '--output', 'short-precise'
-            ], timeout=15)
+            # Collecter les entrées postérieures au dernier curseur lu
+            recent_entries = list(self.iter_journal_events())
             
-            if result['success']:
-                entries = []
-                lines = result['stdout'].split('\n')
-                
-                for line in lines:
-                    if line.strip():
-                        entry = self._parse_journalctl_line(line)
-                        if entry:
-                            entries.append(entry)
-                
-                return {
-                    'available': True,
-                    'success': True,
-                    'total_entries': len(entries),
-                    'recent_entries': entries[-50:],
-                    'raw_output': result['stdout'][:1000]
-                }
-            else:
-                return {
-                    'available': True,
-                    'success': False,
-                    'error': result.get('error', 'Unknown error')
-                }
+            return {
+                'available': True,
+                'success': True,
+                'total_entries': len(recent_entries),
+                'recent_entries': recent_entries
+            }
                 
         except Exception as e:
-            self.logger.error(f"Erreur lors de la collecte journalctl: {e}")
+            self.logger.error(f"Erreur lors de la collecte du journal systemd: {e}")
             return {'available': True, 'success': False, 'error': str(e)}
     
-    def _parse_journalctl_line(self, line: str) -> Dict[str, Any]:
-        """Parse une ligne de journalctl"""
-        try:
-            # Format: timestamp hostname service[pid]: message
-            pattern = r'^(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}\.\d+)\s+(\S+)\s+([^[]+)\[(\d+)\]:\s*(.*)$'
-            match = re.match(pattern, line)
-            
-            if match:
-                timestamp_str, hostname, service, pid, message = match.groups()
-                
-                try:
-                    timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S.%f")
-                except:
-                    timestamp = None
-                
-                # Détecter le niveau
-                level = 'info'
-                if any(word in message.lower() for word in ['error', 'failed', 'failure']):
-                    level = 'error'
-                elif any(word in message.lower() for word in ['warning', 'warn']):
-                    level = 'warning'
-                
-                return {
-                    'timestamp': timestamp.isoformat() if timestamp else None,
-                    'hostname': hostname,
-                    'service': service.strip(),
-                    'pid': int(pid),
-                    'message': message,
-                    'level': level,
-                    'raw_line': line
-                }
-            
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"Erreur lors du parsing journalctl: {line[:100]}... - {e}")
-            return None
+    @staticmethod
+    def journal_available() -> bool:
+        """Vrai si le journal systemd est lisible (bibliothèque ou journalctl)"""
+        return systemd_journal is not None or shutil.which('journalctl') is not None
+    
+    def iter_journal_events(self) -> Iterator[Dict[str, Any]]:
+        """
+        Génère les entrées du journal systemd postérieures au dernier curseur lu
+        (la dernière heure à la première lecture). Le curseur avance entrée par entrée.
+        """
+        since = datetime.now() - timedelta(hours=1)
+        for raw_entry in self.tailer.journal_entries('system', since=since, timeout=15):
+            yield journal_entry_to_event(raw_entry)
     
     def _generate_summary(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Génère un résumé des logs collectés"""
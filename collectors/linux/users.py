@@ -4,10 +4,22 @@ Collecte les informations sur les utilisateurs et groupes
 """
 
 import os
-import re
 from datetime import datetime
 from typing import Dict, List, Any
 from .base import LinuxCollector
+from ..pattern_matcher import RegexMatcher
+
+# Patterns de noms d'utilisateurs suspects
+SUSPICIOUS_USERNAME_PATTERNS = RegexMatcher([
+    r'\b(backdoor|trojan|malware|virus)\b',
+    r'\b(keylogger|logger|spy)\b',
+    r'\b(exploit|payload|shell)\b',
+    r'\b(bot|botnet)\b',
+    r'\b(miner|mining)\b',
+    r'\b(stealer|spyware)\b',
+    r'\b(rootkit|bootkit)\b',
+    r'\b(test|temp|tmp|admin|root)\b'
+])
 
 class UsersCollector(LinuxCollector):
     """Collecteur pour les utilisateurs Linux (multi-OS safe)"""
@@ -213,29 +225,13 @@ class UsersCollector(LinuxCollector):
         """Analyse les utilisateurs suspects"""
         suspicious_users = []
         
-        # Patterns de noms d'utilisateurs suspects
-        suspicious_patterns = [
-            r'\b(backdoor|trojan|malware|virus)\b',
-            r'\b(keylogger|logger|spy)\b',
-            r'\b(exploit|payload|shell)\b',
-            r'\b(bot|botnet)\b',
-            r'\b(miner|mining)\b',
-            r'\b(stealer|spyware)\b',
-            r'\b(rootkit|bootkit)\b',
-            r'\b(test|temp|tmp|admin|root)\b'
-        ]
-        
-        # Compiler les patterns
-        compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in suspicious_patterns]
-        
         for user in users:
             suspicious_flags = []
             username = user.get('username', '')
             
             # Vérifier le nom d'utilisateur
-            for pattern in compiled_patterns:
-                if pattern.search(username):
-                    suspicious_flags.append(f"Nom suspect: {username}")
+            for _ in SUSPICIOUS_USERNAME_PATTERNS.match_indices(username):
+                suspicious_flags.append(f"Nom suspect: {username}")
             
             # Vérifier les UID suspects
             uid = user.get('uid', 0)
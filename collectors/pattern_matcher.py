@@ -0,0 +1,167 @@
+"""
+Correspondance multi-motifs partagée par les collecteurs et l'enrichissement
+Chaque jeu de motifs est compilé une seule fois et évalué en un seul passage
+"""
+
+import re
+from typing import Iterable, List, Optional, Set
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Préfixe littéral d'un motif : \b(mot1|mot2|...) ou \bmot
+_KEYWORD_PREFIX = re.compile(r'^(?:\\b)?(?:\((?P<group>[\w@/-]+(?:\|[\w@/-]+)*)\)|(?P<word>[\w@/-]+))')
+
+
+def _required_keywords(pattern: str) -> Optional[List[str]]:
+    """
+    Extrait les mots-clés dont l'un doit obligatoirement apparaître pour que le motif corresponde.
+    Retourne None si le motif ne se prête pas à cette analyse (il sera alors toujours évalué).
+    """
+    match = _KEYWORD_PREFIX.match(pattern)
+    if not match:
+        return None
+
+    # Un quantificateur rendrait le préfixe facultatif
+    if pattern[match.end():match.end() + 1] in ('?', '*', '{'):
+        return None
+
+    # Une alternance au premier niveau ("a|b") ne rend pas le préfixe obligatoire
+    depth, escaped, in_class = 0, False, False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return None
+
+    return (match.group('group') or match.group('word')).split('|')
+
+
+class LiteralMatcher:
+    """
+    Recherche simultanée de sous-chaînes littérales (équivalent de `motif in texte`
+    pour chaque motif) à l'aide d'un automate Aho-Corasick.
+
+    Sans le module pyahocorasick, chaque littéral est recherché dans le texte normalisé une seule fois.
+    """
+
+    def __init__(self, literals: Iterable[str], case_sensitive: bool = False):
+        self.patterns = list(literals)
+        self.case_sensitive = case_sensitive
+        self._normalized = [self._normalize(literal) for literal in self.patterns]
+        self._automaton = None
+
+        if ahocorasick is not None and self.patterns:
+            keys = {}
+            for i, literal in enumerate(self._normalized):
+                keys.setdefault(literal, []).append(i)
+            self._automaton = ahocorasick.Automaton()
+            for key, indices in keys.items():
+                self._automaton.add_word(key, tuple(indices))
+            self._automaton.make_automaton()
+
+    def _normalize(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    def match_indices(self, text: str) -> List[int]:
+        """Retourne les index (ordre de déclaration) de tous les littéraux présents dans le texte."""
+        if not text or not self.patterns:
+            return []
+
+        text = self._normalize(text)
+        if self._automaton is not None:
+            hits = set()
+            for _, indices in self._automaton.iter(text):
+                hits.update(indices)
+            return sorted(hits)
+
+        return [i for i, literal in enumerate(self._normalized) if literal in text]
+
+    def find_all(self, text: str) -> List[str]:
+        """Retourne tous les littéraux présents dans le texte."""
+        return [self.patterns[i] for i in self.match_indices(text)]
+
+    def first(self, text: str) -> Optional[str]:
+        """Retourne le premier littéral (ordre de déclaration) présent dans le texte."""
+        indices = self.match_indices(text)
+        return self.patterns[indices[0]] if indices else None
+
+    def search(self, text: str) -> bool:
+        """Indique si au moins un littéral est présent dans le texte."""
+        if not text or not self.patterns:
+            return False
+
+        text = self._normalize(text)
+        if self._automaton is not None:
+            return next(self._automaton.iter(text), None) is not None
+
+        return any(literal in text for literal in self._normalized)
+
+
+class RegexMatcher:
+    """
+    Jeu d'expressions régulières compilé une seule fois.
+
+    Les mots-clés obligatoires de chaque motif (ex. "wget", "curl" pour
+    r'\\b(wget|curl)\\s+...') sont regroupés dans un LiteralMatcher : un seul
+    balayage du texte désigne les motifs candidats, et seuls ceux-ci sont évalués.
+    Les motifs sans préfixe littéral exploitable sont toujours évalués.
+    """
+
+    def __init__(self, patterns: Iterable[str], flags: int = re.IGNORECASE):
+        self.patterns = list(patterns)
+        self.flags = flags
+        self._compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+        self._always: Set[int] = set()
+
+        keywords, self._owners = [], []
+        for i, pattern in enumerate(self.patterns):
+            required = _required_keywords(pattern)
+            if required is None:
+                self._always.add(i)
+                continue
+            for keyword in required:
+                keywords.append(keyword)
+                self._owners.append(i)
+
+        self._keywords = LiteralMatcher(keywords, case_sensitive=not flags & re.IGNORECASE)
+
+    def _candidates(self, text: str) -> List[int]:
+        """Motifs dont au moins un mot-clé obligatoire est présent dans le texte."""
+        candidates = {self._owners[k] for k in self._keywords.match_indices(text)}
+        return sorted(candidates | self._always)
+
+    def match_indices(self, text: str) -> List[int]:
+        """Retourne les index (ordre de déclaration) de tous les motifs présents dans le texte."""
+        if not text:
+            return []
+        return [i for i in self._candidates(text) if self._compiled[i].search(text)]
+
+    def find_all(self, text: str) -> List[str]:
+        """Retourne tous les motifs présents dans le texte."""
+        return [self.patterns[i] for i in self.match_indices(text)]
+
+    def first(self, text: str) -> Optional[str]:
+        """Retourne le premier motif (ordre de déclaration) présent dans le texte."""
+        if not text:
+            return None
+        for i in self._candidates(text):
+            if self._compiled[i].search(text):
+                return self.patterns[i]
+        return None
+
+    def search(self, text: str) -> bool:
+        """Indique si au moins un motif est présent dans le texte."""
+        return self.first(text) is not None
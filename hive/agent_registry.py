@@ -0,0 +1,302 @@
+"""
+Registre de présence des agents connectés.
+
+Les heartbeats ne touchent qu'un verrou de shard et une case d'un tableau
+compact (dernier signe de vie en millisecondes monotones). Les agents hors
+ligne sont détectés par une roue d'expiration parcourue périodiquement, et la
+liste exposée par l'API est sérialisée une seule fois puis mise en cache
+jusqu'au prochain changement.
+"""
+
+import json
+import logging
+import threading
+import time
+import zlib
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Champs internes non exposés par l'API
+PRIVATE_FIELDS = ('instruction_queue', 'wakeup')
+
+
+def _now_ms() -> int:
+    return time.monotonic_ns() // 1_000_000
+
+
+class AgentPresenceRegistry:
+    """Agents connectés (agent_id -> informations) avec expiration par inactivité."""
+
+    def __init__(self, ttl: float = 300, shards: int = 16, wheel_resolution: float = 5,
+                 snapshot_max_age: float = 5, on_expire: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Args:
+            ttl: Délai (secondes) sans heartbeat au-delà duquel un agent est considéré hors ligne
+            shards: Nombre de shards (verrous indépendants) du registre
+            wheel_resolution: Granularité (secondes) de la roue d'expiration
+            snapshot_max_age: Âge maximal (secondes) de la liste sérialisée, pour rafraîchir last_seen
+            on_expire: Appelé (agent_id, informations) pour chaque agent expiré
+        """
+        self.ttl_ms = int(ttl * 1000)
+        self.resolution_ms = max(1, int(wheel_resolution * 1000))
+        self.snapshot_max_age_ms = int(snapshot_max_age * 1000)
+        self.on_expire = on_expire
+
+        self._shards: List[Tuple[Dict[str, Tuple[int, Dict[str, Any]]], threading.Lock]] = [
+            ({}, threading.Lock()) for _ in range(shards)
+        ]
+
+        # Tableaux compacts indexés par slot
+        self._last_seen = array('q')
+        self._generation = array('L')
+        self._slot_owner: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._slot_lock = threading.Lock()
+
+        # Roue d'expiration : chaque case contient des (slot, génération)
+        self._wheel: List[Set[Tuple[int, int]]] = [set() for _ in range(self.ttl_ms // self.resolution_ms + 2)]
+        self._wheel_tick = _now_ms() // self.resolution_ms
+        self._wheel_lock = threading.Lock()
+
+        # Décalage pour convertir l'horloge monotone en horodatage
+        self._epoch_offset_ms = int(time.time() * 1000) - _now_ms()
+
+        self._version = 0
+        self._snapshot: Optional[Tuple[int, int, bytes]] = None
+        self._snapshot_lock = threading.Lock()
+
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+        self.expired = 0
+
+    def _shard(self, agent_id: str) -> Tuple[Dict[str, Tuple[int, Dict[str, Any]]], threading.Lock]:
+        return self._shards[zlib.crc32(agent_id.encode('utf-8')) % len(self._shards)]
+
+    def _schedule(self, slot: int, generation: int, expires_at_ms: int):
+        tick = expires_at_ms // self.resolution_ms + 1
+        with self._wheel_lock:
+            # Une échéance déjà dépassée est traitée au prochain passage
+            tick = max(tick, self._wheel_tick + 1)
+            self._wheel[tick % len(self._wheel)].add((slot, generation))
+
+    def register(self, agent_id: str, info: Dict[str, Any]):
+        """Enregistre (ou remplace) un agent."""
+        now = _now_ms()
+        with self._slot_lock:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._last_seen[slot] = now
+                self._generation[slot] += 1
+                self._slot_owner[slot] = agent_id
+            else:
+                slot = len(self._last_seen)
+                self._last_seen.append(now)
+                self._generation.append(0)
+                self._slot_owner.append(agent_id)
+            generation = self._generation[slot]
+
+        shard, lock = self._shard(agent_id)
+        with lock:
+            previous = shard.get(agent_id)
+            shard[agent_id] = (slot, info)
+        if previous is not None:
+            self._release_slot(previous[0])
+
+        self._schedule(slot, generation, now + self.ttl_ms)
+        self._version += 1
+
+    def __setitem__(self, agent_id: str, info: Dict[str, Any]):
+        self.register(agent_id, info)
+
+    def touch(self, agent_id: str) -> bool:
+        """Heartbeat : met à jour le dernier signe de vie. Retourne False si l'agent est inconnu."""
+        shard, lock = self._shard(agent_id)
+        with lock:
+            entry = shard.get(agent_id)
+            if entry is None:
+                return False
+            self._last_seen[entry[0]] = _now_ms()
+            return True
+
+    def update(self, agent_id: str, **fields) -> bool:
+        """Met à jour des informations de l'agent (invalide la liste sérialisée)."""
+        shard, lock = self._shard(agent_id)
+        with lock:
+            entry = shard.get(agent_id)
+            if entry is None:
+                return False
+            entry[1].update(fields)
+        self._version += 1
+        return True
+
+    def get(self, agent_id: str, default: Any = None) -> Any:
+        shard, lock = self._shard(agent_id)
+        with lock:
+            entry = shard.get(agent_id)
+        return default if entry is None else entry[1]
+
+    def __getitem__(self, agent_id: str) -> Dict[str, Any]:
+        info = self.get(agent_id)
+        if info is None:
+            raise KeyError(agent_id)
+        return info
+
+    def __contains__(self, agent_id: str) -> bool:
+        return self.get(agent_id) is not None
+
+    def last_seen(self, agent_id: str) -> Optional[datetime]:
+        """Horodatage du dernier signe de vie de l'agent."""
+        shard, lock = self._shard(agent_id)
+        with lock:
+            entry = shard.get(agent_id)
+            if entry is None:
+                return None
+            last_seen_ms = self._last_seen[entry[0]]
+        return datetime.fromtimestamp((last_seen_ms + self._epoch_offset_ms) / 1000, tz=timezone.utc)
+
+    def pop(self, agent_id: str, default: Any = None) -> Any:
+        shard, lock = self._shard(agent_id)
+        with lock:
+            entry = shard.pop(agent_id, None)
+        if entry is None:
+            return default
+        self._release_slot(entry[0])
+        self._version += 1
+        return entry[1]
+
+    def _release_slot(self, slot: int):
+        with self._slot_lock:
+            # La nouvelle génération rend caduques les échéances en attente dans la roue
+            self._generation[slot] += 1
+            self._slot_owner[slot] = None
+            self._free_slots.append(slot)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard, _ in self._shards)
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Copie (agent_id, informations) de tous les agents, shard par shard."""
+        result = []
+        for shard, lock in self._shards:
+            with lock:
+                result.extend((agent_id, info) for agent_id, (_, info) in shard.items())
+        return result
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([agent_id for agent_id, _ in self.items()])
+
+    def reap(self) -> int:
+        """Avance la roue d'expiration et retire les agents sans heartbeat depuis ttl."""
+        now = _now_ms()
+        current_tick = now // self.resolution_ms
+        due: List[Tuple[int, int]] = []
+        with self._wheel_lock:
+            first_tick = max(self._wheel_tick + 1, current_tick - len(self._wheel) + 1)
+            for tick in range(first_tick, current_tick + 1):
+                bucket = self._wheel[tick % len(self._wheel)]
+                due.extend(bucket)
+                bucket.clear()
+            self._wheel_tick = max(self._wheel_tick, current_tick)
+
+        removed = []
+        for slot, generation in due:
+            agent_id = self._slot_owner[slot]
+            if agent_id is None or self._generation[slot] != generation:
+                continue
+            shard, lock = self._shard(agent_id)
+            with lock:
+                expires_at = self._last_seen[slot] + self.ttl_ms
+                entry = shard.get(agent_id)
+                if entry is None or entry[0] != slot or self._generation[slot] != generation:
+                    continue
+                if expires_at > now:
+                    info = None
+                else:
+                    info = shard.pop(agent_id)[1]
+            if info is None:
+                self._schedule(slot, generation, expires_at)
+            else:
+                removed.append((agent_id, slot, info))
+
+        for agent_id, slot, info in removed:
+            self._release_slot(slot)
+            logger.info(f"Agent {agent_id} expired (no heartbeat for {self.ttl_ms // 1000}s)")
+            if self.on_expire:
+                try:
+                    self.on_expire(agent_id, info)
+                except Exception as e:
+                    logger.error(f"Error in agent expiry callback for {agent_id}: {e}")
+        self.expired += len(removed)
+        if removed:
+            self._version += 1
+        return len(removed)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Liste des agents pour l'API (copie sans les champs internes)."""
+        agents = []
+        for shard, lock in self._shards:
+            with lock:
+                for agent_id, (slot, info) in shard.items():
+                    agent_data = {key: value for key, value in info.items() if key not in PRIVATE_FIELDS}
+                    agent_data['pending_instructions'] = len(info.get('instruction_queue') or ())
+                    agent_data['last_seen'] = datetime.fromtimestamp(
+                        (self._last_seen[slot] + self._epoch_offset_ms) / 1000, tz=timezone.utc
+                    ).isoformat()
+                    agent_data['id'] = agent_id
+                    agents.append(agent_data)
+        return agents
+
+    def snapshot_json(self) -> bytes:
+        """
+        Liste des agents sérialisée en JSON, régénérée uniquement après un
+        changement d'enregistrement ou lorsque les last_seen ont plus de
+        snapshot_max_age secondes.
+        """
+        now = _now_ms()
+        cached = self._snapshot
+        if cached is not None and cached[0] == self._version and now - cached[1] < self.snapshot_max_age_ms:
+            return cached[2]
+
+        with self._snapshot_lock:
+            cached = self._snapshot
+            if cached is not None and cached[0] == self._version and now - cached[1] < self.snapshot_max_age_ms:
+                return cached[2]
+            version = self._version
+            payload = json.dumps(self.snapshot(), default=str).encode('utf-8')
+            self._snapshot = (version, now, payload)
+            return payload
+
+    def start_reaper(self, interval: Optional[float] = None):
+        """Démarre le thread qui fait avancer la roue d'expiration."""
+        if self._reaper and self._reaper.is_alive():
+            return
+
+        interval = interval if interval is not None else self.resolution_ms / 1000
+        self._stop_reaper.clear()
+
+        def run():
+            while not self._stop_reaper.wait(interval):
+                try:
+                    self.reap()
+                except Exception as e:
+                    logger.error(f"Error reaping agent registry: {e}")
+
+        self._reaper = threading.Thread(target=run, name="agent-registry-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self):
+        self._stop_reaper.set()
+        self._reaper = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'agents': len(self),
+            'slots': len(self._last_seen),
+            'free_slots': len(self._free_slots),
+            'shards': len(self._shards),
+            'ttl': self.ttl_ms / 1000,
+            'expired': self.expired
+        }
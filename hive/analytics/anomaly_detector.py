@@ -1,12 +1,41 @@
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import json
+from hive.analytics.profile_cache import ProfileCache
+from hive.analytics.vectorized_scorer import VectorizedAnomalyScorer
+from collectors.pattern_matcher import LiteralMatcher
 
 logger = logging.getLogger(__name__)
 
 class AnomalyDetector:
-    def __init__(self, profile_db, redis_client):
+    # Listes de référence partagées par le scoring unitaire et le scoring vectorisé
+    SUSPICIOUS_PROCESSES = [
+        'cmd.exe', 'powershell.exe', 'wscript.exe', 'cscript.exe',
+        'regsvr32.exe', 'rundll32.exe', 'mshta.exe', 'certutil.exe',
+        'regedit.exe', 'diskpart.exe', 'net.exe', 'netstat.exe'
+    ]
+    SUSPICIOUS_PORTS = [22, 23, 3389, 5900, 8080, 4444, 1337]
+    SENSITIVE_PATHS = [
+        '/etc/passwd', '/etc/shadow', '/windows/system32',
+        'C:\\Windows\\System32', 'C:\\Windows\\SysWOW64',
+        '/etc/ssh/', '/root/', 'C:\\Windows\\Temp'
+    ]
+    SUSPICIOUS_EXTENSIONS = ['.exe', '.dll', '.bat', '.ps1', '.vbs', '.js', '.jar']
+    SUSPICIOUS_COMMANDS = [
+        'wget', 'curl', 'nc', 'netcat', 'nslookup', 'dig',
+        'whoami', 'net user', 'net group', 'reg query',
+        'powershell -enc', 'certutil -urlcache', 'bitsadmin',
+        'schtasks', 'at', 'sc', 'net start', 'net stop'
+    ]
+    DOWNLOAD_INDICATORS = ['http://', 'https://', 'ftp://', 'tftp://']
+    RECON_COMMANDS = ['whoami', 'hostname', 'ipconfig', 'ifconfig', 'netstat', 'net view']
+    SENSITIVE_PATHS_MATCHER = LiteralMatcher(SENSITIVE_PATHS)
+    SUSPICIOUS_COMMANDS_MATCHER = LiteralMatcher(SUSPICIOUS_COMMANDS)
+    DOWNLOAD_INDICATORS_MATCHER = LiteralMatcher(DOWNLOAD_INDICATORS, case_sensitive=True)
+    RECON_COMMANDS_MATCHER = LiteralMatcher(RECON_COMMANDS)
+
+    def __init__(self, profile_db, redis_client, profile_cache_size: int = 10000, profile_cache_ttl: int = 300):
         self.profiles = profile_db
         self.redis = redis_client
         self.anomaly_thresholds = {
@@ -19,27 +48,55 @@ class AnomalyDetector:
             'suspicious_command': 40,
             'suspicious_process': 35
         }
+        # Cache local des profils, invalidé par le BaseliningService via Redis
+        self.profile_cache = ProfileCache(profile_db, redis_client, max_entries=profile_cache_size, ttl=profile_cache_ttl)
+        self.profile_cache.start_invalidation_listener()
+        self.vectorized_scorer = VectorizedAnomalyScorer(self)
 
     def score_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
         """
         Attribue un score d'anomalie à un événement.
         """
-        anomaly_score = 0
-        anomaly_reasons = []
-        
         try:
-            # Récupérer le profil de l'utilisateur
+            # Récupérer les profils de l'utilisateur et de l'hôte
             user = event.get('user')
-            user_profile = None
-            if user:
-                user_profile = self.profiles.get_user_profile(user)
+            user_profile = self.profile_cache.get_user_profile(user) if user else None
             
-            # Récupérer le profil de l'hôte
             host = event.get('host')
-            host_profile = None
-            if host:
-                host_profile = self.profiles.get_host_profile(host)
+            host_profile = self.profile_cache.get_host_profile(host) if host else None
+            
+        except Exception as e:
+            logger.error(f"Error resolving profiles: {e}")
+            user_profile, host_profile = None, None
+        
+        return self._score_with_profiles(event, user_profile, host_profile)
+
+    def score_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Attribue un score d'anomalie à un lot d'événements.
+        Chaque utilisateur/hôte distinct du lot n'est résolu qu'une seule fois,
+        puis le lot est scoré de façon vectorisée.
+        """
+        try:
+            user_profiles = self.profile_cache.get_many('user', [e['user'] for e in events if e.get('user')])
+            host_profiles = self.profile_cache.get_many('host', [e['host'] for e in events if e.get('host')])
             
+        except Exception as e:
+            logger.error(f"Error resolving profiles for batch: {e}")
+            user_profiles, host_profiles = {}, {}
+        
+        return self.vectorized_scorer.score(
+            events,
+            [user_profiles.get(event.get('user')) for event in events],
+            [host_profiles.get(event.get('host')) for event in events]
+        )
+
+    def _score_with_profiles(self, event: Dict[str, Any], user_profile: Optional[Dict], host_profile: Optional[Dict]) -> Dict[str, Any]:
+        """Score un événement à partir de profils déjà résolus."""
+        anomaly_score = 0
+        anomaly_reasons = []
+        
+        try:
             # Analyser selon le type d'événement
             event_type = event.get('type')
             
@@ -125,13 +182,7 @@ class AnomalyDetector:
                 reasons.append(f"Uncommon process for host: {process_name}")
         
         # Vérifier les processus suspects
-        suspicious_processes = [
-            'cmd.exe', 'powershell.exe', 'wscript.exe', 'cscript.exe',
-            'regsvr32.exe', 'rundll32.exe', 'mshta.exe', 'certutil.exe',
-            'regedit.exe', 'diskpart.exe', 'net.exe', 'netstat.exe'
-        ]
-        
-        if process_name.lower() in suspicious_processes:
+        if process_name.lower() in self.SUSPICIOUS_PROCESSES:
             score += self.anomaly_thresholds['suspicious_process']
             reasons.append(f"Suspicious process: {process_name}")
         
@@ -168,8 +219,7 @@ class AnomalyDetector:
                 reasons.append(f"Uncommon port for host: {peer_port}")
         
         # Vérifier les ports suspects
-        suspicious_ports = [22, 23, 3389, 5900, 8080, 4444, 1337]
-        if peer_port in suspicious_ports:
+        if peer_port in self.SUSPICIOUS_PORTS:
             score += 15
             reasons.append(f"Suspicious port: {peer_port}")
         
@@ -192,23 +242,15 @@ class AnomalyDetector:
             return score, reasons
         
         # Vérifier les accès aux fichiers sensibles
-        sensitive_paths = [
-            '/etc/passwd', '/etc/shadow', '/windows/system32',
-            'C:\\Windows\\System32', 'C:\\Windows\\SysWOW64',
-            '/etc/ssh/', '/root/', 'C:\\Windows\\Temp'
-        ]
-        
-        for sensitive_path in sensitive_paths:
-            if sensitive_path.lower() in file_path.lower():
-                score += self.anomaly_thresholds['file_access']
-                reasons.append(f"Access to sensitive path: {sensitive_path}")
-                break
+        sensitive_path = self.SENSITIVE_PATHS_MATCHER.first(file_path)
+        if sensitive_path:
+            score += self.anomaly_thresholds['file_access']
+            reasons.append(f"Access to sensitive path: {sensitive_path}")
         
         # Vérifier les extensions suspectes
-        suspicious_extensions = ['.exe', '.dll', '.bat', '.ps1', '.vbs', '.js', '.jar']
         file_extension = file_path.lower().split('.')[-1] if '.' in file_path else ''
         
-        if file_extension in suspicious_extensions:
+        if file_extension in self.SUSPICIOUS_EXTENSIONS:
             score += 10
             reasons.append(f"Access to suspicious file type: .{file_extension}")
         
@@ -237,35 +279,21 @@ class AnomalyDetector:
                 reasons.append(f"Uncommon command for user: {cmd_parts[0]}")
         
         # Vérifier les commandes suspectes
-        suspicious_commands = [
-            'wget', 'curl', 'nc', 'netcat', 'nslookup', 'dig',
-            'whoami', 'net user', 'net group', 'reg query',
-            'powershell -enc', 'certutil -urlcache', 'bitsadmin',
-            'schtasks', 'at', 'sc', 'net start', 'net stop'
-        ]
-        
-        command_lower = command.lower()
-        for suspicious_cmd in suspicious_commands:
-            if suspicious_cmd in command_lower:
-                score += self.anomaly_thresholds['suspicious_command']
-                reasons.append(f"Suspicious command: {suspicious_cmd}")
-                break
+        suspicious_cmd = self.SUSPICIOUS_COMMANDS_MATCHER.first(command)
+        if suspicious_cmd:
+            score += self.anomaly_thresholds['suspicious_command']
+            reasons.append(f"Suspicious command: {suspicious_cmd}")
         
         # Vérifier les tentatives de téléchargement
-        download_indicators = ['http://', 'https://', 'ftp://', 'tftp://']
-        for indicator in download_indicators:
-            if indicator in command:
-                score += 20
-                reasons.append(f"Download attempt detected")
-                break
+        if self.DOWNLOAD_INDICATORS_MATCHER.search(command):
+            score += 20
+            reasons.append(f"Download attempt detected")
         
         # Vérifier les tentatives de reconnaissance
-        recon_commands = ['whoami', 'hostname', 'ipconfig', 'ifconfig', 'netstat', 'net view']
-        for recon_cmd in recon_commands:
-            if recon_cmd in command_lower:
-                score += 15
-                reasons.append(f"Reconnaissance command: {recon_cmd}")
-                break
+        recon_cmd = self.RECON_COMMANDS_MATCHER.first(command)
+        if recon_cmd:
+            score += 15
+            reasons.append(f"Reconnaissance command: {recon_cmd}")
         
         return score, reasons
 
@@ -365,7 +393,8 @@ class AnomalyDetector:
                 'critical_anomalies': 0,
                 'high_anomalies': 0,
                 'medium_anomalies': 0,
-                'low_anomalies': 0
+                'low_anomalies': 0,
+                'profile_cache': self.profile_cache.get_statistics()
             }
             
             return stats
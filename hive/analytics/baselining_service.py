@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 import json
 import redis
 from collections import defaultdict, Counter
+from hive.analytics.profile_cache import PROFILE_INVALIDATION_CHANNEL
 
 logger = logging.getLogger(__name__)
 
@@ -404,15 +405,26 @@ class BaseliningService:
     def _save_profiles(self, user_profiles: Dict, host_profiles: Dict):
         """Sauvegarde les profils dans Redis."""
         try:
+            pipeline = self.redis.pipeline()
+            
             # Sauvegarder les profils utilisateur
             for user_id, profile in user_profiles.items():
                 key = f"user_profile:{user_id}"
-                self.redis.set(key, json.dumps(profile), ex=24*3600)  # Expire après 24h
+                pipeline.set(key, json.dumps(profile), ex=24*3600)  # Expire après 24h
             
             # Sauvegarder les profils hôte
             for host_id, profile in host_profiles.items():
                 key = f"host_profile:{host_id}"
-                self.redis.set(key, json.dumps(profile), ex=24*3600)  # Expire après 24h
+                pipeline.set(key, json.dumps(profile), ex=24*3600)  # Expire après 24h
+            
+            # Prévenir les caches locaux (AnomalyDetector) que ces profils ont changé
+            if user_profiles or host_profiles:
+                pipeline.publish(PROFILE_INVALIDATION_CHANNEL, json.dumps({
+                    'users': list(user_profiles.keys()),
+                    'hosts': list(host_profiles.keys())
+                }))
+            
+            pipeline.execute()
             
             # Mettre à jour le cache
             self.profile_cache.update(user_profiles)
@@ -460,6 +472,34 @@ class BaseliningService:
             logger.error(f"Error getting host profile for {host_id}: {e}")
             return None
 
+    def get_user_profiles(self, user_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Récupère les profils de plusieurs utilisateurs en un seul aller-retour Redis."""
+        return self._get_profiles_batch("user_profile", user_ids)
+
+    def get_host_profiles(self, host_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Récupère les profils de plusieurs hôtes en un seul aller-retour Redis."""
+        return self._get_profiles_batch("host_profile", host_ids)
+
+    def _get_profiles_batch(self, prefix: str, ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Récupère un lot de profils avec MGET.
+        Une erreur Redis est propagée : un échec ne doit pas passer pour des profils absents
+        (le cache de profils les retiendrait comme tels jusqu'à expiration).
+        """
+        if not ids:
+            return {}
+        
+        try:
+            values = self.redis.mget([f"{prefix}:{entity_id}" for entity_id in ids])
+            return {
+                entity_id: json.loads(value) if value else None
+                for entity_id, value in zip(ids, values)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting {prefix} batch: {e}")
+            raise
+
     def get_profile_statistics(self) -> Dict[str, Any]:
         """Récupère les statistiques des profils."""
         try:
@@ -0,0 +1,176 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Canal Redis sur lequel le BaseliningService publie les profils modifiés
+PROFILE_INVALIDATION_CHANNEL = "profile_updates"
+
+# Marqueur pour mémoriser l'absence de profil (cache négatif)
+_MISSING = object()
+
+
+class ProfileCache:
+    """Cache local TTL + LRU des profils utilisateur/hôte désérialisés."""
+
+    def __init__(self, profile_db, redis_client=None, max_entries: int = 10000, ttl: int = 300):
+        """
+        Args:
+            profile_db: Source des profils (get_user_profile / get_host_profile)
+            redis_client: Client Redis utilisé pour recevoir les invalidations
+            max_entries: Nombre maximum de profils gardés en mémoire
+            ttl: Durée de validité d'une entrée en secondes
+        """
+        self.profiles = profile_db
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Générations des clés en cours de lecture, incrémentées à chaque invalidation :
+        # un profil lu avant une invalidation n'est pas inséré dans le cache
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._inflight: Dict[Tuple[str, str], int] = {}
+        self._epoch = 0
+        self._pubsub = None
+        self._listener = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère le profil d'un utilisateur en passant par le cache."""
+        return self.get_many('user', [user_id]).get(user_id)
+
+    def get_host_profile(self, host_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère le profil d'un hôte en passant par le cache."""
+        return self.get_many('host', [host_id]).get(host_id)
+
+    def get_many(self, kind: str, ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Résout un ensemble d'identifiants ('user' ou 'host') en profils.
+        Chaque identifiant distinct n'est demandé qu'une fois à la base de profils.
+        Un profil invalidé pendant sa lecture est retourné mais pas mis en cache.
+        """
+        resolved = {}
+        missing = {}
+        now = time.monotonic()
+
+        with self._lock:
+            epoch = self._epoch
+            for entity_id in set(ids):
+                key = (kind, entity_id)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    resolved[entity_id] = None if entry[1] is _MISSING else entry[1]
+                    self.hits += 1
+                else:
+                    missing[entity_id] = self._generations.get(key, 0)
+                    self._inflight[key] = self._inflight.get(key, 0) + 1
+                    self.misses += 1
+
+        if missing:
+            fetched = None
+            try:
+                fetched = self._fetch(kind, list(missing))
+            finally:
+                expires_at = time.monotonic() + self.ttl
+                with self._lock:
+                    for entity_id, generation in missing.items():
+                        key = (kind, entity_id)
+                        current = self._generations.get(key, 0)
+                        self._release(key)
+                        if fetched is None:
+                            continue
+                        profile = fetched.get(entity_id)
+                        resolved[entity_id] = profile
+                        if current != generation or self._epoch != epoch:
+                            continue
+                        self._entries[key] = (expires_at, _MISSING if profile is None else profile)
+                        self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+        return resolved
+
+    def _release(self, key: Tuple[str, str]):
+        """Fin d'une lecture de la clé (appelé sous verrou)."""
+        remaining = self._inflight.get(key, 1) - 1
+        if remaining > 0:
+            self._inflight[key] = remaining
+        else:
+            self._inflight.pop(key, None)
+            self._generations.pop(key, None)
+
+    def _fetch(self, kind: str, ids: list) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Récupère des profils depuis la base, en lot si elle le permet."""
+        batch_getter = getattr(self.profiles, f"get_{kind}_profiles", None)
+        if batch_getter is not None:
+            return batch_getter(ids)
+
+        getter = getattr(self.profiles, f"get_{kind}_profile")
+        return {entity_id: getter(entity_id) for entity_id in ids}
+
+    def invalidate(self, kind: str, ids: Iterable[str]):
+        """Retire des profils du cache, y compris ceux en cours de lecture."""
+        with self._lock:
+            for entity_id in ids:
+                key = (kind, entity_id)
+                self._entries.pop(key, None)
+                if key in self._inflight:
+                    self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        """Vide entièrement le cache (les lectures en cours ne seront pas insérées)."""
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def _on_invalidation(self, message: Dict[str, Any]):
+        """Traite un message d'invalidation publié par le BaseliningService."""
+        try:
+            payload = json.loads(message['data'])
+            self.invalidate('user', payload.get('users', []))
+            self.invalidate('host', payload.get('hosts', []))
+        except Exception as e:
+            # En cas de message illisible, on préfère repartir d'un cache vide
+            logger.error(f"Invalid profile invalidation message, clearing cache: {e}")
+            self.clear()
+
+    def start_invalidation_listener(self):
+        """S'abonne au canal Redis d'invalidation des profils."""
+        if not self.redis or self._listener:
+            return
+
+        try:
+            self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{PROFILE_INVALIDATION_CHANNEL: self._on_invalidation})
+            self._listener = self._pubsub.run_in_thread(sleep_time=1, daemon=True)
+            logger.info(f"Listening for profile invalidations on '{PROFILE_INVALIDATION_CHANNEL}'")
+        except Exception as e:
+            logger.error(f"Error starting profile invalidation listener: {e}")
+
+    def stop_invalidation_listener(self):
+        """Arrête l'écoute des invalidations."""
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+        if self._pubsub:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Récupère les statistiques du cache."""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0
+        }
@@ -0,0 +1,228 @@
+import logging
+from typing import Dict, Any, Optional, List
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Codes des types d'événements dans les tableaux du lot
+EVENT_TYPE_CODES = {
+    'process_launch': 1,
+    'network_connection': 2,
+    'file_access': 3,
+    'shell_history': 4
+}
+
+
+class _ProfileView:
+    """Vue précalculée (ensembles, heures de travail) d'un profil pour un lot."""
+
+    __slots__ = ('present', 'common_processes', 'rare_processes', 'common_ports',
+                 'host_common_ports', 'common_commands', 'start_hour', 'end_hour', 'hours_valid')
+
+    def __init__(self, profile: Optional[Dict[str, Any]]):
+        self.present = bool(profile)
+        profile = profile or {}
+        self.common_processes = set(profile.get('common_processes', []))
+        self.rare_processes = set(profile.get('rare_processes', []))
+        self.common_ports = set(profile.get('network_patterns', {}).get('common_ports', []))
+        self.host_common_ports = set(profile.get('network_activity', {}).get('common_ports', []))
+        self.common_commands = set(profile.get('command_patterns', {}).get('common_commands', []))
+        try:
+            work_hours = profile.get('normal_work_hours', {})
+            self.start_hour = int(work_hours.get('start', '09:00').split(':')[0])
+            self.end_hour = int(work_hours.get('end', '17:00').split(':')[0])
+            self.hours_valid = True
+        except Exception:
+            self.start_hour, self.end_hour, self.hours_valid = -1, -1, False
+
+
+class VectorizedAnomalyScorer:
+    """
+    Score un lot d'événements avec NumPy.
+    Produit les mêmes scores, raisons et criticités que AnomalyDetector.score_event.
+    """
+
+    def __init__(self, detector):
+        self.detector = detector
+        self._suspicious_processes = set(detector.SUSPICIOUS_PROCESSES)
+        self._suspicious_ports = set(detector.SUSPICIOUS_PORTS)
+
+    def score(self, events: List[Dict[str, Any]], user_profiles: List[Optional[Dict]],
+              host_profiles: List[Optional[Dict]]) -> List[Dict[str, Any]]:
+        """Score les événements à partir des profils résolus (un par événement)."""
+        n = len(events)
+        if n == 0:
+            return events
+
+        thresholds = self.detector.anomaly_thresholds
+        views = {}
+
+        def view_of(profile):
+            key = id(profile)
+            if key not in views:
+                views[key] = _ProfileView(profile)
+            return views[key]
+
+        # Colonnes extraites du lot
+        cols = {name: np.zeros(n, dtype=bool) for name in (
+            'proc_user_rare', 'proc_user_uncommon', 'proc_host_uncommon', 'proc_suspicious',
+            'net_user_port', 'net_host_port', 'net_suspicious_port', 'net_threat_intel',
+            'file_suspicious_ext', 'shell_user_uncommon', 'shell_download',
+            'temporal_ok', 'temporal_hours', 'ctx_process', 'ctx_command', 'ctx_file',
+            'ctx_off_hours', 'ctx_weekend', 'ctx_tag_threat', 'ctx_tag_process', 'failed'
+        )}
+        sensitive_idx = np.full(n, -1, dtype=np.int16)
+        suspicious_cmd_idx = np.full(n, -1, dtype=np.int16)
+        recon_idx = np.full(n, -1, dtype=np.int16)
+        hours = np.zeros(n, dtype=np.int8)
+        weekdays = np.zeros(n, dtype=np.int8)
+        start_hours = np.zeros(n, dtype=np.int32)
+        end_hours = np.zeros(n, dtype=np.int32)
+        labels: List[Any] = [None] * n
+
+        for i, event in enumerate(events):
+            try:
+                user_view = view_of(user_profiles[i])
+                host_view = view_of(host_profiles[i])
+                data = event.get('data', {})
+                event_type = EVENT_TYPE_CODES.get(event.get('type'), 0)
+
+                if event_type == 1:
+                    process_name = data.get('process_name', '')
+                    if process_name:
+                        labels[i] = process_name
+                        if user_view.present:
+                            if process_name in user_view.rare_processes:
+                                cols['proc_user_rare'][i] = True
+                            elif process_name not in user_view.common_processes:
+                                cols['proc_user_uncommon'][i] = True
+                        if host_view.present and process_name not in host_view.common_processes:
+                            cols['proc_host_uncommon'][i] = True
+                        cols['proc_suspicious'][i] = process_name.lower() in self._suspicious_processes
+
+                elif event_type == 2:
+                    if data.get('peer_address'):
+                        peer_port = data.get('peer_port')
+                        labels[i] = peer_port
+                        if user_view.present and peer_port and peer_port not in user_view.common_ports:
+                            cols['net_user_port'][i] = True
+                        if host_view.present and peer_port and peer_port not in host_view.host_common_ports:
+                            cols['net_host_port'][i] = True
+                        cols['net_suspicious_port'][i] = peer_port in self._suspicious_ports
+                        cols['net_threat_intel'][i] = bool(event.get('threat_intel'))
+
+                elif event_type == 3:
+                    file_path = data.get('file_path', '')
+                    if file_path:
+                        sensitive_idx[i] = self._first_index(self.detector.SENSITIVE_PATHS_MATCHER, file_path)
+                        file_extension = file_path.lower().split('.')[-1] if '.' in file_path else ''
+                        labels[i] = file_extension
+                        cols['file_suspicious_ext'][i] = file_extension in self.detector.SUSPICIOUS_EXTENSIONS
+
+                elif event_type == 4:
+                    command = data.get('command', '')
+                    if command:
+                        if user_view.present:
+                            cmd_parts = command.split()
+                            if cmd_parts and cmd_parts[0] not in user_view.common_commands:
+                                cols['shell_user_uncommon'][i] = True
+                                labels[i] = cmd_parts[0]
+                        suspicious_cmd_idx[i] = self._first_index(self.detector.SUSPICIOUS_COMMANDS_MATCHER, command)
+                        cols['shell_download'][i] = self.detector.DOWNLOAD_INDICATORS_MATCHER.search(command)
+                        recon_idx[i] = self._first_index(self.detector.RECON_COMMANDS_MATCHER, command)
+
+                # Aspects temporels : même règle d'échec que _score_temporal_aspects
+                timestamp = event.get('timestamp')
+                if timestamp:
+                    try:
+                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                        if user_view.present and not user_view.hours_valid:
+                            raise ValueError("invalid normal_work_hours in user profile")
+                        hours[i] = dt.hour
+                        weekdays[i] = dt.weekday()
+                        cols['temporal_ok'][i] = True
+                        if user_view.present:
+                            cols['temporal_hours'][i] = True
+                            start_hours[i] = user_view.start_hour
+                            end_hours[i] = user_view.end_hour
+                    except Exception as e:
+                        logger.error(f"Error analyzing temporal aspects: {e}")
+
+                # Aspects contextuels
+                cols['ctx_process'][i] = bool(event.get('suspicious_process'))
+                cols['ctx_command'][i] = bool(event.get('suspicious_command'))
+                cols['ctx_file'][i] = bool(event.get('suspicious_file'))
+                cols['ctx_off_hours'][i] = bool(event.get('off_hours'))
+                cols['ctx_weekend'][i] = bool(event.get('weekend'))
+                tags = event.get('tags', [])
+                cols['ctx_tag_threat'][i] = 'threat_intel_match' in tags
+                cols['ctx_tag_process'][i] = 'suspicious_process' in tags
+
+            except Exception:
+                # Cas atypique : on délègue au scoring unitaire pour garantir la parité
+                cols['failed'][i] = True
+
+        off_hours = cols['temporal_hours'] & ((hours < start_hours) | (hours > end_hours))
+        weekend = cols['temporal_ok'] & (weekdays >= 5)
+
+        # Colonnes dans l'ordre exact des raisons produites par score_event
+        rules = [
+            (cols['proc_user_rare'], thresholds['process_launch'], lambda i: f"Rare process for user: {labels[i]}"),
+            (cols['proc_user_uncommon'], thresholds['process_launch'] // 2, lambda i: f"Uncommon process for user: {labels[i]}"),
+            (cols['proc_host_uncommon'], 5, lambda i: f"Uncommon process for host: {labels[i]}"),
+            (cols['proc_suspicious'], thresholds['suspicious_process'], lambda i: f"Suspicious process: {labels[i]}"),
+            (cols['net_user_port'], 10, lambda i: f"Uncommon port for user: {labels[i]}"),
+            (cols['net_host_port'], 5, lambda i: f"Uncommon port for host: {labels[i]}"),
+            (cols['net_suspicious_port'], 15, lambda i: f"Suspicious port: {labels[i]}"),
+            (cols['net_threat_intel'], 50, lambda i: "IP found in threat intelligence feeds"),
+            (sensitive_idx >= 0, thresholds['file_access'],
+             lambda i: f"Access to sensitive path: {self.detector.SENSITIVE_PATHS[sensitive_idx[i]]}"),
+            (cols['file_suspicious_ext'], 10, lambda i: f"Access to suspicious file type: .{labels[i]}"),
+            (cols['shell_user_uncommon'], 10, lambda i: f"Uncommon command for user: {labels[i]}"),
+            (suspicious_cmd_idx >= 0, thresholds['suspicious_command'],
+             lambda i: f"Suspicious command: {self.detector.SUSPICIOUS_COMMANDS[suspicious_cmd_idx[i]]}"),
+            (cols['shell_download'], 20, lambda i: "Download attempt detected"),
+            (recon_idx >= 0, 15, lambda i: f"Reconnaissance command: {self.detector.RECON_COMMANDS[recon_idx[i]]}"),
+            (off_hours, thresholds['off_hours'], lambda i: f"Activity outside work hours: {hours[i]:02d}:00"),
+            (weekend, thresholds['weekend'], lambda i: "Weekend activity detected"),
+            (cols['ctx_process'], 10, lambda i: "Process marked as suspicious"),
+            (cols['ctx_command'], 15, lambda i: "Command marked as suspicious"),
+            (cols['ctx_file'], 10, lambda i: "File access marked as suspicious"),
+            (cols['ctx_off_hours'], 5, lambda i: "Activity during off hours"),
+            (cols['ctx_weekend'], 5, lambda i: "Weekend activity"),
+            (cols['ctx_tag_threat'], 30, lambda i: "Threat intelligence match"),
+            (cols['ctx_tag_process'], 20, lambda i: "Suspicious process tag"),
+        ]
+
+        scores = np.zeros(n, dtype=np.int64)
+        reasons: List[List[str]] = [[] for _ in range(n)]
+        for mask, weight, reason in rules:
+            scores += mask * weight
+            for i in np.flatnonzero(mask):
+                reasons[i].append(reason(i))
+
+        # Mêmes paliers que AnomalyDetector._determine_criticality
+        criticality = np.select(
+            [scores >= 80, scores >= 50, scores >= 25, scores >= 10],
+            ['critical', 'high', 'medium', 'low'],
+            default='info'
+        )
+
+        for i, event in enumerate(events):
+            if cols['failed'][i]:
+                self.detector._score_with_profiles(event, user_profiles[i], host_profiles[i])
+                continue
+            event['anomaly_score'] = int(scores[i])
+            event['anomaly_reasons'] = reasons[i]
+            event['criticality'] = str(criticality[i])
+            if scores[i] > 0:
+                event['tags'] = event.get('tags', []) + ['anomaly_detected']
+
+        return events
+
+    @staticmethod
+    def _first_index(matcher, text: str) -> int:
+        """Retourne l'index du premier motif présent dans le texte, -1 sinon."""
+        indices = matcher.match_indices(text)
+        return indices[0] if indices else -1
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 from datetime import datetime
+from sqlalchemy.orm import Session
 import logging
 
+from hive.database import get_db, list_timeline_events
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/data", tags=["data"])
@@ -80,73 +83,56 @@ async def execute_query(query: DataQuery):
 
 @router.get("/events", response_model=List[EventData])
 async def get_events(
+    response: Response,
     event_type: Optional[str] = None,
     source: Optional[str] = None,
     severity: Optional[str] = None,
-    limit: int = Query(100, le=1000),
-    offset: int = Query(0, ge=0)
+    case_id: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
 ):
-    """Récupère les événements avec filtres."""
+    """
+    Récupère les événements avec filtres. Filtrage, tri et pagination sont faits
+    en SQL ; le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
+    """
     try:
-        # Simulation d'événements
-        events = [
-            {
-                "id": "event_1",
-                "type": "process_launch",
-                "timestamp": datetime.now(),
-                "source": "agent_001",
-                "data": {
-                    "process_name": "chrome.exe",
-                    "pid": 1234,
-                    "user": "john.doe"
-                },
-                "severity": "info",
-                "tags": ["browser", "normal"]
-            },
-            {
-                "id": "event_2",
-                "type": "network_connection",
-                "timestamp": datetime.now(),
-                "source": "agent_002",
-                "data": {
-                    "remote_ip": "192.168.1.100",
-                    "remote_port": 443,
-                    "local_port": 54321
-                },
-                "severity": "medium",
-                "tags": ["network", "https"]
-            },
-            {
-                "id": "event_3",
-                "type": "file_access",
-                "timestamp": datetime.now(),
-                "source": "agent_001",
-                "data": {
-                    "file_path": "C:\\Windows\\System32\\config\\SAM",
-                    "access_type": "read"
-                },
-                "severity": "high",
-                "tags": ["sensitive_file", "suspicious"]
-            }
-        ]
-        
-        # Appliquer les filtres
-        if event_type:
-            events = [e for e in events if e["type"] == event_type]
-        
-        if source:
-            events = [e for e in events if e["source"] == source]
-        
-        if severity:
-            events = [e for e in events if e["severity"] == severity]
-        
-        # Appliquer la pagination
-        return events[offset:offset + limit]
-    
+        events, next_cursor = list_timeline_events(
+            db,
+            case_id=case_id,
+            event_type=event_type,
+            source=source,
+            severity=severity,
+            start_time=start_time,
+            end_time=end_time,
+            descending=order != "asc",
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting events: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [
+        {
+            "id": event.id,
+            "type": event.event_type,
+            "timestamp": event.timestamp,
+            "source": event.source,
+            "data": event.data or {},
+            "severity": (event.data or {}).get("severity"),
+            "tags": event.tags or []
+        }
+        for event in events
+    ]
+
 @router.get("/events/{event_id}", response_model=EventData)
 async def get_event(event_id: str):
     """Récupère un événement spécifique."""
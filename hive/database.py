@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, JSON, Boolean, Index, and_, or_, tuple_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
 import os
 
 # Configuration de la base de données
@@ -33,6 +36,12 @@ class Query(Base):
     results = Column(JSON)
     case = relationship("Case", back_populates="queries")
 
+    __table_args__ = (
+        Index("idx_queries_case_created", "case_id", "created_at", "id"),
+        Index("idx_queries_status_created", "status", "created_at", "id"),
+        Index("idx_queries_created", "created_at", "id"),
+    )
+
 class Agent(Base):
     __tablename__ = "agents"
 
@@ -56,6 +65,15 @@ class Alert(Base):
     status = Column(String, default="new")
     alert_data = Column(JSON)
 
+    # Index composites couvrant les filtres du tri des alertes + la pagination par curseur
+    __table_args__ = (
+        Index("idx_alerts_status_severity_created", "status", "severity", "created_at", "id"),
+        Index("idx_alerts_status_created", "status", "created_at", "id"),
+        Index("idx_alerts_severity_created", "severity", "created_at", "id"),
+        Index("idx_alerts_case_created", "case_id", "created_at", "id"),
+        Index("idx_alerts_created", "created_at", "id"),
+    )
+
 class TimelineEvent(Base):
     __tablename__ = "timeline_events"
 
@@ -67,6 +85,13 @@ class TimelineEvent(Base):
     data = Column(JSON)
     tags = Column(JSON, default=list)
 
+    __table_args__ = (
+        Index("idx_timeline_case_timestamp", "case_id", "timestamp", "id"),
+        Index("idx_timeline_type_timestamp", "event_type", "timestamp", "id"),
+        Index("idx_timeline_source_timestamp", "source", "timestamp", "id"),
+        Index("idx_timeline_timestamp", "timestamp", "id"),
+    )
+
 class User(Base):
     __tablename__ = "users"
 
@@ -78,6 +103,142 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+# Pagination par curseur (keyset) : la page suivante reprend après la dernière
+# ligne vue (valeur de tri, id) au lieu de parcourir les lignes avec OFFSET.
+# Le curseur porte aussi le champ et le sens du tri : il n'est valable que pour
+# le tri qui l'a produit. Une valeur de tri NULL est plus grande que toute autre
+# (ordre par défaut de PostgreSQL, suivi par les index) : en fin de liste en tri
+# croissant, en tête en tri décroissant.
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(sort_field: str, descending: bool, sort_value: Any, row_id: str) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    payload = json.dumps({"sort": sort_field, "order": "desc" if descending else "asc",
+                          "value": sort_value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, bool, Any, str]:
+    """Retourne (champ de tri, tri décroissant, valeur de tri, id) d'un curseur."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        sort_field, order, sort_value, row_id = payload["sort"], payload["order"], payload["value"], payload["id"]
+        if isinstance(sort_value, dict) and "dt" in sort_value:
+            sort_value = datetime.fromisoformat(sort_value["dt"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Curseur invalide : {e}")
+    if order not in ("asc", "desc") or not isinstance(row_id, str):
+        raise ValueError("Curseur invalide")
+    return sort_field, order == "desc", sort_value, row_id
+
+def paginate(query, model, sort_field: str, descending: bool = True, cursor: Optional[str] = None,
+             limit: int = 100) -> Tuple[List[Any], Optional[str]]:
+    """
+    Applique tri et pagination par curseur à une requête SQLAlchemy.
+    Retourne (lignes, curseur de la page suivante ou None).
+    Lève ValueError si le curseur est invalide ou issu d'un autre tri.
+    """
+    sort_column = getattr(model, sort_field)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        cursor_field, cursor_descending, sort_value, row_id = decode_cursor(cursor)
+        if cursor_field != sort_field or cursor_descending != descending:
+            raise ValueError("Curseur issu d'un autre tri")
+        if sort_value is not None and isinstance(sort_column.type, DateTime) != isinstance(sort_value, datetime):
+            raise ValueError("Curseur invalide : valeur de tri incompatible")
+
+        position = tuple_(sort_column, model.id)
+        if descending:
+            if sort_value is None:
+                query = query.filter(or_(and_(sort_column.is_(None), model.id < row_id), sort_column.isnot(None)))
+            else:
+                query = query.filter(position < (sort_value, row_id))
+        else:
+            if sort_value is None:
+                query = query.filter(sort_column.is_(None), model.id > row_id)
+            else:
+                query = query.filter(or_(position > (sort_value, row_id), sort_column.is_(None)))
+
+    if descending:
+        query = query.order_by(sort_column.desc().nulls_first(), model.id.desc())
+    else:
+        query = query.order_by(sort_column.asc().nulls_last(), model.id.asc())
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort_field, descending, getattr(last, sort_field), last.id)
+
+# La sévérité n'est pas triable : son ordre lexicographique ne correspond pas à sa gravité
+ALERT_SORT_FIELDS = ("created_at", "status")
+
+def alert_to_dict(alert: Alert) -> Dict[str, Any]:
+    return {
+        "id": alert.id,
+        "case_id": alert.case_id,
+        "severity": alert.severity,
+        "title": alert.title,
+        "description": alert.description,
+        "created_at": alert.created_at.isoformat() if alert.created_at else None,
+        "status": alert.status,
+        "alert_data": alert.alert_data
+    }
+
+def list_alerts(db, status: Optional[str] = None, severity: Optional[str] = None, case_id: Optional[str] = None,
+                created_after: Optional[datetime] = None, created_before: Optional[datetime] = None,
+                sort: str = "created_at", descending: bool = True, cursor: Optional[str] = None,
+                limit: int = 100) -> Tuple[List[Alert], Optional[str]]:
+    """Alertes filtrées, triées et paginées en SQL."""
+    if sort not in ALERT_SORT_FIELDS:
+        raise ValueError(f"Tri non supporté : {sort}")
+    query = db.query(Alert)
+    if status:
+        query = query.filter(Alert.status == status)
+    if severity:
+        query = query.filter(Alert.severity == severity)
+    if case_id:
+        query = query.filter(Alert.case_id == case_id)
+    if created_after:
+        query = query.filter(Alert.created_at >= created_after)
+    if created_before:
+        query = query.filter(Alert.created_at <= created_before)
+    return paginate(query, Alert, sort, descending, cursor, limit)
+
+def list_queries(db, case_id: Optional[str] = None, status: Optional[str] = None, descending: bool = True,
+                 cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Query], Optional[str]]:
+    """Requêtes filtrées et paginées en SQL, des plus récentes aux plus anciennes par défaut."""
+    query = db.query(Query)
+    if case_id:
+        query = query.filter(Query.case_id == case_id)
+    if status:
+        query = query.filter(Query.status == status)
+    return paginate(query, Query, "created_at", descending, cursor, limit)
+
+def list_timeline_events(db, case_id: Optional[str] = None, event_type: Optional[str] = None,
+                         source: Optional[str] = None, severity: Optional[str] = None, start_time: Optional[datetime] = None,
+                         end_time: Optional[datetime] = None, descending: bool = True,
+                         cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[TimelineEvent], Optional[str]]:
+    """Événements filtrés et paginés en SQL."""
+    query = db.query(TimelineEvent)
+    if case_id:
+        query = query.filter(TimelineEvent.case_id == case_id)
+    if event_type:
+        query = query.filter(TimelineEvent.event_type == event_type)
+    if source:
+        query = query.filter(TimelineEvent.source == source)
+    if severity:
+        query = query.filter(TimelineEvent.data["severity"].as_string() == severity)
+    if start_time:
+        query = query.filter(TimelineEvent.timestamp >= start_time)
+    if end_time:
+        query = query.filter(TimelineEvent.timestamp <= end_time)
+    return paginate(query, TimelineEvent, "timestamp", descending, cursor, limit)
+
 # Création des tables
 def init_db():
     Base.metadata.create_all(bind=engine)
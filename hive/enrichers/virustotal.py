@@ -1,87 +1,434 @@
+import asyncio
 import logging
-import requests
+import sqlite3
+import threading
+import httpx
 import time
 import json
-from typing import Optional, Dict
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Dict, Iterable, Callable, List, Tuple
 from pathlib import Path
-from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Marqueur d'absence d'entrée dans le cache (None signifie "résultat inconnu")
+_MISSING = object()
+
+
+class TokenBucket:
+    """Limiteur de débit à jetons (asyncio)."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Args:
+            rate: Nombre de jetons regagnés par seconde
+            capacity: Nombre maximum de jetons accumulés
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Attend qu'un jeton soit disponible et le consomme."""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, seconds: float):
+        """Vide le seau pour respecter un refus de l'API (quota dépassé)."""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class VirusTotalCache:
+    """Cache persistant (SQLite) des résultats VirusTotal, partagé entre processus."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vt_cache ("
+            "sha256 TEXT PRIMARY KEY, positives INTEGER, found INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, hashes: List[str]) -> Dict[str, Tuple[float, int]]:
+        """Retourne (expiration, détections) des résultats non expirés pour les hashes demandés."""
+        results = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT sha256, expires_at, positives FROM vt_cache WHERE expires_at > ? "
+                    f"AND sha256 IN ({','.join('?' * len(chunk))})",
+                    [now, *chunk]
+                ).fetchall()
+                results.update((sha256, (expires_at, positives)) for sha256, expires_at, positives in rows)
+        return results
+
+    def put_many(self, entries: Iterable[Tuple[str, int, bool, float]]):
+        """Enregistre des résultats (sha256, positives, trouvé, expiration)."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vt_cache (sha256, positives, found, expires_at) VALUES (?, ?, ?, ?)",
+                [(sha256, positives, int(found), expires_at) for sha256, positives, found, expires_at in entries]
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées expirées."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM vt_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vt_cache").fetchone()[0]
+
+
 class VirusTotalEnricher:
-    """Classe pour enrichir les données avec les informations de VirusTotal."""
-    
-    def __init__(self, api_key: Optional[str] = None, cache_duration: int = 86400):
+    """
+    Classe pour enrichir les données avec les informations de VirusTotal.
+    Les appelants ne consultent que le cache mémoire : le cache persistant
+    (SQLite) et l'API sont interrogés par le worker, sur sa propre boucle.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, cache_duration: int = 86400,
+                 negative_cache_duration: int = 3600, cache_path: str = 'cache/virustotal.db',
+                 requests_per_minute: int = 4, batch_size: int = 4, max_queue_size: int = 100000,
+                 max_memory_entries: int = 100000):
         """
         Initialise l'enrichisseur VirusTotal avec une clé API optionnelle.
-        
+
         Args:
             api_key: Clé API VirusTotal
             cache_duration: Durée de validité du cache en secondes (24h par défaut)
+            negative_cache_duration: Durée de validité des hashes inconnus de VirusTotal
+            cache_path: Base SQLite partagée par les processus de la ruche
+            requests_per_minute: Quota de l'API (4/min pour l'API gratuite)
+            batch_size: Nombre de hashes par requête (4 pour l'API gratuite)
+            max_queue_size: Nombre maximum de hashes en attente d'interrogation
+            max_memory_entries: Nombre maximum d'entrées du cache mémoire (LRU)
         """
         self.api_key = api_key
         self.base_url = "https://www.virustotal.com/vtapi/v2"
-        self.cache = {}
-        self.last_request_time = 0
-        self.min_request_interval = 15  # Secondes entre les requêtes (limite de l'API gratuite)
         self.cache_duration = cache_duration
-        self.cache_file = Path('cache/virustotal.json')
-        self._load_cache()
-        
-    def _load_cache(self):
-        """Charge le cache depuis le fichier."""
-        try:
-            if self.cache_file.exists():
-                with open(self.cache_file, 'r') as f:
-                    self.cache = json.load(f)
-                logger.info(f"Cache VirusTotal chargé : {len(self.cache)} entrées")
-        except Exception as e:
-            logger.error(f"Erreur lors du chargement du cache : {e}")
-            self.cache = {}
-            
-    def _save_cache(self):
-        """Sauvegarde le cache dans le fichier."""
+        self.negative_cache_duration = negative_cache_duration
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self.requests_per_minute = requests_per_minute
+        self.max_memory_entries = max_memory_entries
+
+        # Cache mémoire (LRU) devant le cache persistant : sha256 -> (expiration, détections)
+        self.cache: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_file = Path(cache_path)
+        self.persistent_cache = VirusTotalCache(self.cache_file)
+        self._import_legacy_cache(Path('cache/virustotal.json'))
+
+        # Boucle asyncio dédiée au worker d'interrogation
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        # Hashes à chercher dans le cache persistant, puis hashes à demander à l'API
+        self._lookups: Optional[asyncio.Queue] = None
+        self._queue: Optional[asyncio.Queue] = None
+        # Hashes en file ou en cours d'interrogation (coalescence des demandes)
+        self._pending: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._bucket: Optional[TokenBucket] = None
+        self.stats = {'memory_hits': 0, 'persistent_hits': 0, 'api_requests': 0, 'coalesced': 0, 'dropped': 0,
+                      'requeued': 0}
+
+    def _import_legacy_cache(self, legacy_file: Path):
+        """Reprend l'ancien cache JSON (sans date d'expiration) dans la base SQLite."""
         try:
-            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f)
+            if legacy_file.exists() and self.persistent_cache.count() == 0:
+                with open(legacy_file, 'r') as f:
+                    legacy = json.load(f)
+                expires_at = time.time() + self.cache_duration
+                self.persistent_cache.put_many(
+                    (sha256, positives, True, expires_at) for sha256, positives in legacy.items()
+                )
+                logger.info(f"Cache VirusTotal importé : {len(legacy)} entrées")
         except Exception as e:
-            logger.error(f"Erreur lors de la sauvegarde du cache : {e}")
-        
-    def enrich(self, sha256_hash: str) -> Optional[int]:
-        """Enrichit les données avec les informations de VirusTotal."""
+            logger.error(f"Erreur lors de l'import de l'ancien cache : {e}")
+
+    def _memory_get(self, sha256_hash: str, now: float) -> Optional[Tuple[float, int]]:
+        """Entrée non expirée du cache mémoire (marquée comme récemment utilisée)."""
+        with self._cache_lock:
+            entry = self.cache.get(sha256_hash)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self.cache[sha256_hash]
+                return None
+            self.cache.move_to_end(sha256_hash)
+            return entry
+
+    def _remember(self, entries: Iterable[Tuple[str, Tuple[float, int]]]):
+        """Ajoute des entrées au cache mémoire en évinçant les moins récemment utilisées."""
+        with self._cache_lock:
+            for sha256_hash, entry in entries:
+                self.cache[sha256_hash] = entry
+                self.cache.move_to_end(sha256_hash)
+            while len(self.cache) > self.max_memory_entries:
+                self.cache.popitem(last=False)
+
+    def _cached(self, sha256_hash: str):
+        """Recherche un résultat dans le cache mémoire (jamais d'accès disque pour l'appelant)."""
+        entry = self._memory_get(sha256_hash, time.time())
+        if entry is not None:
+            self.stats['memory_hits'] += 1
+            return entry[1]
+        return _MISSING
+
+    def enrich(self, sha256_hash: str, callback: Optional[Callable[[str, Optional[int]], None]] = None) -> Optional[int]:
+        """
+        Enrichit les données avec les informations de VirusTotal sans bloquer l'appelant.
+
+        Retourne le nombre de détections s'il est dans le cache mémoire ; sinon le hash
+        est confié au worker (cache persistant, puis API), None est retourné et
+        callback(hash, détections) est appelé (depuis le thread du worker) lorsque
+        le résultat arrive.
+        """
         if not self.api_key:
             logging.debug("Pas de clé API VirusTotal configurée")
             return None
 
-        # Vérifier le cache
-        if sha256_hash in self.cache:
-            return self.cache[sha256_hash]
+        cached = self._cached(sha256_hash)
+        if cached is not _MISSING:
+            return cached
 
-        # Respecter la limite de l'API
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last_request)
+        future = self.submit(sha256_hash)
+        if callback is not None and future is not None:
+            future.add_done_callback(lambda f: callback(sha256_hash, None if f.exception() else f.result()))
+        return None
 
+    def enrich_many(self, hashes: Iterable[str]) -> Dict[str, int]:
+        """
+        Retourne les résultats du cache mémoire et confie les autres hashes au worker.
+        Destiné aux chasses portant sur de nombreux hashes.
+        """
+        if not self.api_key:
+            return {}
+
+        results = {}
+        now = time.time()
+        for sha256_hash in set(hashes):
+            entry = self._memory_get(sha256_hash, now)
+            if entry is not None:
+                results[sha256_hash] = entry[1]
+            else:
+                self.submit(sha256_hash)
+        self.stats['memory_hits'] += len(results)
+        return results
+
+    async def enrich_async(self, sha256_hash: str) -> Optional[int]:
+        """Attend le résultat VirusTotal d'un hash sans bloquer la boucle appelante."""
+        if not self.api_key:
+            return None
+
+        cached = self._cached(sha256_hash)
+        if cached is not _MISSING:
+            return cached
+
+        future = self.submit(sha256_hash)
+        if future is None:
+            return None
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enrichissement VirusTotal de {sha256_hash}: {e}")
+            return None
+
+    def submit(self, sha256_hash: str) -> Optional[Future]:
+        """
+        Met un hash en file d'interrogation sans attendre (cache persistant, puis API).
+        Les demandes concurrentes pour un même hash partagent la même requête.
+        Retourne un concurrent.futures.Future, ou None si la file est pleine.
+        """
+        loop = self._ensure_worker()
+        with self._pending_lock:
+            future = self._pending.get(sha256_hash)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future
+
+            if len(self._pending) >= self.max_queue_size:
+                self.stats['dropped'] += 1
+                logger.warning(f"File VirusTotal pleine, hash ignoré : {sha256_hash}")
+                return None
+
+            future = Future()
+            self._pending[sha256_hash] = future
+
+        loop.call_soon_threadsafe(self._lookups.put_nowait, sha256_hash)
+        return future
+
+    def _ensure_worker(self) -> asyncio.AbstractEventLoop:
+        """Démarre (une seule fois) la boucle et le worker d'interrogation."""
+        with self._loop_lock:
+            if self._loop is None:
+                ready = threading.Event()
+
+                def run():
+                    self._loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(self._loop)
+                    self._lookups = asyncio.Queue()
+                    self._queue = asyncio.Queue()
+                    self._bucket = TokenBucket(self.requests_per_minute / 60.0, capacity=1)
+                    self._loop.create_task(self._lookup_worker())
+                    self._loop.create_task(self._worker())
+                    ready.set()
+                    self._loop.run_forever()
+
+                self._loop_thread = threading.Thread(target=run, name="virustotal-worker", daemon=True)
+                self._loop_thread.start()
+                ready.wait()
+            return self._loop
+
+    def _resolve(self, results: Dict[str, Optional[int]]):
+        """Termine les demandes en attente des hashes résolus."""
+        with self._pending_lock:
+            futures = [(self._pending.pop(sha256_hash, None), result) for sha256_hash, result in results.items()]
+        for future, result in futures:
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    async def _lookup_worker(self):
+        """
+        Cherche les hashes demandés dans le cache persistant, par lots et hors de la
+        boucle : les résultats connus sont rendus sans attendre le quota de l'API.
+        """
+        while True:
+            batch = [await self._lookups.get()]
+            while not self._lookups.empty():
+                batch.append(self._lookups.get_nowait())
+
+            try:
+                known = await asyncio.to_thread(self.persistent_cache.get_many, batch)
+            except Exception as e:
+                logger.error(f"Erreur lors de la lecture du cache VirusTotal: {e}")
+                known = {}
+
+            self.stats['persistent_hits'] += len(known)
+            self._remember(known.items())
+            self._resolve({sha256_hash: entry[1] for sha256_hash, entry in known.items()})
+            for sha256_hash in batch:
+                if sha256_hash not in known:
+                    self._queue.put_nowait(sha256_hash)
+
+    async def _worker(self):
+        """Interroge VirusTotal par lots, au rythme autorisé par le quota."""
+        async with httpx.AsyncClient(timeout=30) as client:
+            while True:
+                batch = [await self._queue.get()]
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+
+                requeued = []
+                try:
+                    # Un autre processus de la ruche a pu obtenir le résultat entre-temps
+                    known = await asyncio.to_thread(self.persistent_cache.get_many, batch)
+                    to_query = [sha256_hash for sha256_hash in batch if sha256_hash not in known]
+                    results = {sha256_hash: entry[1] for sha256_hash, entry in known.items()}
+                    if to_query:
+                        await self._bucket.acquire()
+                        queried = await self._query_batch(client, to_query)
+                        if queried is None:
+                            # Quota dépassé : le lot est remis en file, ses demandes restent en attente
+                            requeued = to_query
+                        else:
+                            results.update(queried)
+                except Exception as e:
+                    logger.error(f"Erreur inattendue lors de l'enrichissement VirusTotal: {e}")
+                    results = {}
+
+                for sha256_hash in requeued:
+                    self._queue.put_nowait(sha256_hash)
+                self.stats['requeued'] += len(requeued)
+                with self._pending_lock:
+                    futures = [(self._pending.pop(sha256_hash, None), sha256_hash)
+                               for sha256_hash in batch if sha256_hash not in requeued]
+                for future, sha256_hash in futures:
+                    if future is not None and not future.done():
+                        future.set_result(results.get(sha256_hash))
+
+    async def _query_batch(self, client: httpx.AsyncClient, hashes: List[str]) -> Optional[Dict[str, int]]:
+        """
+        Interroge l'API pour un lot de hashes et met les résultats en cache.
+        Retourne None si le quota est dépassé (lot à interroger de nouveau).
+        """
         try:
-            params = {'apikey': self.api_key, 'resource': sha256_hash}
-            response = requests.get(f"{self.base_url}/file/report", params=params)
+            params = {'apikey': self.api_key, 'resource': ','.join(hashes)}
+            response = await client.get(f"{self.base_url}/file/report", params=params)
+            self.stats['api_requests'] += 1
+
+            # 204 : quota dépassé, on temporise et on ne met rien en cache
+            if response.status_code == 204:
+                logging.warning("Quota VirusTotal dépassé, nouvelle tentative ultérieure")
+                self._bucket.penalize(60)
+                return None
             response.raise_for_status()
-            
-            result = response.json()
-            if result.get('response_code') == 1:  # Fichier trouvé
-                positives = result.get('positives', 0)
-                self.cache[sha256_hash] = positives
-                self.last_request_time = time.time()
-                return positives
+
+            reports = response.json()
+            if isinstance(reports, dict):
+                reports = [reports]
+
+        except httpx.HTTPError as e:
+            logging.error(f"Erreur lors de la requête à VirusTotal: {e}")
+            return {}
+
+        results = {}
+        entries = []
+        remembered = []
+        now = time.time()
+        for sha256_hash, report in zip(hashes, reports):
+            if report.get('response_code') == 1:  # Fichier trouvé
+                positives = report.get('positives', 0)
+                expires_at = now + self.cache_duration
+                entries.append((sha256_hash, positives, True, expires_at))
             else:
                 logging.warning(f"Fichier non trouvé sur VirusTotal: {sha256_hash}")
-                return 0
+                positives = 0
+                expires_at = now + self.negative_cache_duration
+                entries.append((sha256_hash, positives, False, expires_at))
+            results[sha256_hash] = positives
+            remembered.append((sha256_hash, (expires_at, positives)))
 
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Erreur lors de la requête à VirusTotal: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Erreur inattendue lors de l'enrichissement VirusTotal: {e}")
-            return None 
\ No newline at end of file
+        self._remember(remembered)
+        self.persistent_cache.put_many(entries)
+        return results
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées expirées des caches mémoire et persistant."""
+        now = time.time()
+        with self._cache_lock:
+            for sha256_hash in [h for h, (expires_at, _) in self.cache.items() if expires_at <= now]:
+                del self.cache[sha256_hash]
+        return self.persistent_cache.purge_expired()
+
+    def get_statistics(self) -> Dict[str, int]:
+        """Récupère les statistiques de l'enrichisseur."""
+        return {
+            **self.stats,
+            'memory_entries': len(self.cache),
+            'persistent_entries': self.persistent_cache.count(),
+            'pending': len(self._pending)
+        }
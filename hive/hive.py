@@ -3,33 +3,35 @@ import sys
 import ssl
 import uuid
 import logging
-import threading
 import grpc
-import time
 import yaml
-from datetime import datetime, timezone
+from collections import deque
+from datetime import datetime
+from functools import partial
 from itertools import cycle
 from pathlib import Path
-from typing import Dict, Optional, List, Any
-from concurrent import futures
+from typing import Dict, Optional, Any
 from dotenv import load_dotenv
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import padding
-from hive.web_server import start_web_server, update_agent_status, remove_agent
 import asyncio
 import uvicorn
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from hive.database import Database
+from hive.database import Database, SessionLocal, list_alerts, alert_to_dict
 from hive.timeline_normalizer import TimelineNormalizer
 from hive.ai.analyzer import AIAnalyzer
 from hive.ai.assistant import AIAssistant
 from hive.detectors.sigma_detector import SigmaDetector
 from hive.enrichers.virustotal import VirusTotalEnricher
+from hive.query_registry import QueryRegistry
+from hive.agent_registry import AgentPresenceRegistry
+from hive.ws_manager import ConnectionManager
+from hive.query_dispatcher import FleetQueryDispatcher, TargetSelector, split_task_id
 import io
 import csv
 import json
@@ -42,6 +44,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import des modules proto
 from protos import osiris_pb2
 from protos import osiris_pb2_grpc
+from protos.result_codec import result_rows, supported_compressions
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -90,36 +93,24 @@ ssl_credentials = grpc.ssl_server_credentials(
 # --- Initialisation Globale ---
 CONFIG = None
 VT_ENRICHER = None
-connected_agents: Dict[str, Dict] = {}
-agent_lock = threading.Lock()
+# Agents connectés : une entrée sans signe de vie depuis 5 minutes expire
+connected_agents = AgentPresenceRegistry(ttl=300)
+# Suivi borné des requêtes envoyées aux agents
+agent_queries = QueryRegistry(max_entries=10000, ttl=24 * 3600)
+
+def on_fleet_query_done(fleet_query):
+    progress = fleet_query.progress()
+    status = "completed" if progress['completed'] else "failed"
+    agent_queries.finish(fleet_query.query_id, status=status, total_results=progress['rows'])
+
+# Distribution des requêtes par vagues vers les files d'instructions des agents
+query_dispatcher = FleetQueryDispatcher(
+    connected_agents,
+    lambda query, task_id: osiris_pb2.HiveInstruction(query=query, query_id=task_id),
+    on_query_done=on_fleet_query_done
+)
 
 # --- Gestionnaires de connexions et de données ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, query_id: str):
-        await websocket.accept()
-        if query_id not in self.active_connections:
-            self.active_connections[query_id] = []
-        self.active_connections[query_id].append(websocket)
-        logger.info(f"WebSocket connecté pour query_id: {query_id}")
-
-    def disconnect(self, websocket: WebSocket, query_id: str):
-        if query_id in self.active_connections:
-            self.active_connections[query_id].remove(websocket)
-            if not self.active_connections[query_id]:
-                del self.active_connections[query_id]
-            logger.info(f"WebSocket déconnecté pour query_id: {query_id}")
-
-    async def broadcast(self, query_id: str, message: dict):
-        if query_id in self.active_connections:
-            for connection in self.active_connections[query_id]:
-                try:
-                    await connection.send_json(message)
-                except WebSocketDisconnect:
-                    self.disconnect(connection, query_id)
-
 manager = ConnectionManager()
 
 # --- Serveur API (FastAPI) ---
@@ -132,6 +123,7 @@ api_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Montage des fichiers statiques
@@ -139,8 +131,10 @@ api_app.mount("/static", StaticFiles(directory="web/static"), name="static")
 templates = Jinja2Templates(directory="web/templates")
 
 class QueryRequest(BaseModel):
-    agent_id: str
     query_string: str
+    agent_id: Optional[str] = None
+    # Sélecteur de flotte : all, agent_ids, os, hostname (glob), labels
+    target: Optional[Dict[str, Any]] = None
 
 class AgentInfo(BaseModel):
     agent_id: str
@@ -158,30 +152,49 @@ async def cases_page(request: Request):
 
 @api_app.get("/api/agents")
 async def get_agents():
-    with agent_lock:
-        agents_list = []
-        for agent_id, data in connected_agents.items():
-            agent_data = data.copy()
-            agent_data['last_seen'] = agent_data['last_seen'].isoformat()
-            agent_data['id'] = agent_id
-            agents_list.append(agent_data)
-        return agents_list
+    # Liste sérialisée en cache, régénérée seulement après un changement
+    return Response(content=connected_agents.snapshot_json(), media_type="application/json")
 
 @api_app.post("/api/query")
 async def submit_query(query: QueryRequest):
+    try:
+        target = query.target or ({"agent_ids": [query.agent_id]} if query.agent_id else {})
+        selector = TargetSelector.from_dict(target)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if selector.is_empty():
+        raise HTTPException(status_code=400, detail="agent_id ou target requis")
+
     try:
         query_id = str(uuid.uuid4())
-        add_query_to_history(query_id, query.agent_id, query.query_string)
+        agent_queries.start(query_id, query.query_string, query_dispatcher.resolve_targets(selector))
+        fleet_query = query_dispatcher.submit(query.query_string, selector, query_id=query_id)
         
-        # TODO: Implémenter la logique d'envoi de la requête à l'agent
-        # Pour l'instant, on simule une réponse
-        update_query_status(query_id, "completed")
-        
-        return {"query_id": query_id, "status": "submitted"}
+        return {"query_id": query_id, "status": "submitted", "targets": fleet_query.total_targets}
     except Exception as e:
         logger.error(f"Erreur lors de la soumission de la requête: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_app.get("/api/query/{query_id}/status")
+async def get_query_status(query_id: str):
+    record = agent_queries.get(query_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Requête inconnue ou expirée")
+    return record.to_dict()
+
+@api_app.get("/api/query/{query_id}/progress")
+async def get_query_progress(query_id: str):
+    progress = query_dispatcher.progress(query_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Requête inconnue ou expirée")
+    return progress
+
+@api_app.delete("/api/query/{query_id}")
+async def cancel_query(query_id: str):
+    if not query_dispatcher.cancel(query_id):
+        raise HTTPException(status_code=404, detail="Requête inconnue ou déjà distribuée")
+    return query_dispatcher.progress(query_id)
+
 @api_app.get("/api/history")
 async def get_history():
     try:
@@ -369,25 +382,41 @@ async def add_alert_endpoint(case_id: int, alert: Dict[str, int]):
 
 @api_app.get("/api/alerts")
 async def get_alerts(
+    response: Response,
     status: str = None,
     level: str = None,
-    case_id: int = None,
-    limit: int = 100,
-    offset: int = 0
+    case_id: str = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    cursor: str = None,
+    limit: int = 100
 ):
-    """Récupère la liste des alertes avec filtres optionnels."""
+    """
+    Récupère la liste des alertes avec filtres optionnels, triée et paginée en SQL.
+    Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
+    """
+    db = SessionLocal()
     try:
-        alerts = database.get_alerts(
+        alerts, next_cursor = list_alerts(
+            db,
             status=status,
-            level=level,
+            severity=level,
             case_id=case_id,
-            limit=limit,
-            offset=offset
+            sort=sort,
+            descending=order != "asc",
+            cursor=cursor,
+            limit=limit
         )
-        return alerts
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return [alert_to_dict(alert) for alert in alerts]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des alertes: {str(e)}")
         raise HTTPException(status_code=500, detail="Erreur lors de la récupération des alertes")
+    finally:
+        db.close()
 
 @api_app.get("/api/alerts/{alert_id}")
 async def get_alert(alert_id: int):
@@ -436,19 +465,10 @@ async def associate_alert_with_case(alert_id: int, data: dict):
 async def export_alerts(
     status: str = None,
     level: str = None,
-    case_id: int = None
+    case_id: str = None
 ):
-    """Exporte les alertes au format CSV."""
-    try:
-        alerts = database.get_alerts(
-            status=status,
-            level=level,
-            case_id=case_id,
-            limit=None,
-            offset=0
-        )
-        
-        # Création du fichier CSV
+    """Exporte les alertes au format CSV, page par page."""
+    def rows():
         output = io.StringIO()
         writer = csv.writer(output)
         
@@ -458,22 +478,32 @@ async def export_alerts(
             "Cas associé", "Données de l'événement"
         ])
         
-        # Données
-        for alert in alerts:
-            writer.writerow([
-                alert["id"],
-                alert["rule_title"],
-                alert["rule_level"],
-                alert["status"],
-                alert["detected_at"],
-                alert.get("case_id", ""),
-                json.dumps(alert["event_data"])
-            ])
-        
-        # Préparation de la réponse
-        output.seek(0)
+        db = SessionLocal()
+        try:
+            cursor = None
+            while True:
+                alerts, cursor = list_alerts(db, status=status, severity=level, case_id=case_id, cursor=cursor, limit=1000)
+                for alert in alerts:
+                    writer.writerow([
+                        alert.id,
+                        alert.title,
+                        alert.severity,
+                        alert.status,
+                        alert.created_at.isoformat() if alert.created_at else "",
+                        alert.case_id or "",
+                        json.dumps(alert.alert_data)
+                    ])
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+                if not cursor:
+                    break
+        finally:
+            db.close()
+
+    try:
         return StreamingResponse(
-            iter([output.getvalue()]),
+            rows(),
             media_type="text/csv",
             headers={
                 "Content-Disposition": f"attachment; filename=alerts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -590,71 +620,109 @@ async def translate_oql():
 
 # --- Serveur gRPC ---
 class AgentCommsServicer(osiris_pb2_grpc.AgentCommsServicer):
-    def Heartbeat(self, request_iterator, context):
-        agent_id = None
-        peer_address = context.peer()
+    """Canal agents (grpc.aio), exécuté sur la même boucle asyncio que l'API."""
+
+    def __init__(self, max_uploads_per_agent: int = 2):
+        # Nombre de flux de résultats simultanés autorisés par agent
+        self.max_uploads_per_agent = max_uploads_per_agent
+        self.agent_uploads: Dict[str, int] = {}
+
+    def _register_agent(self, agent_id: str, context, **fields) -> Dict[str, Any]:
+        """Enregistre l'agent dans le registre de présence, en conservant ses instructions en attente."""
+        previous = connected_agents.get(agent_id)
+        agent_info = dict(previous or {})
+        agent_info.update(fields)
+        agent_info["ip"] = context.peer()
+        agent_info["instruction_queue"] = previous["instruction_queue"] if previous else deque()
+        connected_agents.register(agent_id, agent_info)
+        return agent_info
+
+    @staticmethod
+    def _targeting_fields(request) -> Dict[str, Any]:
+        """Critères de ciblage (TargetSelector) transmis par l'agent."""
+        return {"hostname": request.hostname, "os": request.os_type, "version": request.version,
+                "labels": dict(request.labels)}
+
+    async def Register(self, request, context):
+        # Les compressions annoncées déterminent celle des lots de résultats de l'agent
+        self._register_agent(request.agent_id, context, os_info=request.os_info, **self._targeting_fields(request))
+        logging.info(f"Enregistrement de l'agent {request.agent_id} ({request.hostname}) depuis {context.peer()}.")
+        return osiris_pb2.RegistrationResponse(status="ok", compressions=supported_compressions())
+
+    async def Heartbeat(self, request, context):
+        # Heartbeat unitaire : signe de vie, puis au plus une instruction en attente
+        agent_id = request.agent_id
+        if not connected_agents.touch(agent_id):
+            # Agent expiré (ou Hive redémarré) : réenregistrement
+            logging.info(f"Heartbeat d'un agent inconnu {agent_id}, réenregistrement.")
+            self._register_agent(agent_id, context, **self._targeting_fields(request))
+        agent_info = connected_agents.get(agent_id)
+        instruction_queue = agent_info["instruction_queue"] if agent_info else None
+        if instruction_queue:
+            return osiris_pb2.HeartbeatResponse(status="ok", instruction=instruction_queue.popleft())
+        return osiris_pb2.HeartbeatResponse(status="ok")
+
+    async def SendQueryResults(self, result, context):
+        # Appel unitaire par message du spool de l'agent : la réponse ("ok" ou "error")
+        # conditionne l'avancée du curseur de l'agent (livraison au moins une fois)
+        total_rows = 0
+        task_id = result.query_id
+        query_id, agent_id = split_task_id(task_id)
+        upload_key = agent_id or context.peer()
+        if self.agent_uploads.get(upload_key, 0) >= self.max_uploads_per_agent:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Trop de flux de résultats simultanés pour cet agent")
+        self.agent_uploads[upload_key] = self.agent_uploads.get(upload_key, 0) + 1
         try:
-            first_request = next(request_iterator)
-            agent_id = first_request.agent_id
-            with agent_lock:
-                connected_agents[agent_id] = {"hostname": first_request.hostname, "os": first_request.os_type, "version": first_request.version, "ip": peer_address, "last_seen": datetime.now(timezone.utc), "instruction_queue": []}
-            logging.info(f"Agent {agent_id} ({first_request.hostname}) enregistré depuis {peer_address}.")
-            while context.is_active():
-                instruction_to_send = None
-                with agent_lock:
-                    if agent_id in connected_agents and connected_agents[agent_id]["instruction_queue"]:
-                        instruction_to_send = connected_agents[agent_id]["instruction_queue"].pop(0)
-                if instruction_to_send:
-                    yield instruction_to_send
-                else:
-                    yield osiris_pb2.HiveInstruction(type=osiris_pb2.HiveInstruction.InstructionType.NOOP)
-                with agent_lock:
-                    if agent_id in connected_agents:
-                        connected_agents[agent_id]["last_seen"] = datetime.now(timezone.utc)
-                time.sleep(5)
-        except grpc.RpcError:
-            logging.warning(f"Connexion perdue avec l'agent {agent_id or 'inconnu'} à {peer_address}.")
-        finally:
-            if agent_id and agent_id in connected_agents:
-                with agent_lock: del connected_agents[agent_id]
-                logging.info(f"Agent {agent_id} déconnecté.")
-
-    def SendQueryResults(self, request_iterator, context):
-        total_rows, query_id = 0, None
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            for result in request_iterator:
-                if not query_id: query_id = result.query_id
-                row_data = dict(result.row.items())
-                
+            # Un message porte un lot de lignes, décodé colonne par colonne
+            for row_data in result_rows(result):
+            
                 if 'sha256' in row_data and VT_ENRICHER:
                     sha256_hash = row_data['sha256']
-                    vt_detections = VT_ENRICHER.enrich(sha256_hash)
+                    # Non bloquant : les hashes inconnus sont interrogés en arrière-plan
+                    vt_detections = VT_ENRICHER.enrich(sha256_hash, callback=partial(log_vt_detections, row_data.get('path')))
                     if vt_detections is not None:
                         row_data['vt_detections'] = vt_detections
-                        if vt_detections > 0:
-                            logging.warning(f"!!! ALERTE VIRUSTOTAL !!! Fichier {row_data.get('path')} (hash: {sha256_hash}) a {vt_detections} détections.")
-                
-                # Envoyer le résultat au client WebSocket correspondant
-                message_to_send = {"type": "result", "data": row_data}
-                loop.run_until_complete(manager.broadcast(query_id, message_to_send))
-                
-                logging.info(f"[{query_id}] Ligne reçue et poussée vers le WebSocket: {row_data}")
+                        log_vt_detections(row_data.get('path'), sha256_hash, vt_detections)
+            
+                # Envoyer le résultat au client WebSocket correspondant ; l'agent n'envoie
+                # le message suivant qu'une fois la diffusion faite
+                message_to_send = {"type": "result", "agent_id": agent_id, "data": row_data}
+                await manager.broadcast(query_id, message_to_send)
+            
+                logging.debug(f"[{query_id}] Ligne reçue et poussée vers le WebSocket: {row_data}")
                 total_rows += 1
             
-            logging.info(f"[{query_id}] Réception des résultats terminée. Total de {total_rows} lignes.")
-            summary_message = {"type": "summary", "data": {"message": "Collecte terminée", "total_rows": total_rows}}
-            loop.run_until_complete(manager.broadcast(query_id, summary_message))
+            query_dispatcher.record_rows(task_id, total_rows)
+            
+            # Seul le résumé final (sans lignes) termine la tâche de l'agent
+            if result.HasField('summary') and not result.HasField('batch') and not result.HasField('result'):
+                success = result.summary.status != "failed"
+                logging.info(f"[{task_id}] Réception des résultats terminée (statut: {result.summary.status}).")
+                query_dispatcher.mark_done(task_id, success=success)
+                progress = query_dispatcher.progress(query_id)
+                summary_message = {"type": "summary", "data": {"message": "Collecte terminée" if success else "Collecte en échec", "total_rows": progress['rows'] if progress else total_rows, "progress": progress}}
+                await manager.broadcast(query_id, summary_message)
             
-            return osiris_pb2.QuerySummary(query_id=query_id, received_successfully=True, row_count=total_rows, message="Résultats reçus avec succès.")
+            return osiris_pb2.QueryResponse(status="ok")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logging.error(f"[{query_id}] Erreur lors de la réception des résultats: {e}", exc_info=True)
-            return osiris_pb2.QuerySummary(query_id=query_id, received_successfully=False)
+            query_dispatcher.record_rows(task_id, total_rows)
+            query_dispatcher.mark_done(task_id, success=False)
+            return osiris_pb2.QueryResponse(status="error")
         finally:
-            loop.close()
+            remaining = self.agent_uploads.get(upload_key, 1) - 1
+            if remaining > 0:
+                self.agent_uploads[upload_key] = remaining
+            else:
+                self.agent_uploads.pop(upload_key, None)
 
-def run_grpc_server(config):
+def log_vt_detections(path, sha256_hash, vt_detections):
+    if vt_detections:
+        logging.warning(f"!!! ALERTE VIRUSTOTAL !!! Fichier {path} (hash: {sha256_hash}) a {vt_detections} détections.")
+
+async def start_grpc_server(config):
     logging.info("Démarrage du serveur gRPC...")
     try:
         with open(config['security']['server_key_path'], 'rb') as f: private_key = f.read()
@@ -662,16 +730,41 @@ def run_grpc_server(config):
         with open(config['security']['ca_cert_path'], 'rb') as f: ca_cert = f.read()
     except FileNotFoundError as e:
         logging.critical(f"Erreur de certificat gRPC: {e}.")
-        return
+        return None
 
+    server_config = config['server']
+    max_message_size = server_config.get('grpc_max_message_size', 4 * 1024 * 1024)
     server_credentials = grpc.ssl_server_credentials([(private_key, certificate_chain)], root_certificates=ca_cert, require_client_auth=True)
-    grpc_server = grpc.server(futures.ThreadPoolExecutor(max_workers=50))
-    osiris_pb2_grpc.add_AgentCommsServicer_to_server(AgentCommsServicer(), grpc_server)
-    grpc_port = config['server'].get('grpc_port', 50051)
+    grpc_server = grpc.aio.server(
+        options=[
+            ('grpc.max_receive_message_length', max_message_size),
+            ('grpc.max_send_message_length', max_message_size),
+            ('grpc.keepalive_time_ms', 60000),
+            ('grpc.http2.max_pings_without_data', 0),
+        ],
+        maximum_concurrent_rpcs=server_config.get('grpc_max_concurrent_rpcs')
+    )
+    osiris_pb2_grpc.add_AgentCommsServicer_to_server(
+        AgentCommsServicer(max_uploads_per_agent=server_config.get('grpc_max_uploads_per_agent', 2)),
+        grpc_server
+    )
+    grpc_port = server_config.get('grpc_port', 50051)
     grpc_server.add_secure_port(f"[::]:{grpc_port}", server_credentials)
-    grpc_server.start()
+    await grpc_server.start()
     logging.info(f"Serveur gRPC démarré sur le port {grpc_port}.")
-    grpc_server.wait_for_termination()
+    return grpc_server
+
+async def serve(config):
+    """Serveurs gRPC (agents) et API sur une même boucle asyncio."""
+    grpc_server = await start_grpc_server(config)
+    api_port = config['server'].get('api_port', 8000)
+    logging.info(f"Démarrage du serveur API sur http://localhost:{api_port}")
+    api_server = uvicorn.Server(uvicorn.Config(api_app, host="0.0.0.0", port=api_port))
+    try:
+        await api_server.serve()
+    finally:
+        if grpc_server is not None:
+            await grpc_server.stop(grace=5)
 
 def setup_logging(config):
     log_level = getattr(logging, config.get('logging', {}).get('level', 'INFO'))
@@ -681,16 +774,8 @@ def setup_logging(config):
     )
 
 def main():
-    # Démarrage du serveur web dans un thread séparé
-    import threading
-    web_thread = threading.Thread(target=start_web_server)
-    web_thread.daemon = True
-    web_thread.start()
-    
-    # Démarrage du serveur gRPC
-    asyncio.run(run_grpc_server(CONFIG))
-
-if __name__ == '__main__':
+    """Point d'entrée : serveurs gRPC et API lancés par serve() sur une même boucle."""
+    global CONFIG, VT_ENRICHER
     try:
         with open('hive/config.yaml', 'r') as f: CONFIG = yaml.safe_load(f)
     except FileNotFoundError:
@@ -698,11 +783,18 @@ if __name__ == '__main__':
         sys.exit(1)
     
     setup_logging(CONFIG)
-    VT_ENRICHER = VirusTotalEnricher(CONFIG.get('enrichment', {}).get('virustotal', {}).get('api_key'))
+    connected_agents.start_reaper()
+    agent_queries.start_reaper()
+    vt_config = CONFIG.get('enrichment', {}).get('virustotal', {})
+    VT_ENRICHER = VirusTotalEnricher(
+        vt_config.get('api_key'),
+        cache_duration=vt_config.get('cache_duration', 86400),
+        cache_path=vt_config.get('cache_path', 'cache/virustotal.db'),
+        requests_per_minute=vt_config.get('requests_per_minute', 4),
+        max_memory_entries=vt_config.get('max_memory_entries', 100000)
+    )
     
-    grpc_thread = threading.Thread(target=run_grpc_server, args=(CONFIG,), daemon=True)
-    grpc_thread.start()
+    asyncio.run(serve(CONFIG))
 
-    api_port = CONFIG['server'].get('api_port', 8000)
-    logging.info(f"Démarrage du serveur API sur http://localhost:{api_port}")
-    uvicorn.run(api_app, host="0.0.0.0", port=api_port) 
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+"""
+Agrégations OQL exécutées sur les Nodes et fusionnées sur le Master.
+
+Chaque Node calcule des états partiels fusionnables (compteurs, sketches
+HyperLogLog, résumés top-k, min/max) sur ses données locales et les renvoie
+via FederationService.SyncData (sync_type "aggregate"). Le Master fusionne
+les états et calcule le résultat final.
+
+Syntaxe supportée :
+    SELECT [DISTINCT] <agrégats et champs> FROM <source> [WHERE ...] [GROUP BY <champs>] [LIMIT n]
+
+Agrégats : COUNT(*), COUNT(champ), COUNT(DISTINCT champ), TOP(champ, k), MIN(champ), MAX(champ)
+"""
+
+import base64
+import hashlib
+import json
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Type de synchronisation utilisé dans DataSyncRequest/DataSyncResponse
+AGGREGATE_SYNC_TYPE = "aggregate"
+
+_AGGREGATE_QUERY = re.compile(
+    r'^\s*SELECT\s+(?P<distinct>DISTINCT\s+)?(?P<select>.+?)\s+FROM\s+(?P<source>\S+)'
+    r'(?:\s+WHERE\s+(?P<where>.+?))?'
+    r'(?:\s+GROUP\s+BY\s+(?P<group_by>.+?))?'
+    r'(?:\s+LIMIT\s+(?P<limit>\d+))?\s*;?\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+_AGGREGATE_EXPR = re.compile(
+    r'^(?P<func>COUNT|TOP|MIN|MAX)\s*\(\s*(?P<distinct>DISTINCT\s+)?(?P<field>\*|[\w.]+)\s*(?:,\s*(?P<k>\d+)\s*)?\)'
+    r'(?:\s+AS\s+(?P<alias>\w+))?$',
+    re.IGNORECASE
+)
+
+
+def _split_select(select: str) -> List[str]:
+    """Découpe la liste SELECT sur les virgules hors parenthèses."""
+    parts, depth, current = [], 0, ''
+    for char in select:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def field_value(row: Dict[str, Any], field: str) -> Any:
+    """Valeur d'un champ d'une ligne de résultat (colonnes ou result_data)."""
+    if field in row:
+        return row[field]
+    data = row.get('result_data')
+    if isinstance(data, dict):
+        return data.get(field)
+    return None
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog fusionnable (2^precision registres d'un octet)."""
+
+    def __init__(self, precision: int = 12, registers: Optional[bytearray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    def add(self, value: Any):
+        digest = hashlib.blake2b(str(value).encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        remainder = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precisions")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # Correction pour les petites cardinalités (linear counting)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'p': self.precision, 'r': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        return cls(data['p'], bytearray(base64.b64decode(data['r'])))
+
+
+class Aggregate:
+    """Description d'un agrégat de la liste SELECT."""
+
+    __slots__ = ('func', 'field', 'distinct', 'k', 'name')
+
+    def __init__(self, func: str, field: str, distinct: bool = False, k: int = 10, name: Optional[str] = None):
+        self.func = func.upper()
+        self.field = field
+        self.distinct = distinct
+        self.k = k
+        self.name = name or self._default_name()
+
+    def _default_name(self) -> str:
+        if self.func == 'COUNT' and self.field == '*':
+            return 'count'
+        if self.func == 'COUNT' and self.distinct:
+            return f"count_distinct_{self.field}"
+        return f"{self.func.lower()}_{self.field}"
+
+    def new_state(self) -> Any:
+        if self.func == 'COUNT':
+            return HyperLogLog() if self.distinct else 0
+        if self.func == 'TOP':
+            return Counter()
+        return None
+
+    def update(self, state: Any, row: Dict[str, Any]) -> Any:
+        if self.func == 'COUNT' and self.field == '*':
+            return state + 1
+
+        value = field_value(row, self.field)
+        if value is None:
+            return state
+        if self.func == 'COUNT':
+            if self.distinct:
+                state.add(value)
+                return state
+            return state + 1
+        if self.func == 'TOP':
+            state[value] += 1
+            return state
+        if self.func == 'MIN':
+            return value if state is None or value < state else state
+        return value if state is None or value > state else state
+
+    def merge(self, state: Any, other: Any) -> Any:
+        if self.func == 'COUNT':
+            if self.distinct:
+                state.merge(other)
+                return state
+            return state + other
+        if self.func == 'TOP':
+            state.update(other)
+            return state
+        if other is None:
+            return state
+        if state is None:
+            return other
+        if self.func == 'MIN':
+            return other if other < state else state
+        return other if other > state else state
+
+    def capacity(self) -> int:
+        """Nombre de valeurs conservées dans un résumé top-k partiel."""
+        return max(self.k * 10, 100)
+
+    def encode(self, state: Any) -> Any:
+        if self.func == 'COUNT' and self.distinct:
+            return state.to_dict()
+        if self.func == 'TOP':
+            # Résumé borné : seules les valeurs les plus fréquentes voyagent
+            return [[value, count] for value, count in state.most_common(self.capacity())]
+        return state
+
+    def decode(self, data: Any) -> Any:
+        if self.func == 'COUNT' and self.distinct:
+            return HyperLogLog.from_dict(data)
+        if self.func == 'TOP':
+            return Counter({value: count for value, count in data})
+        return data
+
+    def finalize(self, state: Any) -> Any:
+        if self.func == 'COUNT' and self.distinct:
+            return state.count()
+        if self.func == 'TOP':
+            return [[value, count] for value, count in state.most_common(self.k)]
+        return state
+
+
+class AggregateQuery:
+    """Requête OQL d'agrégation analysée."""
+
+    def __init__(self, source: str, aggregates: List[Aggregate], group_by: List[str],
+                 where: Optional[str] = None, limit: Optional[int] = None):
+        self.source = source
+        self.aggregates = aggregates
+        self.group_by = group_by
+        self.where = where
+        self.limit = limit
+
+    @property
+    def row_query(self) -> str:
+        """Requête brute équivalente, pour les Nodes ne supportant pas l'agrégation."""
+        query = f"SELECT * FROM {self.source}"
+        if self.where:
+            query += f" WHERE {self.where}"
+        return query
+
+    def new_state(self) -> 'AggregateState':
+        return AggregateState(self)
+
+
+def parse_aggregate_query(oql_query: str) -> Optional[AggregateQuery]:
+    """
+    Analyse une requête d'agrégation.
+    Retourne None si la requête ne contient ni agrégat, ni DISTINCT, ni GROUP BY.
+    """
+    match = _AGGREGATE_QUERY.match(oql_query)
+    if not match:
+        return None
+
+    aggregates = []
+    fields = []
+    for expr in _split_select(match.group('select')):
+        expr_match = _AGGREGATE_EXPR.match(expr)
+        if expr_match:
+            aggregates.append(Aggregate(
+                expr_match.group('func'),
+                expr_match.group('field'),
+                distinct=bool(expr_match.group('distinct')),
+                k=int(expr_match.group('k') or 10),
+                name=expr_match.group('alias')
+            ))
+        elif expr != '*':
+            fields.append(expr)
+
+    group_by = [field.strip() for field in match.group('group_by').split(',')] if match.group('group_by') else []
+    # SELECT DISTINCT a, b équivaut à un regroupement sur a, b
+    if match.group('distinct') or (aggregates and fields and not group_by):
+        group_by = group_by or fields
+
+    if not aggregates and not group_by:
+        return None
+
+    return AggregateQuery(
+        source=match.group('source'),
+        aggregates=aggregates,
+        group_by=group_by,
+        where=match.group('where'),
+        limit=int(match.group('limit')) if match.group('limit') else None
+    )
+
+
+class AggregateState:
+    """États partiels par groupe, fusionnables entre Nodes."""
+
+    def __init__(self, query: AggregateQuery):
+        self.query = query
+        self.groups: Dict[Tuple, List[Any]] = {}
+        self.rows_scanned = 0
+
+    def _group(self, key: Tuple) -> List[Any]:
+        states = self.groups.get(key)
+        if states is None:
+            states = [aggregate.new_state() for aggregate in self.query.aggregates]
+            self.groups[key] = states
+        return states
+
+    def update(self, rows: Iterable[Dict[str, Any]]) -> 'AggregateState':
+        """Ajoute des lignes à l'état (exécution locale sur un Node)."""
+        aggregates = self.query.aggregates
+        group_by = self.query.group_by
+        for row in rows:
+            key = tuple(field_value(row, field) for field in group_by)
+            states = self._group(key)
+            for i, aggregate in enumerate(aggregates):
+                states[i] = aggregate.update(states[i], row)
+            self.rows_scanned += 1
+        return self
+
+    def merge(self, other: 'AggregateState') -> 'AggregateState':
+        """Fusionne l'état partiel d'un autre Node."""
+        aggregates = self.query.aggregates
+        for key, other_states in other.groups.items():
+            states = self._group(key)
+            for i, aggregate in enumerate(aggregates):
+                states[i] = aggregate.merge(states[i], other_states[i])
+        self.rows_scanned += other.rows_scanned
+        return self
+
+    def to_bytes(self) -> bytes:
+        """Sérialise l'état (JSON compressé) pour DataSyncResponse.data_chunks."""
+        aggregates = self.query.aggregates
+        payload = {
+            'rows_scanned': self.rows_scanned,
+            'groups': [
+                [list(key), [aggregate.encode(state) for aggregate, state in zip(aggregates, states)]]
+                for key, states in self.groups.items()
+            ]
+        }
+        return zlib.compress(json.dumps(payload, default=str).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, query: AggregateQuery, data: bytes) -> 'AggregateState':
+        state = cls(query)
+        payload = json.loads(zlib.decompress(data))
+        aggregates = query.aggregates
+        state.rows_scanned = payload.get('rows_scanned', 0)
+        for key, encoded in payload['groups']:
+            state.groups[tuple(key)] = [aggregate.decode(value) for aggregate, value in zip(aggregates, encoded)]
+        return state
+
+    def finalize(self) -> List[Dict[str, Any]]:
+        """Calcule les lignes de résultat finales."""
+        results = []
+        for key, states in self.groups.items():
+            row = dict(zip(self.query.group_by, key))
+            for aggregate, state in zip(self.query.aggregates, states):
+                row[aggregate.name] = aggregate.finalize(state)
+            results.append(row)
+
+        # Les groupes les plus volumineux d'abord lorsqu'un compteur est disponible
+        if self.query.aggregates and self.query.aggregates[0].func == 'COUNT':
+            first = self.query.aggregates[0].name
+            results.sort(key=lambda r: r[first], reverse=True)
+
+        if self.query.limit is not None:
+            results = results[:self.query.limit]
+        return results
+
+
+def build_aggregate_sync_response(node_id: str, oql_query: str, rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Exécute une agrégation sur les données locales d'un Node et construit
+    le contenu d'un DataSyncResponse (sync_type "aggregate").
+    """
+    query = parse_aggregate_query(oql_query)
+    if query is None:
+        raise ValueError(f"Not an aggregate query: {oql_query}")
+
+    state = query.new_state().update(rows)
+    return {
+        'node_id': node_id,
+        'sync_type': AGGREGATE_SYNC_TYPE,
+        'data_chunks': [state.to_bytes()],
+        'has_more': False,
+        'total_items': len(state.groups)
+    }
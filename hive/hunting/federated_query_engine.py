@@ -1,106 +1,543 @@
 import asyncio
+import base64
+import hashlib
+import heapq
 import logging
-from typing import List, Dict, Any, Optional
+import re
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Set, AsyncIterator, Tuple, Callable, Awaitable
 from datetime import datetime, timedelta
 import json
 import uuid
 
+from hive.hunting.aggregation import AGGREGATE_SYNC_TYPE, AggregateQuery, AggregateState, parse_aggregate_query
+from hive.hunting.node_health import NodeHealthRegistry
+from hive.hunting.query_cache import FederatedResultCache
+from hive.query_registry import QueryRegistry
+
 logger = logging.getLogger(__name__)
 
+# Clause LIMIT en fin de requête OQL
+_LIMIT_CLAUSE = re.compile(r'\bLIMIT\s+(\d+)\s*;?\s*$', re.IGNORECASE)
+
+
+class _NodeStreamEnd:
+    """Fin du flux de résultats d'un node (avec l'erreur éventuelle)."""
+
+    __slots__ = ("error", "execution_time_ms")
+
+    def __init__(self, error: Optional[str], execution_time_ms: float):
+        self.error = error
+        self.execution_time_ms = execution_time_ms
+
+
+class _Descending:
+    """Clé inversant l'ordre de tri (le tas de fusion produit le timestamp le plus récent d'abord)."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
 class FederatedQueryEngine:
-    def __init__(self, node_clients: List, redis_client=None):
+    def __init__(self, node_clients: List, redis_client=None, max_tracked_queries: int = 10000,
+                 query_retention: int = 24 * 3600):
         self.nodes = node_clients  # Liste des clients gRPC vers les Nodes
         self.redis = redis_client
-        self.query_cache = {}
-        self.active_queries = {}
+        # Cache des résultats par (requête normalisée, node), invalidé par les watermarks des nodes
+        self.query_cache = FederatedResultCache(redis_client) if redis_client else None
+        # Suivi borné des requêtes (LRU + TTL), nettoyé en arrière-plan
+        self.active_queries = QueryRegistry(max_entries=max_tracked_queries, ttl=query_retention)
+        self.active_queries.start_reaper()
+        # Santé des nodes (latence, erreurs, disjoncteurs) pour le routage et les délais adaptatifs
+        self.node_health = NodeHealthRegistry()
+        self.hedged_requests = 0
 
-    async def query_all_nodes(self, oql_query: str, timeout: int = 30, target_nodes: List[str] = None) -> Dict[str, Any]:
+    async def query_all_nodes(self, oql_query: str, timeout: int = 30, target_nodes: List[str] = None,
+                              limit: Optional[int] = None) -> Dict[str, Any]:
         """
         Envoie une requête OQL à tous les Nodes en parallèle et fusionne les résultats.
+        Les résultats sont triés par timestamp décroissant et limités par LIMIT s'il est présent.
+        Les requêtes d'agrégation sont déléguées à aggregate_all_nodes.
+        """
+        aggregate_query = parse_aggregate_query(oql_query)
+        if aggregate_query is not None:
+            return await self.aggregate_all_nodes(oql_query, timeout=timeout, target_nodes=target_nodes,
+                                                  aggregate_query=aggregate_query)
+        
+        merged_results = []
+        summary = {}
+        
+        async for message in self.stream_query(oql_query, timeout=timeout, target_nodes=target_nodes,
+                                               limit=limit, ordered=True):
+            if message["type"] == "result":
+                merged_results.append(message["data"])
+            else:
+                summary = message["data"]
+        
+        if not summary.get("success"):
+            return {
+                "success": False,
+                "error": summary.get("error"),
+                "query_id": summary.get("query_id"),
+                "results": merged_results
+            }
+        
+        return {
+            "results": merged_results,
+            **summary
+        }
+
+    async def stream_query(self, oql_query: str, timeout: int = 30, target_nodes: List[str] = None,
+                           limit: Optional[int] = None, ordered: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Exécute une requête OQL fédérée et produit les résultats au fil de leur arrivée.
+        
+        Produit des messages {"type": "result", "data": ...} puis un message final
+        {"type": "summary", "data": ...}, directement transmissibles à un WebSocket.
+        
+        Args:
+            limit: Nombre maximum de résultats (par défaut, la clause LIMIT de la requête)
+            ordered: Fusion k-way par timestamp décroissant (chaque Node renvoie des résultats
+                     triés) ; sinon, les résultats sont produits dans l'ordre d'arrivée et un
+                     Node lent ne retarde pas les autres
         """
         query_id = str(uuid.uuid4())
         logger.info(f"Executing federated query {query_id}: {oql_query}")
         
+        if limit is None:
+            limit = self._parse_limit(oql_query)
+        
+        # Filtrer les nodes si spécifié et contourner les nodes indisponibles
+        nodes_to_query, skipped_nodes = self._select_nodes(target_nodes)
+        
+        if not nodes_to_query:
+            yield {"type": "summary", "data": {
+                "success": False,
+                "error": "No target nodes available",
+                "failed_nodes": skipped_nodes,
+                "query_id": query_id
+            }}
+            return
+        
+        # Enregistrer la requête comme active
+        self.active_queries.start(query_id, oql_query, [node.node_id for node in nodes_to_query])
+        
+        # Chaque node alimente la file commune : (index du node, résultat | fin de flux)
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks = [
+            asyncio.ensure_future(self._pump_node_results(i, node, oql_query, timeout, queue))
+            for i, node in enumerate(nodes_to_query)
+        ]
+        
+        seen: Set[bytes] = set()
+        emitted = 0
+        failed_nodes = list(skipped_nodes)
+        total_execution_time = 0
+        remaining = len(nodes_to_query)
+        
+        # Fusion k-way : tampon par node et tas des têtes de flux
+        buffers = [deque() for _ in nodes_to_query]
+        finished = [False] * len(nodes_to_query)
+        in_heap = [False] * len(nodes_to_query)
+        heap = []
+        sequence = 0
+        
+        def push_head(index: int, result: Dict[str, Any]):
+            nonlocal sequence
+            heapq.heappush(heap, (_Descending(result.get("timestamp", "")), sequence, index, result))
+            in_heap[index] = True
+            sequence += 1
+        
+        def pop_head() -> Dict[str, Any]:
+            _, _, index, result = heapq.heappop(heap)
+            in_heap[index] = False
+            if buffers[index]:
+                push_head(index, buffers[index].popleft())
+            return result
+        
         try:
-            # Filtrer les nodes si spécifié
-            nodes_to_query = self.nodes
-            if target_nodes:
-                nodes_to_query = [node for node in self.nodes if node.node_id in target_nodes]
-            
-            if not nodes_to_query:
-                return {
-                    "success": False,
-                    "error": "No target nodes available",
-                    "results": [],
-                    "query_id": query_id
-                }
-            
-            # Enregistrer la requête comme active
-            self.active_queries[query_id] = {
-                "query": oql_query,
-                "start_time": datetime.now(),
-                "nodes": [node.node_id for node in nodes_to_query],
-                "status": "running"
-            }
-            
-            # Lancer les requêtes en parallèle sur tous les nodes
-            tasks = [self._execute_node_query(node, oql_query, timeout) for node in nodes_to_query]
-            all_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Traiter les résultats
-            successful_results = []
-            failed_nodes = []
-            total_execution_time = 0
-            
-            for i, result in enumerate(all_results):
-                node_id = nodes_to_query[i].node_id
+            while remaining and (limit is None or emitted < limit):
+                node_index, item = await queue.get()
                 
-                if isinstance(result, Exception):
-                    failed_nodes.append({
-                        "node_id": node_id,
-                        "error": str(result)
-                    })
-                    logger.error(f"Query failed on node {node_id}: {result}")
+                if isinstance(item, _NodeStreamEnd):
+                    remaining -= 1
+                    finished[node_index] = True
+                    total_execution_time += item.execution_time_ms
+                    if item.error is not None:
+                        failed_nodes.append({
+                            "node_id": nodes_to_query[node_index].node_id,
+                            "error": item.error
+                        })
+                        logger.error(f"Query failed on node {nodes_to_query[node_index].node_id}: {item.error}")
+                elif ordered:
+                    if in_heap[node_index]:
+                        buffers[node_index].append(item)
+                    else:
+                        push_head(node_index, item)
                 else:
-                    successful_results.extend(result.get("results", []))
-                    total_execution_time += result.get("execution_time_ms", 0)
-            
-            # Fusionner et dédupliquer les résultats
-            merged_results = self._merge_and_deduplicate_results(successful_results)
-            
-            # Mettre à jour le statut de la requête
-            self.active_queries[query_id]["status"] = "completed"
-            self.active_queries[query_id]["end_time"] = datetime.now()
-            self.active_queries[query_id]["total_results"] = len(merged_results)
+                    if self._is_new_result(item, seen):
+                        emitted += 1
+                        yield {"type": "result", "data": item}
+                    continue
+                
+                if not ordered:
+                    continue
+                
+                # Une tête peut être produite dès que chaque flux encore ouvert a fourni la sienne
+                while heap and (limit is None or emitted < limit):
+                    if any(not finished[i] and not in_heap[i] for i in range(len(nodes_to_query))):
+                        break
+                    result = pop_head()
+                    if self._is_new_result(result, seen):
+                        emitted += 1
+                        yield {"type": "result", "data": result}
             
-            # Mettre en cache si nécessaire
-            if self.redis and len(merged_results) > 0:
-                await self._cache_query_results(query_id, oql_query, merged_results)
+            # Tous les flux sont terminés : vider le tas
+            while ordered and heap and (limit is None or emitted < limit):
+                result = pop_head()
+                if self._is_new_result(result, seen):
+                    emitted += 1
+                    yield {"type": "result", "data": result}
             
+        finally:
+            # LIMIT atteint ou consommateur parti : arrêter les requêtes encore en cours
+            for task in tasks:
+                task.cancel()
+        
+        truncated = remaining > 0
+        self.active_queries.finish(query_id, total_results=emitted)
+        
+        yield {"type": "summary", "data": {
+            "success": True,
+            "query_id": query_id,
+            "total_results": emitted,
+            "nodes_contacted": len(nodes_to_query),
+            "successful_nodes": len(nodes_to_query) - len(failed_nodes) + len(skipped_nodes) - remaining,
+            "failed_nodes": failed_nodes,
+            "partial": bool(failed_nodes) or truncated,
+            "limit_reached": limit is not None and emitted >= limit,
+            "total_execution_time_ms": total_execution_time,
+            "execution_timestamp": datetime.now().isoformat()
+        }}
+
+    async def aggregate_all_nodes(self, oql_query: str, timeout: int = 30, target_nodes: List[str] = None,
+                                  aggregate_query: Optional[AggregateQuery] = None) -> Dict[str, Any]:
+        """
+        Exécute une requête d'agrégation sur chaque Node et fusionne les états partiels.
+        Seuls les états (compteurs, sketches, résumés top-k) transitent par le réseau.
+        """
+        query_id = str(uuid.uuid4())
+        logger.info(f"Executing federated aggregate query {query_id}: {oql_query}")
+        
+        aggregate_query = aggregate_query or parse_aggregate_query(oql_query)
+        if aggregate_query is None:
             return {
-                "success": True,
+                "success": False,
+                "error": "Not an aggregate query",
                 "query_id": query_id,
-                "results": merged_results,
-                "total_results": len(merged_results),
-                "nodes_contacted": len(nodes_to_query),
-                "successful_nodes": len(nodes_to_query) - len(failed_nodes),
-                "failed_nodes": failed_nodes,
-                "total_execution_time_ms": total_execution_time,
-                "execution_timestamp": datetime.now().isoformat()
+                "results": []
             }
-            
-        except Exception as e:
-            logger.error(f"Error executing federated query: {e}")
-            if query_id in self.active_queries:
-                self.active_queries[query_id]["status"] = "failed"
-                self.active_queries[query_id]["error"] = str(e)
-            
+        
+        nodes_to_query, skipped_nodes = self._select_nodes(target_nodes)
+        
+        if not nodes_to_query:
             return {
                 "success": False,
-                "error": str(e),
-                "query_id": query_id,
-                "results": []
+                "error": "No target nodes available",
+                "failed_nodes": skipped_nodes,
+                "results": [],
+                "query_id": query_id
             }
+        
+        self.active_queries.start(query_id, oql_query, [node.node_id for node in nodes_to_query])
+        
+        partial_states = await asyncio.gather(*(
+            asyncio.wait_for(self._node_aggregate_state(node, aggregate_query, oql_query, timeout), timeout)
+            for node in nodes_to_query
+        ), return_exceptions=True)
+        
+        merged = aggregate_query.new_state()
+        failed_nodes = list(skipped_nodes)
+        bytes_received = 0
+        
+        for node, result in zip(nodes_to_query, partial_states):
+            if isinstance(result, BaseException):
+                error = f"Timeout after {timeout}s" if isinstance(result, asyncio.TimeoutError) else str(result)
+                failed_nodes.append({"node_id": node.node_id, "error": error})
+                logger.error(f"Aggregate query failed on node {node.node_id}: {error}")
+                continue
+            state, size = result
+            merged.merge(state)
+            bytes_received += size
+        
+        results = merged.finalize()
+        
+        self.active_queries.finish(query_id, total_results=len(results))
+        
+        return {
+            "success": True,
+            "query_id": query_id,
+            "results": results,
+            "total_results": len(results),
+            "rows_scanned": merged.rows_scanned,
+            "bytes_received": bytes_received,
+            "nodes_contacted": len(nodes_to_query),
+            "successful_nodes": len(nodes_to_query) - len(failed_nodes) + len(skipped_nodes),
+            "failed_nodes": failed_nodes,
+            "partial": bool(failed_nodes),
+            "execution_timestamp": datetime.now().isoformat()
+        }
+
+    async def _node_aggregate_state(self, node, aggregate_query: AggregateQuery, oql_query: str,
+                                    timeout: int) -> Tuple[AggregateState, int]:
+        """
+        Récupère l'état partiel d'agrégation d'un node via SyncData (sync_type "aggregate").
+        Pour un node ne proposant pas SyncData, l'agrégation est faite localement sur ses lignes.
+        """
+        sync_data = getattr(node, "sync_data", None)
+        if sync_data is None:
+            state = aggregate_query.new_state()
+            async for result in self._stream_node_query(node, aggregate_query.row_query, timeout):
+                state.update((result,))
+            return state, 0
+        
+        watermark = await self._node_watermark(node)
+        cached = None
+        if watermark is not None:
+            cached = await self.query_cache.get(oql_query, node.node_id, watermark)
+        
+        if cached is not None:
+            # Aucun appel au node : la sonde éventuellement réservée par _select_nodes est libérée
+            self.node_health.get(node.node_id).release_probe()
+            chunks = [base64.b64decode(chunk) for chunk in cached]
+        else:
+            response = await self._call_node(
+                node,
+                lambda target: target.sync_data(sync_type=AGGREGATE_SYNC_TYPE, query=oql_query, timeout_seconds=timeout),
+                timeout
+            )
+            chunks = response["data_chunks"] if isinstance(response, dict) else response.data_chunks
+            if watermark is not None:
+                await self.query_cache.put(oql_query, node.node_id,
+                                           [base64.b64encode(chunk).decode("ascii") for chunk in chunks], watermark)
+        
+        state = aggregate_query.new_state()
+        for chunk in chunks:
+            state.merge(AggregateState.from_bytes(aggregate_query, chunk))
+        return state, sum(len(chunk) for chunk in chunks)
+
+    async def _pump_node_results(self, node_index: int, node, oql_query: str, timeout: int, queue: asyncio.Queue):
+        """Transfère les résultats d'un node vers la file de fusion, puis signale la fin du flux."""
+        start_time = datetime.now()
+        error = None
+        
+        # Les flux sont bornés par le délai adaptatif du node ; les appels unitaires
+        # l'appliquent eux-mêmes (avec requête dupliquée vers un réplica)
+        streaming = getattr(node, "stream_oql", None) is not None
+        deadline = self.node_health.get(node.node_id).adaptive_timeout(timeout) if streaming else timeout
+        
+        async def pump():
+            async for result in self._stream_node_query(node, oql_query, timeout):
+                queue.put_nowait((node_index, result))
+        
+        try:
+            await asyncio.wait_for(pump(), deadline)
+        except asyncio.TimeoutError:
+            error = f"Timeout after {deadline:.1f}s"
+            if streaming:
+                self.node_health.get(node.node_id).record_failure()
+        except asyncio.CancelledError:
+            self.node_health.get(node.node_id).release_probe()
+            raise
+        except Exception as e:
+            error = str(e)
+            if streaming:
+                self.node_health.get(node.node_id).record_failure()
+        
+        execution_time = (datetime.now() - start_time).total_seconds() * 1000
+        queue.put_nowait((node_index, _NodeStreamEnd(error, execution_time)))
+
+    async def _stream_node_query(self, node, oql_query: str, timeout: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Flux des résultats d'un node, servi depuis le cache si les données du node
+        n'ont pas changé (même watermark). Un flux interrompu (LIMIT) n'est pas mis en cache.
+        """
+        watermark = await self._node_watermark(node)
+        if watermark is None:
+            async for result in self._fetch_node_results(node, oql_query, timeout):
+                yield result
+            return
+        
+        cached = await self.query_cache.get(oql_query, node.node_id, watermark)
+        if cached is not None:
+            # Aucun appel au node : la sonde éventuellement réservée par _select_nodes est libérée
+            self.node_health.get(node.node_id).release_probe()
+            for result in cached:
+                yield result
+            return
+        
+        results = []
+        async for result in self._fetch_node_results(node, oql_query, timeout):
+            results.append(result)
+            yield result
+        await self.query_cache.put(oql_query, node.node_id, results, watermark)
+
+    async def _node_watermark(self, node) -> Optional[Any]:
+        """
+        Watermark des données d'un node (ex. dernier numéro de séquence ingéré).
+        Sans cache ou sans watermark, les résultats du node ne sont pas mis en cache.
+        """
+        get_watermark = getattr(node, "get_watermark", None)
+        if self.query_cache is None or get_watermark is None:
+            return None
+        try:
+            return await get_watermark()
+        except Exception as e:
+            logger.error(f"Error getting data watermark from node {node.node_id}: {e}")
+            return None
+
+    async def _fetch_node_results(self, node, oql_query: str, timeout: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Flux des résultats d'un node, triés par timestamp décroissant.
+        Utilise node.stream_oql si le client le propose, sinon la réponse complète du node.
+        """
+        stream_oql = getattr(node, "stream_oql", None)
+        if stream_oql is not None:
+            start = time.monotonic()
+            async for result in stream_oql(oql_query, timeout=timeout):
+                yield result
+            self.node_health.get(node.node_id).record_success(time.monotonic() - start)
+            return
+        
+        response = await self._call_node(node, lambda target: self._execute_node_query(target, oql_query, timeout), timeout)
+        for result in sorted(response.get("results", []), key=lambda x: x.get("timestamp", ""), reverse=True):
+            yield result
+
+    def _select_nodes(self, target_nodes: Optional[List[str]] = None) -> Tuple[List, List[Dict[str, Any]]]:
+        """
+        Sélectionne les nodes à interroger.
+        Un node dont le disjoncteur est ouvert ou qui se déclare surchargé est remplacé
+        par un réplica sain s'il en a un ; sinon un node au disjoncteur ouvert est ignoré.
+        """
+        nodes = self.nodes
+        if target_nodes:
+            nodes = [node for node in self.nodes if node.node_id in target_nodes]
+        
+        selected, skipped = [], []
+        used_ids = {node.node_id for node in nodes}
+        
+        for node in nodes:
+            health = self.node_health.get(node.node_id)
+            if not health.is_overloaded() and health.allow_request():
+                selected.append(node)
+                continue
+        
+            replica = self._pick_replica(node, exclude=used_ids)
+            if replica is not None and self.node_health.get(replica.node_id).allow_request():
+                logger.info(f"Routing query for node {node.node_id} to replica {replica.node_id}")
+                used_ids.add(replica.node_id)
+                selected.append(replica)
+            elif health.is_overloaded() and health.allow_request():
+                selected.append(node)
+            else:
+                skipped.append({"node_id": node.node_id, "error": f"Circuit {health.state}"})
+        
+        return selected, skipped
+
+    def _pick_replica(self, node, exclude: Optional[Set[str]] = None):
+        """Réplica disponible le plus rapide d'un node (attribut replicas du client), ou None."""
+        exclude = exclude or set()
+        replica_ids = set(getattr(node, "replicas", None) or ()) - exclude - {node.node_id}
+        candidates = [
+            candidate for candidate in self.nodes
+            if candidate.node_id in replica_ids
+            and self.node_health.get(candidate.node_id).is_available()
+            and not self.node_health.get(candidate.node_id).is_overloaded()
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda candidate: self.node_health.get(candidate.node_id).score())
+
+    async def _call_node(self, node, call: Callable[[Any], Awaitable[Any]], timeout: float) -> Any:
+        """
+        Appelle un node avec son délai adaptatif. Si la réponse tarde au-delà de la
+        latence habituelle du node (≈ p95), la même requête est envoyée à un réplica
+        et la première réponse réussie est retenue.
+        """
+        health = self.node_health.get(node.node_id)
+        deadline = health.adaptive_timeout(timeout)
+        primary = asyncio.ensure_future(self._timed_call(node, call, deadline))
+        
+        replica = self._pick_replica(node)
+        if replica is None:
+            return await primary
+        
+        done, _ = await asyncio.wait({primary}, timeout=health.hedge_delay(deadline))
+        if done:
+            return primary.result()
+        
+        self.hedged_requests += 1
+        logger.debug(f"Hedging request for node {node.node_id} to replica {replica.node_id}")
+        replica_deadline = self.node_health.get(replica.node_id).adaptive_timeout(timeout)
+        pending = {primary, asyncio.ensure_future(self._timed_call(replica, call, replica_deadline))}
+        error = None
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _timed_call(self, node, call: Callable[[Any], Awaitable[Any]], deadline: float) -> Any:
+        """Exécute un appel sur un node et met à jour sa santé."""
+        health = self.node_health.get(node.node_id)
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(node), deadline)
+        except asyncio.CancelledError:
+            # Requête dupliquée abandonnée : rien à conclure sur la santé du node
+            health.release_probe()
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(time.monotonic() - start)
+        return result
+
+    def update_node_report(self, report: Any):
+        """Prend en compte le NodeHealth d'un NodeReport reçu via SyncNode."""
+        self.node_health.update_from_report(report)
+
+    def get_node_health(self) -> Dict[str, Dict[str, Any]]:
+        """Récupère l'état de santé observé des nodes."""
+        return self.node_health.get_statistics()
+
+    def _is_new_result(self, result: Dict[str, Any], seen: Set[bytes]) -> bool:
+        """Déduplication sur une empreinte de 128 bits du résultat."""
+        result_key = self._create_result_key(result)
+        if result_key in seen:
+            return False
+        seen.add(result_key)
+        return True
+
+    def _parse_limit(self, oql_query: str) -> Optional[int]:
+        """Extrait la clause LIMIT d'une requête OQL."""
+        match = _LIMIT_CLAUSE.search(oql_query)
+        return int(match.group(1)) if match else None
 
     async def _execute_node_query(self, node, oql_query: str, timeout: int) -> Dict[str, Any]:
         """Exécute une requête sur un node spécifique."""
@@ -140,80 +577,27 @@ class FederatedQueryEngine:
 
     def _merge_and_deduplicate_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Fusionne et déduplique les résultats de plusieurs nodes."""
-        if not results:
-            return []
-        
-        # Créer un dictionnaire pour la déduplication basée sur un identifiant unique
-        unique_results = {}
-        
-        for result in results:
-            # Créer une clé unique basée sur les données importantes
-            result_key = self._create_result_key(result)
-            
-            if result_key not in unique_results:
-                unique_results[result_key] = result
-            else:
-                # Si on a un doublon, garder le plus récent
-                existing_timestamp = unique_results[result_key].get("timestamp", "")
-                new_timestamp = result.get("timestamp", "")
-                
-                if new_timestamp > existing_timestamp:
-                    unique_results[result_key] = result
+        seen: Set[bytes] = set()
+        unique_results = [result for result in results if self._is_new_result(result, seen)]
         
         # Trier par timestamp
-        sorted_results = sorted(
-            unique_results.values(),
-            key=lambda x: x.get("timestamp", ""),
-            reverse=True
-        )
-        
-        return sorted_results
-
-    def _create_result_key(self, result: Dict[str, Any]) -> str:
-        """Crée une clé unique pour un résultat."""
-        # Combiner les champs importants pour créer une clé unique
-        key_parts = [
-            result.get("node_id", ""),
-            result.get("agent_id", ""),
-            result.get("timestamp", ""),
-            str(result.get("result_data", ""))
-        ]
-        return "|".join(key_parts)
-
-    async def _cache_query_results(self, query_id: str, oql_query: str, results: List[Dict[str, Any]]):
-        """Met en cache les résultats de la requête."""
-        try:
-            cache_key = f"federated_query:{query_id}"
-            cache_data = {
-                "query": oql_query,
-                "results": results,
-                "cached_at": datetime.now().isoformat(),
-                "result_count": len(results)
-            }
-            
-            # Cache pour 1 heure
-            await self.redis.setex(cache_key, 3600, json.dumps(cache_data))
-            
-        except Exception as e:
-            logger.error(f"Error caching query results: {e}")
+        unique_results.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        return unique_results
 
-    async def get_cached_results(self, query_id: str) -> Optional[Dict[str, Any]]:
-        """Récupère les résultats mis en cache d'une requête."""
-        try:
-            if not self.redis:
-                return None
-            
-            cache_key = f"federated_query:{query_id}"
-            cached_data = await self.redis.get(cache_key)
-            
-            if cached_data:
-                return json.loads(cached_data)
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error getting cached results: {e}")
-            return None
+    def _create_result_key(self, result: Dict[str, Any]) -> bytes:
+        """Crée une empreinte unique (128 bits) pour un résultat."""
+        result_data = result.get("result_data", "")
+        if not isinstance(result_data, (str, bytes)):
+            result_data = json.dumps(result_data, sort_keys=True, default=str)
+        if isinstance(result_data, str):
+            result_data = result_data.encode("utf-8", "surrogatepass")
+        
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (result.get("node_id", ""), result.get("agent_id", ""), result.get("timestamp", "")):
+            digest.update(str(part).encode("utf-8", "surrogatepass"))
+            digest.update(b"\x00")
+        digest.update(result_data)
+        return digest.digest()
 
     async def execute_global_hunt(self, hunt_type: str, parameters: Dict[str, Any], target_nodes: List[str] = None) -> Dict[str, Any]:
         """
@@ -312,28 +696,23 @@ class FederatedQueryEngine:
 
     def get_query_status(self, query_id: str) -> Optional[Dict[str, Any]]:
         """Récupère le statut d'une requête active."""
-        return self.active_queries.get(query_id)
+        record = self.active_queries.get(query_id)
+        return record.to_dict() if record else None
 
     def get_active_queries(self) -> List[Dict[str, Any]]:
         """Récupère la liste des requêtes actives."""
-        return [
-            {
-                "query_id": qid,
-                **query_info
-            }
-            for qid, query_info in self.active_queries.items()
-        ]
+        return [record.to_dict() for record in self.active_queries.values()]
 
     def cleanup_old_queries(self, max_age_hours: int = 24):
-        """Nettoie les anciennes requêtes du cache."""
+        """Nettoie les anciennes requêtes (en plus de l'expiration automatique du registre)."""
         cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
         
-        queries_to_remove = []
-        for query_id, query_info in self.active_queries.items():
-            if query_info.get("start_time", datetime.now()) < cutoff_time:
-                queries_to_remove.append(query_id)
+        queries_to_remove = [
+            query_id for query_id, record in self.active_queries.items()
+            if record.start_time < cutoff_time
+        ]
         
         for query_id in queries_to_remove:
-            del self.active_queries[query_id]
+            self.active_queries.pop(query_id)
         
-        logger.info(f"Cleaned up {len(queries_to_remove)} old queries") 
\ No newline at end of file
+        logger.info(f"Cleaned up {len(queries_to_remove)} old queries")
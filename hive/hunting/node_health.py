@@ -0,0 +1,202 @@
+"""
+Suivi de santé des Nodes de la fédération : latence (EWMA), taux d'erreur,
+disjoncteurs et délais adaptatifs, complétés par les NodeHealth remontés par
+les Nodes (federation.proto).
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# États du disjoncteur
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class NodeHealthTracker:
+    """Santé observée d'un Node et disjoncteur associé."""
+
+    def __init__(self, node_id: str, alpha: float = 0.2, failure_threshold: int = 5,
+                 error_rate_threshold: float = 0.5, reset_timeout: float = 10.0,
+                 max_reset_timeout: float = 300.0, min_timeout: float = 1.0,
+                 min_timeout_ratio: float = 0.25):
+        self.node_id = node_id
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.min_timeout = min_timeout
+        self.min_timeout_ratio = min_timeout_ratio
+
+        self.latency_ewma: Optional[float] = None
+        self.latency_deviation = 0.0
+        self.error_rate = 0.0
+        self.samples = 0
+        self.consecutive_failures = 0
+
+        self.state = CIRCUIT_CLOSED
+        self.reset_timeout = reset_timeout
+        self.open_until = 0.0
+        self.probe_in_flight = False
+
+        # Dernier NodeHealth remonté par le Node
+        self.reported_status: Optional[str] = None
+        self.reported_cpu = 0.0
+        self.reported_memory = 0.0
+        self.reported_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float):
+        """Enregistre une réponse réussie et sa latence (secondes)."""
+        with self._lock:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+                self.latency_deviation = latency / 2
+            else:
+                self.latency_deviation += self.alpha * (abs(latency - self.latency_ewma) - self.latency_deviation)
+                self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+            self.error_rate *= (1 - self.alpha)
+            self.samples += 1
+            self.consecutive_failures = 0
+
+            if self.state != CIRCUIT_CLOSED:
+                logger.info(f"Circuit closed for node {self.node_id}")
+            self.state = CIRCUIT_CLOSED
+            self.reset_timeout = self.base_reset_timeout
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        """Enregistre un échec (erreur ou dépassement de délai)."""
+        with self._lock:
+            self.error_rate += self.alpha * (1 - self.error_rate)
+            self.samples += 1
+            self.consecutive_failures += 1
+            self.probe_in_flight = False
+
+            if self.state == CIRCUIT_HALF_OPEN:
+                # La sonde a échoué : rouvrir avec un délai doublé
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == CIRCUIT_CLOSED and (
+                self.consecutive_failures >= self.failure_threshold
+                or (self.samples >= self.failure_threshold and self.error_rate >= self.error_rate_threshold)
+            ):
+                self._open()
+
+    def _open(self):
+        self.state = CIRCUIT_OPEN
+        self.open_until = time.monotonic() + self.reset_timeout
+        logger.warning(f"Circuit opened for node {self.node_id} for {self.reset_timeout:.0f}s "
+                       f"(error rate {self.error_rate:.2f}, {self.consecutive_failures} consecutive failures)")
+
+    def is_available(self) -> bool:
+        """Indique si une requête pourrait être envoyée au Node (sans réserver de sonde)."""
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN:
+                return time.monotonic() >= self.open_until
+            return not self.probe_in_flight
+
+    def allow_request(self) -> bool:
+        """Autorise une requête ; en demi-ouverture, une seule sonde est autorisée à la fois."""
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN:
+                if time.monotonic() < self.open_until:
+                    return False
+                self.state = CIRCUIT_HALF_OPEN
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            return True
+
+    def release_probe(self):
+        """Libère la sonde d'un appel abandonné sans résultat (annulation)."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def adaptive_timeout(self, max_timeout: float) -> float:
+        """
+        Délai accordé au Node : latence habituelle + marge, borné par max_timeout.
+        Le délai demandé reflète le coût attendu de la requête : le délai accordé
+        n'en descend pas sous une fraction (min_timeout_ratio), pour qu'une requête
+        lourde sur un Node habituellement rapide n'expire pas et n'ouvre pas le disjoncteur.
+        """
+        if self.latency_ewma is None:
+            return max_timeout
+        floor = max(self.min_timeout, max_timeout * self.min_timeout_ratio)
+        return min(max_timeout, max(floor, self.latency_ewma + 4 * self.latency_deviation))
+
+    def hedge_delay(self, max_timeout: float) -> float:
+        """Délai après lequel une requête dupliquée est envoyée à un réplica (≈ p95)."""
+        if self.latency_ewma is None:
+            return max_timeout / 2
+        return min(max_timeout, self.latency_ewma + 2 * self.latency_deviation)
+
+    def update_reported_health(self, health: Any):
+        """Prend en compte un NodeHealth (message protobuf ou dictionnaire)."""
+        def field(name, default):
+            if isinstance(health, dict):
+                return health.get(name, default)
+            return getattr(health, name, default)
+
+        self.reported_status = field('status', None) or None
+        self.reported_cpu = float(field('cpu_usage', 0.0) or 0.0)
+        self.reported_memory = float(field('memory_usage', 0.0) or 0.0)
+        self.reported_at = time.monotonic()
+
+    def is_overloaded(self, max_age: float = 300.0) -> bool:
+        """Le Node s'est déclaré en état critique (ou saturé) récemment."""
+        if self.reported_at is None or time.monotonic() - self.reported_at > max_age:
+            return False
+        return self.reported_status == "critical" or self.reported_cpu >= 95.0 or self.reported_memory >= 95.0
+
+    def score(self) -> float:
+        """Score de routage (plus bas = meilleur)."""
+        latency = self.latency_ewma if self.latency_ewma is not None else 1.0
+        return latency * (1 + 4 * self.error_rate) * (2 if self.reported_status == "warning" else 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'node_id': self.node_id,
+            'circuit': self.state,
+            'latency_ewma_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            'latency_deviation_ms': round(self.latency_deviation * 1000, 1),
+            'error_rate': round(self.error_rate, 3),
+            'consecutive_failures': self.consecutive_failures,
+            'reported_status': self.reported_status,
+            'overloaded': self.is_overloaded()
+        }
+
+
+class NodeHealthRegistry:
+    """Registre des NodeHealthTracker, créés à la demande."""
+
+    def __init__(self, **tracker_options):
+        self.tracker_options = tracker_options
+        self._trackers: Dict[str, NodeHealthTracker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, node_id: str) -> NodeHealthTracker:
+        tracker = self._trackers.get(node_id)
+        if tracker is None:
+            with self._lock:
+                tracker = self._trackers.setdefault(node_id, NodeHealthTracker(node_id, **self.tracker_options))
+        return tracker
+
+    def update_from_report(self, report: Any):
+        """Met à jour la santé d'un Node depuis un NodeReport (SyncNode)."""
+        node_id = report['node_id'] if isinstance(report, dict) else report.node_id
+        health = report.get('health') if isinstance(report, dict) else report.health
+        if health is not None:
+            self.get(node_id).update_reported_health(health)
+
+    def get_statistics(self) -> Dict[str, Dict[str, Any]]:
+        return {node_id: tracker.to_dict() for node_id, tracker in list(self._trackers.items())}
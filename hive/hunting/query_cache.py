@@ -0,0 +1,230 @@
+"""
+Cache Redis des résultats de requêtes fédérées.
+
+Les entrées sont indexées par requête OQL normalisée et par Node, avec le
+watermark de données du Node au moment de l'exécution : une requête répétée
+ne réinterroge que les Nodes dont les données ont changé.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "federated_cache"
+
+# Littéraux entre quotes (conservés tels quels lors de la normalisation)
+_QUOTED = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")")
+
+# Mots-clés OQL (insensibles à la casse) ; les fonctions d'agrégat seulement
+# devant une parenthèse, pour ne pas confondre un champ « count » avec « COUNT »
+_KEYWORDS = re.compile(
+    r"(?<![\w.])(?:SELECT|DISTINCT|FROM|WHERE|GROUP|ORDER|BY|HAVING|LIMIT|AS|AND|OR|NOT|IN|IS|NULL|LIKE"
+    r"|BETWEEN|ASC|DESC|(?:COUNT|TOP|MIN|MAX)(?=\s*\())(?![\w.])",
+    re.IGNORECASE
+)
+
+
+def normalize_query(oql_query: str) -> str:
+    """
+    Forme canonique d'une requête OQL : espaces compactés et mots-clés en
+    majuscules, en dehors des littéraux entre quotes. Les noms de sources et
+    de champs gardent leur casse (les champs des lignes y sont sensibles).
+    """
+    parts = _QUOTED.split(oql_query.strip().rstrip(';').strip())
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            normalized.append(part)
+        else:
+            normalized.append(_KEYWORDS.sub(lambda match: match.group(0).upper(), re.sub(r'\s+', ' ', part)))
+    return ''.join(normalized)
+
+
+class FederatedResultCache:
+    """Cache des résultats par (requête normalisée, Node), compressé, avec éviction LRU."""
+
+    def __init__(self, redis_client, ttl: int = 3600, max_entry_bytes: int = 8 * 1024 * 1024,
+                 max_total_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            redis_client: Client Redis asynchrone
+            ttl: Durée de vie maximale d'une entrée en secondes
+            max_entry_bytes: Taille maximale (compressée) d'une entrée
+            max_total_bytes: Taille totale au-delà de laquelle les entrées les moins récemment utilisées sont évincées
+        """
+        self.redis = redis_client
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self.max_total_bytes = max_total_bytes
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+        self._evicting = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _digest(self, oql_query: str, node_id: str) -> str:
+        key = f"{normalize_query(oql_query)}\x00{node_id}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _encode(self, payload: Dict[str, Any]) -> bytes:
+        """Sérialise (msgpack, sinon JSON) et compresse (zstd, sinon zlib)."""
+        if msgpack is not None:
+            fmt, data = b'M', msgpack.packb(payload, use_bin_type=True, default=str)
+        else:
+            fmt, data = b'J', json.dumps(payload, default=str).encode('utf-8')
+
+        if self._zstd_compressor is not None:
+            return fmt + b'Z' + self._zstd_compressor.compress(data)
+        return fmt + b'z' + zlib.compress(data)
+
+    def _decode(self, blob: bytes) -> Optional[Dict[str, Any]]:
+        fmt, compression, data = blob[:1], blob[1:2], blob[2:]
+        if compression == b'Z':
+            if self._zstd_decompressor is None:
+                return None
+            data = self._zstd_decompressor.decompress(data)
+        else:
+            data = zlib.decompress(data)
+
+        if fmt == b'M':
+            if msgpack is None:
+                return None
+            return msgpack.unpackb(data, raw=False)
+        return json.loads(data)
+
+    async def get(self, oql_query: str, node_id: str, watermark: Any = None) -> Optional[Any]:
+        """
+        Retourne les données en cache d'un Node pour cette requête, si son
+        watermark n'a pas changé depuis leur mise en cache.
+        """
+        digest = self._digest(oql_query, node_id)
+        try:
+            blob = await self.redis.get(f"{CACHE_PREFIX}:entry:{digest}")
+            entry = self._decode(blob) if blob else None
+            if entry is None or entry.get('watermark') != (str(watermark) if watermark is not None else None):
+                self.misses += 1
+                return None
+
+            await self.redis.zadd(f"{CACHE_PREFIX}:lru", {digest: time.time()})
+            self.hits += 1
+            return entry['data']
+
+        except Exception as e:
+            logger.error(f"Error reading federated cache: {e}")
+            self.misses += 1
+            return None
+
+    async def put(self, oql_query: str, node_id: str, data: Any, watermark: Any = None):
+        """Met en cache les données d'un Node pour cette requête."""
+        digest = self._digest(oql_query, node_id)
+        try:
+            blob = self._encode({
+                'watermark': str(watermark) if watermark is not None else None,
+                'cached_at': time.time(),
+                'data': data
+            })
+            if len(blob) > self.max_entry_bytes:
+                logger.debug(f"Federated cache entry for node {node_id} too large ({len(blob)} bytes), not cached")
+                return
+
+            previous_size = await self.redis.hget(f"{CACHE_PREFIX}:sizes", digest)
+            pipeline = self.redis.pipeline()
+            pipeline.set(f"{CACHE_PREFIX}:entry:{digest}", blob, ex=self.ttl)
+            pipeline.zadd(f"{CACHE_PREFIX}:lru", {digest: time.time()})
+            pipeline.hset(f"{CACHE_PREFIX}:sizes", digest, len(blob))
+            pipeline.incrby(f"{CACHE_PREFIX}:total_bytes", len(blob) - int(previous_size or 0))
+            results = await pipeline.execute()
+
+            if int(results[-1]) > self.max_total_bytes and not self._evicting.locked():
+                async with self._evicting:
+                    await self._evict()
+
+        except Exception as e:
+            logger.error(f"Error writing federated cache: {e}")
+
+    async def _evict(self, batch_size: int = 8):
+        """
+        Évince les entrées les moins récemment utilisées jusqu'à repasser sous la limite.
+        Les entrées déjà expirées (TTL) restent dans l'index LRU et dans le total :
+        elles sont retirées de la comptabilité sans être comptées comme évictions.
+        """
+        while True:
+            total = int(await self.redis.get(f"{CACHE_PREFIX}:total_bytes") or 0)
+            if total <= self.max_total_bytes:
+                return
+
+            digests = await self.redis.zrange(f"{CACHE_PREFIX}:lru", 0, batch_size - 1)
+            if not digests:
+                await self.redis.set(f"{CACHE_PREFIX}:total_bytes", 0)
+                return
+            digests = [digest.decode() if isinstance(digest, bytes) else digest for digest in digests]
+
+            sizes = await self.redis.hmget(f"{CACHE_PREFIX}:sizes", digests)
+
+            pipeline = self.redis.pipeline()
+            for digest in digests:
+                pipeline.exists(f"{CACHE_PREFIX}:entry:{digest}")
+            alive = await pipeline.execute()
+
+            # Entrées expirées du lot, puis entrées vivantes tant que la limite est dépassée
+            candidates = []
+            for digest, size, exists in zip(digests, sizes, alive):
+                if exists and total <= self.max_total_bytes:
+                    continue
+                total -= int(size or 0)
+                candidates.append((digest, size, exists))
+
+            # Seul le processus qui retire l'entrée de l'index LRU décompte sa taille
+            pipeline = self.redis.pipeline()
+            for digest, _, _ in candidates:
+                pipeline.zrem(f"{CACHE_PREFIX}:lru", digest)
+            removed = await pipeline.execute()
+
+            evicted = expired = 0
+            pipeline = self.redis.pipeline()
+            for (digest, size, exists), was_removed in zip(candidates, removed):
+                if not was_removed:
+                    continue
+                if exists:
+                    pipeline.delete(f"{CACHE_PREFIX}:entry:{digest}")
+                    evicted += 1
+                else:
+                    expired += 1
+                pipeline.hdel(f"{CACHE_PREFIX}:sizes", digest)
+                pipeline.decrby(f"{CACHE_PREFIX}:total_bytes", int(size or 0))
+            await pipeline.execute()
+            self.evictions += evicted
+            if evicted:
+                logger.info(f"Evicted {evicted} federated cache entries")
+            if expired:
+                logger.debug(f"Dropped {expired} expired federated cache entries from the LRU index")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Récupère les statistiques du cache."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0,
+            'evictions': self.evictions,
+            'serializer': 'msgpack' if msgpack is not None else 'json',
+            'compression': 'zstd' if zstandard is not None else 'zlib'
+        }
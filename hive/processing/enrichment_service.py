@@ -2,9 +2,22 @@ import json
 import logging
 from typing import Dict, Any, Optional
 import redis
+from collectors.pattern_matcher import LiteralMatcher
 
 logger = logging.getLogger(__name__)
 
+# Jeux de motifs compilés une seule fois pour tout le service
+SENSITIVE_PATHS = LiteralMatcher([
+    '/etc/passwd', '/etc/shadow', '/windows/system32',
+    'C:\\Windows\\System32', 'C:\\Windows\\SysWOW64'
+])
+SUSPICIOUS_COMMANDS = LiteralMatcher([
+    'wget', 'curl', 'nc', 'netcat', 'nslookup', 'dig',
+    'whoami', 'net user', 'net group', 'reg query',
+    'powershell -enc', 'certutil -urlcache'
+])
+DOWNLOAD_INDICATORS = LiteralMatcher(['http://', 'https://', 'ftp://'], case_sensitive=True)
+
 class EnrichmentService:
     def __init__(self, redis_client: redis.Redis):
         self.redis_client = redis_client
@@ -114,17 +127,10 @@ class EnrichmentService:
             event['tags'] = event.get('tags', []) + ['suspicious_file']
         
         # Vérifier les emplacements sensibles
-        sensitive_paths = [
-            '/etc/passwd', '/etc/shadow', '/windows/system32',
-            'C:\\Windows\\System32', 'C:\\Windows\\SysWOW64'
-        ]
-        
-        for sensitive_path in sensitive_paths:
-            if sensitive_path.lower() in file_path.lower():
-                event['sensitive_file_access'] = True
-                event['tags'] = event.get('tags', []) + ['sensitive_file_access']
-                event['criticality'] = 'medium'
-                break
+        if SENSITIVE_PATHS.search(file_path):
+            event['sensitive_file_access'] = True
+            event['tags'] = event.get('tags', []) + ['sensitive_file_access']
+            event['criticality'] = 'medium'
         
         return event
 
@@ -137,27 +143,15 @@ class EnrichmentService:
             return event
         
         # Vérifier les commandes suspectes
-        suspicious_commands = [
-            'wget', 'curl', 'nc', 'netcat', 'nslookup', 'dig',
-            'whoami', 'net user', 'net group', 'reg query',
-            'powershell -enc', 'certutil -urlcache'
-        ]
-        
-        command_lower = command.lower()
-        for suspicious_cmd in suspicious_commands:
-            if suspicious_cmd in command_lower:
-                event['suspicious_command'] = True
-                event['tags'] = event.get('tags', []) + ['suspicious_command']
-                event['criticality'] = 'medium'
-                break
+        if SUSPICIOUS_COMMANDS.search(command):
+            event['suspicious_command'] = True
+            event['tags'] = event.get('tags', []) + ['suspicious_command']
+            event['criticality'] = 'medium'
         
         # Vérifier les tentatives de téléchargement
-        download_indicators = ['http://', 'https://', 'ftp://']
-        for indicator in download_indicators:
-            if indicator in command:
-                event['download_attempt'] = True
-                event['tags'] = event.get('tags', []) + ['download_attempt']
-                break
+        if DOWNLOAD_INDICATORS.search(command):
+            event['download_attempt'] = True
+            event['tags'] = event.get('tags', []) + ['download_attempt']
         
         return event
 
@@ -0,0 +1,320 @@
+"""
+Répartition des requêtes OQL sur la flotte d'agents.
+
+Une requête vise un ensemble d'agents (sélecteur), puis est distribuée par
+vagues à débit limité dans la file d'instructions de chaque agent. Le nombre
+d'agents en cours d'exécution (donc de flux de résultats ouverts) est borné.
+"""
+
+import fnmatch
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from hive.query_registry import BoundedRegistry
+
+logger = logging.getLogger(__name__)
+
+# Séparateur entre identifiant de requête et d'agent dans les instructions
+TASK_SEPARATOR = ":"
+
+
+def make_task_id(query_id: str, agent_id: str) -> str:
+    """Identifiant de la tâche d'un agent pour une requête de flotte."""
+    return f"{query_id}{TASK_SEPARATOR}{agent_id}"
+
+
+def split_task_id(task_id: str) -> Tuple[str, Optional[str]]:
+    """Retourne (query_id, agent_id) ; agent_id vaut None pour un identifiant simple."""
+    query_id, separator, agent_id = task_id.partition(TASK_SEPARATOR)
+    return (query_id, agent_id) if separator else (task_id, None)
+
+
+class TargetSelector:
+    """
+    Sélection d'agents. Les critères fournis sont combinés (ET) :
+        all: True                   tous les agents connectés
+        agent_ids: [...]            identifiants explicites
+        os: "linux"                 système (préfixe, insensible à la casse)
+        hostname: "web-*"           motif glob sur le nom d'hôte
+        labels: {"env": "prod"}     étiquettes de l'agent
+    """
+
+    def __init__(self, agent_ids: Optional[List[str]] = None, os: Optional[str] = None,
+                 hostname: Optional[str] = None, labels: Optional[Dict[str, str]] = None, all: bool = False):
+        self.agent_ids = set(agent_ids) if agent_ids else None
+        self.os = os.lower() if os else None
+        self.hostname = hostname.lower() if hostname else None
+        self.labels = labels or {}
+        self.all = all
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TargetSelector':
+        allowed = {'agent_ids', 'os', 'hostname', 'labels', 'all'}
+        unknown = set(data) - allowed
+        if unknown:
+            raise ValueError(f"Critères de ciblage inconnus : {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    def is_empty(self) -> bool:
+        return not (self.all or self.agent_ids or self.os or self.hostname or self.labels)
+
+    def matches(self, agent_id: str, agent: Dict[str, Any]) -> bool:
+        if self.agent_ids is not None and agent_id not in self.agent_ids:
+            return False
+        if self.os and not str(agent.get('os', '')).lower().startswith(self.os):
+            return False
+        if self.hostname and not fnmatch.fnmatchcase(str(agent.get('hostname', '')).lower(), self.hostname):
+            return False
+        agent_labels = agent.get('labels') or {}
+        return all(agent_labels.get(key) == value for key, value in self.labels.items())
+
+
+class FleetQuery:
+    """État de répartition d'une requête sur la flotte."""
+
+    __slots__ = ('query_id', 'query', 'total_targets', 'pending', 'running', 'completed', 'failed',
+                 'timed_out', 'unreachable', 'rows', 'submitted_at', 'finished_at')
+
+    def __init__(self, query_id: str, query: str, targets: List[str]):
+        self.query_id = query_id
+        self.query = query
+        self.total_targets = len(targets)
+        self.pending = deque(targets)
+        # agent_id -> instant de distribution (ordre chronologique)
+        self.running: "OrderedDict[str, float]" = OrderedDict()
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.unreachable = 0
+        self.rows = 0
+        self.submitted_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def done(self) -> bool:
+        return not self.pending and not self.running
+
+    def progress(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed + self.timed_out + self.unreachable
+        return {
+            'query_id': self.query_id,
+            'query': self.query,
+            'status': 'completed' if self.done else ('running' if self.running or finished else 'queued'),
+            'total_targets': self.total_targets,
+            'queued': len(self.pending),
+            'running': len(self.running),
+            'completed': self.completed,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'unreachable': self.unreachable,
+            'rows': self.rows,
+            'percent': round(100.0 * finished / self.total_targets, 1) if self.total_targets else 100.0,
+            'submitted_at': self.submitted_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class FleetQueryDispatcher:
+    """Planificateur de distribution des requêtes par vagues."""
+
+    def __init__(self, agents, instruction_factory: Callable[[str, str], Any],
+                 wave_size: int = 500, wave_interval: float = 1.0, max_running: int = 2000,
+                 agent_timeout: float = 600, on_query_done: Optional[Callable[[FleetQuery], None]] = None):
+        """
+        Args:
+            agents: Registre des agents connectés (agent_id -> infos avec instruction_queue)
+            instruction_factory: Construit l'instruction (query, task_id) à mettre en file
+            wave_size: Nombre maximum d'instructions distribuées par vague
+            wave_interval: Intervalle entre deux vagues (secondes)
+            max_running: Nombre maximum d'agents exécutant une requête simultanément
+            agent_timeout: Délai au-delà duquel un agent sans réponse est considéré en échec
+            on_query_done: Appelé lorsqu'une requête est terminée sur tous les agents ciblés
+        """
+        self.agents = agents
+        self.instruction_factory = instruction_factory
+        self.wave_size = wave_size
+        self.wave_interval = wave_interval
+        self.max_running = max_running
+        self.agent_timeout = agent_timeout
+        self.on_query_done = on_query_done
+
+        self.queries = BoundedRegistry(max_entries=10000, ttl=24 * 3600)
+        self._active: "OrderedDict[str, FleetQuery]" = OrderedDict()
+        self._running_total = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def resolve_targets(self, selector: TargetSelector) -> List[str]:
+        """Liste les agents connectés correspondant au sélecteur."""
+        return [agent_id for agent_id, agent in self.agents.items() if selector.matches(agent_id, agent)]
+
+    def submit(self, query: str, selector: TargetSelector, query_id: Optional[str] = None) -> FleetQuery:
+        """Planifie une requête sur les agents ciblés et retourne son état."""
+        if selector.is_empty():
+            raise ValueError("Aucun critère de ciblage fourni")
+
+        fleet_query = FleetQuery(query_id or str(uuid.uuid4()), query, self.resolve_targets(selector))
+        self.queries.register(fleet_query.query_id, fleet_query)
+        logger.info(f"Fleet query {fleet_query.query_id} scheduled on {fleet_query.total_targets} agents")
+
+        if fleet_query.total_targets == 0:
+            self._finish(fleet_query)
+            return fleet_query
+
+        with self._lock:
+            self._active[fleet_query.query_id] = fleet_query
+        self._ensure_thread()
+        self._wakeup.set()
+        return fleet_query
+
+    def progress(self, query_id: str) -> Optional[Dict[str, Any]]:
+        fleet_query = self.queries.get(query_id)
+        if fleet_query is None:
+            return None
+        with self._lock:
+            return fleet_query.progress()
+
+    def record_rows(self, task_id: str, count: int = 1):
+        """Comptabilise des lignes reçues pour une tâche."""
+        query_id, _ = split_task_id(task_id)
+        fleet_query = self.queries.get(query_id)
+        if fleet_query is not None:
+            with self._lock:
+                fleet_query.rows += count
+
+    def mark_done(self, task_id: str, success: bool = True):
+        """Signale la fin de l'exécution d'une tâche par un agent."""
+        query_id, agent_id = split_task_id(task_id)
+        fleet_query = self.queries.get(query_id)
+        if fleet_query is None or agent_id is None:
+            return
+
+        with self._lock:
+            if fleet_query.running.pop(agent_id, None) is None:
+                return
+            self._running_total -= 1
+            if success:
+                fleet_query.completed += 1
+            else:
+                fleet_query.failed += 1
+            finished = fleet_query.done
+            if finished:
+                self._active.pop(query_id, None)
+
+        if finished:
+            self._finish(fleet_query)
+        self._wakeup.set()
+
+    def cancel(self, query_id: str) -> bool:
+        """Annule la distribution des instructions non encore envoyées."""
+        with self._lock:
+            fleet_query = self._active.get(query_id)
+            if fleet_query is None:
+                return False
+            fleet_query.unreachable += len(fleet_query.pending)
+            fleet_query.pending.clear()
+            finished = fleet_query.done
+            if finished:
+                self._active.pop(query_id, None)
+        if finished:
+            self._finish(fleet_query)
+        return True
+
+    def _finish(self, fleet_query: FleetQuery):
+        fleet_query.finished_at = datetime.now()
+        logger.info(f"Fleet query {fleet_query.query_id} finished: {fleet_query.progress()}")
+        if self.on_query_done:
+            try:
+                self.on_query_done(fleet_query)
+            except Exception as e:
+                logger.error(f"Error in fleet query completion callback: {e}")
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="fleet-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.wave_interval)
+            self._wakeup.clear()
+            try:
+                self._dispatch_wave()
+            except Exception as e:
+                logger.error(f"Error dispatching fleet queries: {e}")
+
+    def _dispatch_wave(self):
+        """Distribue une vague d'instructions, à tour de rôle entre les requêtes actives."""
+        finished = []
+        now = time.monotonic()
+
+        with self._lock:
+            # Agents n'ayant pas répondu à temps
+            for fleet_query in self._active.values():
+                while fleet_query.running:
+                    agent_id, dispatched_at = next(iter(fleet_query.running.items()))
+                    if now - dispatched_at < self.agent_timeout:
+                        break
+                    fleet_query.running.popitem(last=False)
+                    fleet_query.timed_out += 1
+                    self._running_total -= 1
+
+            budget = min(self.wave_size, self.max_running - self._running_total)
+            queries = [fleet_query for fleet_query in self._active.values() if fleet_query.pending]
+
+            while budget > 0 and queries:
+                for fleet_query in list(queries):
+                    if budget <= 0:
+                        break
+                    if not fleet_query.pending:
+                        queries.remove(fleet_query)
+                        continue
+                    agent_id = fleet_query.pending.popleft()
+                    if self._enqueue_instruction(agent_id, fleet_query):
+                        fleet_query.running[agent_id] = now
+                        self._running_total += 1
+                        budget -= 1
+                    else:
+                        fleet_query.unreachable += 1
+
+            for query_id, fleet_query in list(self._active.items()):
+                if fleet_query.done:
+                    del self._active[query_id]
+                    finished.append(fleet_query)
+
+        for fleet_query in finished:
+            self._finish(fleet_query)
+
+    def _enqueue_instruction(self, agent_id: str, fleet_query: FleetQuery) -> bool:
+        """Ajoute l'instruction dans la file de l'agent ; False si l'agent n'est plus connecté."""
+        instruction = self.instruction_factory(fleet_query.query, make_task_id(fleet_query.query_id, agent_id))
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            return False
+        agent["instruction_queue"].append(instruction)
+        wakeup = agent.get("wakeup")
+        # Réveille le flux Heartbeat de l'agent pour un envoi immédiat
+        if wakeup is not None:
+            try:
+                wakeup()
+            except RuntimeError:
+                # Boucle de l'agent déjà fermée : l'instruction partira au prochain heartbeat
+                pass
+        return True
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'active_queries': len(self._active),
+                'running_agents': self._running_total,
+                'max_running': self.max_running,
+                'wave_size': self.wave_size,
+                'wave_interval': self.wave_interval
+            }
@@ -0,0 +1,216 @@
+"""
+Registre en mémoire bornée (LRU + TTL) pour le suivi des requêtes et des agents.
+Les entrées expirées sont retirées par un thread de nettoyage en arrière-plan.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marqueur d'absence d'entrée
+_MISSING = object()
+
+
+class QueryRecord:
+    """Statut compact d'une requête (OQL locale ou fédérée)."""
+
+    __slots__ = ('query_id', 'query', 'status', 'targets', 'start_time', 'end_time',
+                 'total_results', 'error')
+
+    def __init__(self, query_id: str, query: str, targets: Optional[List[str]] = None, status: str = "running"):
+        self.query_id = query_id
+        self.query = query
+        self.status = status
+        self.targets = targets or []
+        self.start_time = datetime.now()
+        self.end_time: Optional[datetime] = None
+        self.total_results = 0
+        self.error: Optional[str] = None
+
+    def finish(self, status: str = "completed", total_results: Optional[int] = None, error: Optional[str] = None):
+        self.status = status
+        self.end_time = datetime.now()
+        if total_results is not None:
+            self.total_results = total_results
+        if error is not None:
+            self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "query_id": self.query_id,
+            "query": self.query,
+            "status": self.status,
+            "nodes": self.targets,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "total_results": self.total_results,
+            "error": self.error
+        }
+
+
+class BoundedRegistry:
+    """
+    Dictionnaire à mémoire bornée : au plus max_entries entrées (les moins
+    récemment utilisées sont évincées), chacune expirant ttl secondes après
+    son dernier accès en écriture (register/touch).
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: Optional[float] = 3600,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        """
+        Args:
+            max_entries: Nombre maximum d'entrées conservées
+            ttl: Durée de vie (secondes) d'une entrée sans activité, None pour aucune expiration
+            on_evict: Appelé (clé, valeur) pour chaque entrée évincée ou expirée
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+        self.evicted = 0
+        self.expired = 0
+
+    def _expires_at(self) -> float:
+        return time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+
+    def register(self, key: Hashable, value: Any):
+        """Ajoute ou remplace une entrée."""
+        evicted = []
+        with self._lock:
+            self._entries[key] = (self._expires_at(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+                self.evicted += 1
+        self._notify(evicted)
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.register(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def touch(self, key: Hashable) -> bool:
+        """Prolonge la durée de vie d'une entrée. Retourne False si elle n'existe plus."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            self._entries[key] = (self._expires_at(), entry[1])
+            self._entries.move_to_end(key)
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def __delitem__(self, key: Hashable):
+        with self._lock:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Copie des entrées non expirées."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._entries.items() if expires_at > now]
+
+    def values(self) -> List[Any]:
+        return [value for _, value in self.items()]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter([key for key, _ in self.items()])
+
+    def reap(self) -> int:
+        """Retire les entrées expirées."""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, (expires_at, value) in list(self._entries.items()):
+                if expires_at <= now:
+                    del self._entries[key]
+                    expired.append((key, (expires_at, value)))
+            self.expired += len(expired)
+        self._notify(expired)
+        return len(expired)
+
+    def _notify(self, entries: List[Tuple[Hashable, Tuple[float, Any]]]):
+        if not self.on_evict:
+            return
+        for key, (_, value) in entries:
+            try:
+                self.on_evict(key, value)
+            except Exception as e:
+                logger.error(f"Error in registry eviction callback for {key}: {e}")
+
+    def start_reaper(self, interval: float = 60):
+        """Démarre le thread de nettoyage des entrées expirées."""
+        if self._reaper and self._reaper.is_alive():
+            return
+
+        self._stop_reaper.clear()
+
+        def run():
+            while not self._stop_reaper.wait(interval):
+                try:
+                    self.reap()
+                except Exception as e:
+                    logger.error(f"Error reaping registry: {e}")
+
+        self._reaper = threading.Thread(target=run, name="registry-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self):
+        self._stop_reaper.set()
+        self._reaper = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'evicted': self.evicted,
+            'expired': self.expired
+        }
+
+
+class QueryRegistry(BoundedRegistry):
+    """Registre borné des requêtes en cours et récentes."""
+
+    def start(self, query_id: str, query: str, targets: Optional[List[str]] = None) -> QueryRecord:
+        record = QueryRecord(query_id, query, targets)
+        self.register(query_id, record)
+        return record
+
+    def finish(self, query_id: str, status: str = "completed", total_results: Optional[int] = None,
+               error: Optional[str] = None) -> Optional[QueryRecord]:
+        record = self.get(query_id)
+        if record is not None:
+            record.finish(status, total_results, error)
+            self.touch(query_id)
+        return record
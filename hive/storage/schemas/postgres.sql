@@ -195,8 +195,13 @@ CREATE TABLE threat_intel_indicators (
 -- Index pour améliorer les performances
 CREATE INDEX IF NOT EXISTS idx_cases_status ON cases(status);
 CREATE INDEX IF NOT EXISTS idx_cases_created_at ON cases(created_at);
-CREATE INDEX IF NOT EXISTS idx_alerts_severity ON alerts(severity);
-CREATE INDEX IF NOT EXISTS idx_alerts_status ON alerts(status);
+-- Index composites des listes d'alertes (filtres + tri par date + pagination par curseur)
+CREATE INDEX IF NOT EXISTS idx_alerts_status_severity_created ON alerts(status, severity, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_status_created ON alerts(status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_severity_created ON alerts(severity, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_case_created ON alerts(case_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_created ON alerts(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_case_queries_case_created ON case_queries(case_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_agents_last_seen ON agents(last_seen);
 CREATE INDEX IF NOT EXISTS idx_collections_status ON collections(status);
 CREATE INDEX IF NOT EXISTS idx_sessions_token ON sessions(token);
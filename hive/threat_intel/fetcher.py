@@ -1,18 +1,29 @@
-import requests
+import httpx
 import redis
 import json
 import logging
-import time
-from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set
 from datetime import datetime, timedelta
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Type et durée de vie (secondes) des indicateurs stockés dans Redis
+INDICATOR_TYPES = {
+    "ip": {"type": "malicious_ip", "ttl": 7*24*3600},
+    "hash": {"type": "malware_hash", "ttl": 30*24*3600},
+    "url": {"type": "malicious_url", "ttl": 7*24*3600}
+}
+
+# Taille des lots de SADD/SREM sur les snapshots
+SNAPSHOT_CHUNK_SIZE = 10000
+
 class ThreatIntelFetcher:
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, feeds: Optional[Dict[str, Dict]] = None,
+                 max_concurrent_fetches: int = 4, http_client: Optional[httpx.AsyncClient] = None):
         self.redis_client = redis_client
-        self.feeds = {
+        self.feeds = feeds or {
             "feodo": {
                 "url": "https://feodotracker.abuse.ch/downloads/ipblocklist.txt",
                 "type": "ip",
@@ -33,123 +44,220 @@ class ThreatIntelFetcher:
             }
         }
         self.last_update = {}
+        self.last_changes = {}
+        self.max_concurrent_fetches = max_concurrent_fetches
+        # Client HTTP injectable (tests contre un serveur local, transport simulé)
+        self.http_client = http_client
+        # Indicateurs présents dans chaque feed lors du dernier chargement
+        self._snapshots: Dict[str, Set[str]] = {}
+        self._last_full_refresh: Dict[str, datetime] = {}
 
     def update_feeds(self) -> Dict[str, int]:
         """
         Télécharge les indicateurs et les charge dans Redis.
-        Retourne le nombre d'indicateurs chargés par feed.
+        Retourne le nombre d'écritures Redis effectuées par feed.
+        """
+        return asyncio.run(self.update_feeds_async())
+
+    async def update_feeds_async(self, feed_names: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Met à jour les feeds en parallèle.
+        Retourne le nombre d'écritures Redis effectuées par feed.
         """
         logger.info("Updating Threat Intelligence feeds...")
-        results = {}
+        feed_names = feed_names or list(self.feeds.keys())
+        semaphore = asyncio.Semaphore(self.max_concurrent_fetches)
+        
+        async with self._get_http_client() as client:
+            counts = await asyncio.gather(*(
+                self._update_feed_guarded(client, semaphore, feed_name)
+                for feed_name in feed_names
+            ))
+        
+        return dict(zip(feed_names, counts))
+
+    @asynccontextmanager
+    async def _get_http_client(self):
+        """Fournit le client HTTP injecté, ou un client dédié fermé en sortie."""
+        if self.http_client is not None:
+            yield self.http_client
+            return
         
-        for feed_name, feed_config in self.feeds.items():
+        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+            yield client
+
+    async def _update_feed_guarded(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, feed_name: str) -> int:
+        """Met à jour un feed en isolant ses erreurs des autres feeds."""
+        async with semaphore:
             try:
-                count = self._update_single_feed(feed_name, feed_config)
-                results[feed_name] = count
+                count = await self._update_single_feed(client, feed_name, self.feeds[feed_name])
                 self.last_update[feed_name] = datetime.now()
+                return count
                 
             except Exception as e:
                 logger.error(f"Error updating feed {feed_name}: {e}")
-                results[feed_name] = 0
-                
-        return results
+                return 0
 
-    def _update_single_feed(self, feed_name: str, feed_config: Dict) -> int:
-        """Met à jour un feed spécifique."""
+    async def _update_single_feed(self, client: httpx.AsyncClient, feed_name: str, feed_config: Dict) -> int:
+        """
+        Met à jour un feed spécifique.
+        Seules les différences avec le snapshot précédent sont écrites dans Redis.
+        Le client Redis étant synchrone, ses appels s'exécutent dans un thread
+        pour ne pas bloquer la boucle asyncio.
+        """
         logger.info(f"Updating feed: {feed_name}")
+        feed_type = feed_config['type']
+        meta_key = f"threat_intel:feed_meta:{feed_name}"
+        
+        # Requête conditionnelle à partir des validateurs du dernier téléchargement
+        meta = await asyncio.to_thread(self._load_meta, meta_key)
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        
+        previous = await asyncio.to_thread(self._load_snapshot, feed_name)
+        new_meta = {}
         
         try:
-            response = requests.get(feed_config['url'], timeout=30)
-            response.raise_for_status()
+            async with client.stream('GET', feed_config['url'], headers=headers) as response:
+                if response.status_code == 304:
+                    logger.info(f"Feed {feed_name} not modified since last download")
+                    indicators = previous
+                else:
+                    response.raise_for_status()
+                    
+                    # Analyse ligne par ligne au fil de la réception
+                    indicators = set()
+                    async for line in response.aiter_lines():
+                        indicator = self._parse_indicator(feed_type, line)
+                        if indicator:
+                            indicators.add(indicator)
+                    
+                    for header, field in (('etag', 'etag'), ('last-modified', 'last_modified')):
+                        if response.headers.get(header):
+                            new_meta[field] = response.headers[header]
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Failed to download feed {feed_name}: {e}")
             return 0
+        
+        added = indicators - previous
+        removed = previous - indicators
+        
+        # Réécriture complète périodique pour prolonger la durée de vie des indicateurs inchangés
+        ttl = INDICATOR_TYPES[feed_type]['ttl']
+        last_full_refresh = self._last_full_refresh.get(feed_name)
+        full_refresh = last_full_refresh is None or datetime.now() - last_full_refresh > timedelta(seconds=ttl // 2)
+        
+        to_write = indicators if full_refresh else added
+        deleted = await asyncio.to_thread(
+            self._write_changes, feed_name, feed_config, to_write, added, removed, new_meta
+        )
+        
+        self._snapshots[feed_name] = indicators
+        if full_refresh:
+            self._last_full_refresh[feed_name] = datetime.now()
+        self.last_changes[feed_name] = {
+            'total': len(indicators),
+            'added': len(added),
+            'removed': len(removed),
+            'full_refresh': full_refresh
+        }
+        
+        logger.info(f"Feed {feed_name}: {len(indicators)} {feed_type} indicators, "
+                    f"+{len(added)} / -{len(removed)}, {len(to_write) + deleted} Redis writes")
+        return len(to_write) + deleted
 
-        count = 0
+    def _write_changes(self, feed_name: str, feed_config: Dict, to_write: Set[str], added: Set[str],
+                       removed: Set[str], new_meta: Dict[str, str]) -> int:
+        """
+        Écrit le delta d'un feed dans Redis (appel bloquant).
+        Retourne le nombre d'indicateurs supprimés.
+        """
         feed_type = feed_config['type']
+        ttl = INDICATOR_TYPES[feed_type]['ttl']
         
-        # Utiliser un pipeline Redis pour une insertion massive et performante
-        pipeline = self.redis_client.pipeline()
+        # Utiliser un pipeline Redis pour n'envoyer que le delta en un seul aller-retour
+        pipeline = self.redis_client.pipeline(transaction=False)
+        value = self._indicator_value(feed_type, feed_config)
         
-        for line in response.text.splitlines():
-            line = line.strip()
-            
-            # Ignorer les commentaires et lignes vides
-            if line.startswith('#') or not line:
-                continue
-                
-            # Traiter selon le type de feed
-            if feed_type == "ip":
-                count += self._process_ip_indicator(line, feed_config, pipeline)
-            elif feed_type == "hash":
-                count += self._process_hash_indicator(line, feed_config, pipeline)
-            elif feed_type == "url":
-                count += self._process_url_indicator(line, feed_config, pipeline)
+        for indicator in to_write:
+            pipeline.set(f"threat_intel:{feed_type}:{indicator}", value, ex=ttl)
         
-        # Exécuter toutes les commandes Redis en une fois
-        pipeline.execute()
+        deleted = 0
+        for indicator in removed:
+            if not self._is_in_other_feed(feed_name, feed_type, indicator):
+                pipeline.delete(f"threat_intel:{feed_type}:{indicator}")
+                deleted += 1
         
-        logger.info(f"Successfully loaded {count} {feed_type} indicators from {feed_name}")
-        return count
-
-    def _process_ip_indicator(self, ip: str, feed_config: Dict, pipeline) -> int:
-        """Traite un indicateur IP."""
-        # Validation basique d'IP
-        if not self._is_valid_ip(ip):
-            return 0
-            
-        # La clé sera préfixée pour éviter les collisions
-        key = f"threat_intel:ip:{ip}"
-        value = json.dumps({
-            "source": feed_config['description'],
-            "type": "malicious_ip",
-            "feed": feed_config['description'],
-            "added_at": datetime.now().isoformat(),
-            "expires_at": (datetime.now() + timedelta(days=7)).isoformat()
-        })
+        snapshot_key = f"threat_intel:snapshot:{feed_name}"
+        for chunk in self._chunks(list(added)):
+            pipeline.sadd(snapshot_key, *chunk)
+        for chunk in self._chunks(list(removed)):
+            pipeline.srem(snapshot_key, *chunk)
+        if new_meta:
+            pipeline.hset(f"threat_intel:feed_meta:{feed_name}", mapping=new_meta)
         
-        # Expire après 7 jours
-        pipeline.set(key, value, ex=7*24*3600)
-        return 1
+        pipeline.execute()
+        return deleted
 
-    def _process_hash_indicator(self, hash_value: str, feed_config: Dict, pipeline) -> int:
-        """Traite un indicateur de hash."""
-        # Validation basique de hash (MD5, SHA1, SHA256)
-        if not self._is_valid_hash(hash_value):
-            return 0
-            
-        key = f"threat_intel:hash:{hash_value}"
-        value = json.dumps({
-            "source": feed_config['description'],
-            "type": "malware_hash",
-            "feed": feed_config['description'],
-            "added_at": datetime.now().isoformat(),
-            "expires_at": (datetime.now() + timedelta(days=30)).isoformat()
-        })
+    def _load_meta(self, meta_key: str) -> Dict[str, str]:
+        """Validateurs HTTP (etag, last_modified) du dernier téléchargement (appel bloquant)."""
+        return {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in (self.redis_client.hgetall(meta_key) or {}).items()
+        }
+
+    def _load_snapshot(self, feed_name: str) -> Set[str]:
+        """Récupère le snapshot précédent du feed (mémoire, sinon Redis, appel bloquant)."""
+        if feed_name not in self._snapshots:
+            members = self.redis_client.smembers(f"threat_intel:snapshot:{feed_name}") or set()
+            self._snapshots[feed_name] = {
+                member.decode() if isinstance(member, bytes) else member for member in members
+            }
+        return self._snapshots[feed_name]
+
+    def _is_in_other_feed(self, feed_name: str, feed_type: str, indicator: str) -> bool:
+        """Vérifie si un autre feed du même type référence encore l'indicateur."""
+        return any(
+            indicator in self._snapshots.get(other_name, ())
+            for other_name, other_config in self.feeds.items()
+            if other_name != feed_name and other_config['type'] == feed_type
+        )
+
+    @staticmethod
+    def _chunks(items: List[str]):
+        for i in range(0, len(items), SNAPSHOT_CHUNK_SIZE):
+            yield items[i:i + SNAPSHOT_CHUNK_SIZE]
+
+    def _parse_indicator(self, feed_type: str, line: str) -> Optional[str]:
+        """Extrait un indicateur valide d'une ligne de feed."""
+        line = line.strip()
         
-        # Expire après 30 jours
-        pipeline.set(key, value, ex=30*24*3600)
-        return 1
+        # Ignorer les commentaires et lignes vides
+        if not line or line.startswith('#'):
+            return None
+        
+        if feed_type == "ip" and self._is_valid_ip(line):
+            return line
+        if feed_type == "hash" and self._is_valid_hash(line):
+            return line
+        if feed_type == "url" and self._is_valid_url(line):
+            return line
+        return None
 
-    def _process_url_indicator(self, url: str, feed_config: Dict, pipeline) -> int:
-        """Traite un indicateur d'URL."""
-        # Validation basique d'URL
-        if not self._is_valid_url(url):
-            return 0
-            
-        key = f"threat_intel:url:{url}"
-        value = json.dumps({
+    def _indicator_value(self, feed_type: str, feed_config: Dict) -> str:
+        """Construit la valeur JSON stockée pour les indicateurs d'un feed."""
+        ttl = INDICATOR_TYPES[feed_type]['ttl']
+        return json.dumps({
             "source": feed_config['description'],
-            "type": "malicious_url",
+            "type": INDICATOR_TYPES[feed_type]['type'],
             "feed": feed_config['description'],
             "added_at": datetime.now().isoformat(),
-            "expires_at": (datetime.now() + timedelta(days=7)).isoformat()
+            "expires_at": (datetime.now() + timedelta(seconds=ttl)).isoformat()
         })
-        
-        # Expire après 7 jours
-        pipeline.set(key, value, ex=7*24*3600)
-        return 1
 
     def _is_valid_ip(self, ip: str) -> bool:
         """Valide une adresse IP."""
@@ -206,6 +314,7 @@ class ThreatIntelFetcher:
                 feed_name: last_update.isoformat() if last_update else None
                 for feed_name, last_update in self.last_update.items()
             }
+            stats['last_changes'] = self.last_changes
             
             # Informations sur les feeds
             stats['feeds'] = {
@@ -269,17 +378,25 @@ class ThreatIntelFetcher:
             logger.error(f"Error adding custom indicator: {e}")
             return False
 
-    async def start_periodic_updates(self, interval: int = 3600):
+    async def start_periodic_updates(self, interval: Optional[int] = None):
         """
         Démarre les mises à jour périodiques des feeds.
+        Chaque feed suit son propre update_interval, sauf si interval est fourni.
         """
-        logger.info(f"Starting periodic threat intel updates every {interval} seconds")
+        logger.info("Starting periodic threat intel updates")
+        semaphore = asyncio.Semaphore(self.max_concurrent_fetches)
+        
+        async with self._get_http_client() as client:
+            await asyncio.gather(*(
+                self._periodic_feed_updates(client, semaphore, feed_name, interval)
+                for feed_name in self.feeds
+            ))
+
+    async def _periodic_feed_updates(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                                     feed_name: str, interval: Optional[int]):
+        """Boucle de mise à jour d'un feed."""
+        feed_interval = interval or self.feeds[feed_name]['update_interval']
         
         while True:
-            try:
-                self.update_feeds()
-                await asyncio.sleep(interval)
-                
-            except Exception as e:
-                logger.error(f"Error in periodic updates: {e}")
-                await asyncio.sleep(interval) 
\ No newline at end of file
+            await self._update_feed_guarded(client, semaphore, feed_name)
+            await asyncio.sleep(feed_interval)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -15,7 +15,7 @@ import jwt
 from pathlib import Path
 from sqlalchemy.orm import Session
 from . import database
-from .database import get_db, Case as DBCase, Query as DBQuery, Agent as DBAgent, Alert as DBAlert, TimelineEvent as DBTimelineEvent
+from .database import get_db, Case as DBCase, Query as DBQuery, Agent as DBAgent, TimelineEvent as DBTimelineEvent
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import des endpoints de gestion de cas
@@ -96,6 +96,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Inclusion des routes de gestion de cas
@@ -136,11 +137,14 @@ async def get_case(case_id: str, db: Session = Depends(get_db)):
 
 # Endpoints des requêtes
 @app.get("/api/queries", response_model=List[Query])
-async def list_queries(case_id: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(DBQuery)
-    if case_id:
-        query = query.filter(DBQuery.case_id == case_id)
-    return query.all()
+async def list_queries(response: Response, case_id: Optional[str] = None, status: Optional[str] = None,
+                       cursor: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+    try:
+        queries, next_cursor = database.list_queries(db, case_id=case_id, status=status, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return queries
 
 @app.post("/api/queries", response_model=Query)
 async def create_query(query: QueryCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
@@ -180,11 +184,14 @@ async def submit_agent_query(agent_id: str, query: QueryCreate, db: Session = De
 
 # Endpoints de l'historique
 @app.get("/api/history")
-async def get_history(case_id: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
-    query = db.query(DBTimelineEvent)
-    if case_id:
-        query = query.filter(DBTimelineEvent.case_id == case_id)
-    return query.order_by(DBTimelineEvent.timestamp.desc()).limit(limit).all()
+async def get_history(response: Response, case_id: Optional[str] = None, cursor: Optional[str] = None,
+                      limit: int = 100, db: Session = Depends(get_db)):
+    try:
+        events, next_cursor = database.list_timeline_events(db, case_id=case_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return events
 
 # Endpoints de la timeline
 @app.get("/api/timeline")
@@ -198,13 +205,20 @@ async def get_timeline(case_id: str, start_time: Optional[datetime] = None, end_
 
 # Endpoints des alertes
 @app.get("/api/alerts")
-async def get_alerts(case_id: Optional[str] = None, severity: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(DBAlert)
-    if case_id:
-        query = query.filter(DBAlert.case_id == case_id)
-    if severity:
-        query = query.filter(DBAlert.severity == severity)
-    return query.order_by(DBAlert.created_at.desc()).all()
+async def get_alerts(response: Response, case_id: Optional[str] = None, severity: Optional[str] = None,
+                     status: Optional[str] = None, created_after: Optional[datetime] = None,
+                     created_before: Optional[datetime] = None, sort: str = "created_at", order: str = "desc",
+                     cursor: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+    try:
+        alerts, next_cursor = database.list_alerts(
+            db, status=status, severity=severity, case_id=case_id,
+            created_after=created_after, created_before=created_before,
+            sort=sort, descending=order != "asc", cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return [database.alert_to_dict(alert) for alert in alerts]
 
 # Routes web
 @app.get("/", response_class=HTMLResponse)
@@ -228,6 +242,11 @@ async def investigation_page(request: Request):
     return templates.TemplateResponse("investigation.html", {"request": request})
 
 # Fonctions utilitaires
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """Expose le curseur de la page suivante dans l'en-tête X-Next-Cursor."""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -0,0 +1,177 @@
+"""
+Diffusion des résultats de requêtes aux clients WebSocket.
+
+Chaque message est sérialisé une seule fois puis déposé dans la file bornée
+de chaque client, vidée par une tâche d'écriture propre au client : un
+navigateur lent ne retarde pas les autres. Les lignes de résultats sont
+regroupées en lots périodiques, et un client qui ne suit pas perd les lots
+les plus anciens puis est déconnecté s'il reste saturé.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+# Code de fermeture WebSocket « réessayer plus tard » (client trop lent)
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class ClientConnection:
+    """Connexion WebSocket avec file d'envoi bornée."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int = 256):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.writer: Optional[asyncio.Task] = None
+        self.saturated_since: Optional[float] = None
+        self.dropped = 0
+        self.sent = 0
+
+    def offer(self, payload: str, slow_consumer_timeout: float) -> bool:
+        """
+        Dépose un message pré-sérialisé. File pleine : le message le plus ancien
+        est abandonné. Retourne False si le client est saturé depuis trop longtemps.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            now = time.monotonic()
+            if self.saturated_since is None:
+                self.saturated_since = now
+            elif now - self.saturated_since > slow_consumer_timeout:
+                return False
+        else:
+            self.saturated_since = None
+        self.queue.put_nowait(payload)
+        return True
+
+    async def run(self):
+        """Tâche d'écriture : envoie les messages de la file dans l'ordre."""
+        while True:
+            payload = await self.queue.get()
+            await self.websocket.send_text(payload)
+            self.sent += 1
+
+
+class ConnectionManager:
+    """Clients WebSocket abonnés aux résultats d'une requête."""
+
+    def __init__(self, max_queue: int = 256, batch_size: int = 500, batch_interval: float = 0.1,
+                 slow_consumer_timeout: float = 10.0):
+        """
+        Args:
+            max_queue: Nombre de messages en attente par client
+            batch_size: Nombre de lignes au-delà duquel un lot est envoyé sans attendre
+            batch_interval: Délai maximal (secondes) avant l'envoi d'un lot de lignes
+            slow_consumer_timeout: Durée de saturation (secondes) avant déconnexion d'un client
+        """
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.slow_consumer_timeout = slow_consumer_timeout
+        self.active_connections: Dict[str, List[ClientConnection]] = {}
+        self._pending: Dict[str, List[str]] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        self.slow_consumers = 0
+
+    async def connect(self, websocket: WebSocket, query_id: str):
+        await websocket.accept()
+        client = ClientConnection(websocket, self.max_queue)
+        client.writer = asyncio.ensure_future(self._write(client, query_id))
+        self.active_connections.setdefault(query_id, []).append(client)
+        logger.info(f"WebSocket connecté pour query_id: {query_id}")
+
+    def disconnect(self, websocket: WebSocket, query_id: str):
+        clients = self.active_connections.get(query_id)
+        if not clients:
+            return
+        for client in [client for client in clients if client.websocket is websocket]:
+            clients.remove(client)
+            if client.writer is not None and client.writer is not asyncio.current_task():
+                client.writer.cancel()
+        if not clients:
+            del self.active_connections[query_id]
+            self._discard_pending(query_id)
+        logger.info(f"WebSocket déconnecté pour query_id: {query_id}")
+
+    async def _write(self, client: ClientConnection, query_id: str):
+        try:
+            await client.run()
+        except asyncio.CancelledError:
+            raise
+        except (WebSocketDisconnect, RuntimeError) as e:
+            logger.debug(f"WebSocket send failed for query_id {query_id}: {e}")
+            self.disconnect(client.websocket, query_id)
+        except Exception as e:
+            logger.error(f"Erreur d'envoi WebSocket pour query_id {query_id}: {e}")
+            self.disconnect(client.websocket, query_id)
+
+    async def broadcast(self, query_id: str, message: dict):
+        """
+        Diffuse un message. Les messages « result » sont regroupés en lots
+        {"type": "batch", "messages": [...]} ; les autres messages partent
+        immédiatement, après les lignes en attente.
+        """
+        if query_id not in self.active_connections:
+            return
+
+        payload = json.dumps(message, default=str)
+        if message.get("type") != "result":
+            self._flush(query_id)
+            self._send(query_id, payload)
+            return
+
+        pending = self._pending.setdefault(query_id, [])
+        pending.append(payload)
+        if len(pending) >= self.batch_size:
+            self._flush(query_id)
+        elif query_id not in self._flush_handles:
+            loop = asyncio.get_running_loop()
+            self._flush_handles[query_id] = loop.call_later(self.batch_interval, self._flush, query_id)
+
+    def _flush(self, query_id: str):
+        handle = self._flush_handles.pop(query_id, None)
+        if handle is not None:
+            handle.cancel()
+        pending = self._pending.pop(query_id, None)
+        if not pending:
+            return
+        # Lot assemblé à partir des messages déjà sérialisés
+        self._send(query_id, '{"type": "batch", "messages": [' + ', '.join(pending) + ']}')
+
+    def _discard_pending(self, query_id: str):
+        handle = self._flush_handles.pop(query_id, None)
+        if handle is not None:
+            handle.cancel()
+        self._pending.pop(query_id, None)
+
+    def _send(self, query_id: str, payload: str):
+        for client in list(self.active_connections.get(query_id, ())):
+            if not client.offer(payload, self.slow_consumer_timeout):
+                self.slow_consumers += 1
+                logger.warning(f"Slow WebSocket consumer for query_id {query_id} disconnected "
+                               f"({client.dropped} messages dropped)")
+                self.disconnect(client.websocket, query_id)
+                asyncio.ensure_future(self._close(client.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        except Exception as e:
+            logger.debug(f"Error closing slow WebSocket: {e}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        clients = [client for clients in self.active_connections.values() for client in clients]
+        return {
+            'queries': len(self.active_connections),
+            'clients': len(clients),
+            'queued_messages': sum(client.queue.qsize() for client in clients),
+            'dropped_messages': sum(client.dropped for client in clients),
+            'slow_consumers': self.slow_consumers
+        }
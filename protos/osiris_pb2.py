@@ -25,29 +25,47 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import struct_pb2 as google_dot_protobuf_dot_struct__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0cosiris.proto\x12\x06osiris\x1a\x1cgoogle/protobuf/struct.proto\"J\n\x13RegistrationRequest\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x10\n\x08hostname\x18\x02 \x01(\t\x12\x0f\n\x07os_info\x18\x03 \x01(\t\"&\n\x14RegistrationResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"$\n\x10HeartbeatRequest\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\"Q\n\x11HeartbeatResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12,\n\x0binstruction\x18\x02 \x01(\x0b\x32\x17.osiris.HiveInstruction\"2\n\x0fHiveInstruction\x12\r\n\x05query\x18\x01 \x01(\t\x12\x10\n\x08query_id\x18\x02 \x01(\t\"o\n\x0bQueryResult\x12\x10\n\x08query_id\x18\x01 \x01(\t\x12\'\n\x06result\x18\x02 \x01(\x0b\x32\x17.google.protobuf.Struct\x12%\n\x07summary\x18\x03 \x01(\x0b\x32\x14.osiris.QuerySummary\"0\n\x0cQuerySummary\x12\x10\n\x08query_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\"\x1f\n\rQueryResponse\x12\x0e\n\x06status\x18\x01 \x01(\t2\xd5\x01\n\nAgentComms\x12\x45\n\x08Register\x12\x1b.osiris.RegistrationRequest\x1a\x1c.osiris.RegistrationResponse\x12@\n\tHeartbeat\x12\x18.osiris.HeartbeatRequest\x1a\x19.osiris.HeartbeatResponse\x12>\n\x10SendQueryResults\x12\x13.osiris.QueryResult\x1a\x15.osiris.QueryResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0cosiris.proto\x12\x06osiris\x1a\x1cgoogle/protobuf/struct.proto\"\xd4\x01\n\x13RegistrationRequest\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x10\n\x08hostname\x18\x02 \x01(\t\x12\x0f\n\x07os_info\x18\x03 \x01(\t\x12\x0f\n\x07os_type\x18\x04 \x01(\t\x12\x0f\n\x07version\x18\x05 \x01(\t\x12\x37\n\x06labels\x18\x06 \x03(\x0b\x32\'.osiris.RegistrationRequest.LabelsEntry\x1a-\n\x0bLabelsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"Q\n\x14RegistrationResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12)\n\x0c\x63ompressions\x18\x02 \x03(\x0e\x32\x13.osiris.Compression\"\xbd\x01\n\x10HeartbeatRequest\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x10\n\x08hostname\x18\x02 \x01(\t\x12\x0f\n\x07os_type\x18\x03 \x01(\t\x12\x0f\n\x07version\x18\x04 \x01(\t\x12\x34\n\x06labels\x18\x05 \x03(\x0b\x32$.osiris.HeartbeatRequest.LabelsEntry\x1a-\n\x0bLabelsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"Q\n\x11HeartbeatResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12,\n\x0binstruction\x18\x02 \x01(\x0b\x32\x17.osiris.HiveInstruction\"2\n\x0fHiveInstruction\x12\r\n\x05query\x18\x01 \x01(\t\x12\x10\n\x08query_id\x18\x02 \x01(\t\"\x94\x01\n\x0bQueryResult\x12\x10\n\x08query_id\x18\x01 \x01(\t\x12\'\n\x06result\x18\x02 \x01(\x0b\x32\x17.google.protobuf.Struct\x12%\n\x07summary\x18\x03 \x01(\x0b\x32\x14.osiris.QuerySummary\x12#\n\x05\x62\x61tch\x18\x04 \x01(\x0b\x32\x14.osiris.EncodedBatch\"k\n\x0c\x45ncodedBatch\x12(\n\x0b\x63ompression\x18\x01 \x01(\x0e\x32\x13.osiris.Compression\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x11\n\trow_count\x18\x03 \x01(\r\x12\x10\n\x08raw_size\x18\x04 \x01(\r\"Q\n\x0bResultBatch\x12\x0e\n\x06source\x18\x01 \x01(\t\x12\x11\n\trow_count\x18\x02 \x01(\r\x12\x1f\n\x07\x63olumns\x18\x03 \x03(\x0b\x32\x0e.osiris.Column\"\xb8\x01\n\x06\x43olumn\x12\x0c\n\x04name\x18\x01 \x01(\t\x12 \n\x04type\x18\x02 \x01(\x0e\x32\x12.osiris.ColumnType\x12\x11\n\tnull_rows\x18\x03 \x03(\r\x12\x12\n\nint_values\x18\x04 \x03(\x12\x12\x15\n\rdouble_values\x18\x05 \x03(\x01\x12\x15\n\rstring_values\x18\x06 \x03(\t\x12\x13\n\x0b\x62ool_values\x18\x07 \x03(\x08\x12\x14\n\x0c\x62ytes_values\x18\x08 \x03(\x0c\"0\n\x0cQuerySummary\x12\x10\n\x08query_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\"\x1f\n\rQueryResponse\x12\x0e\n\x06status\x18\x01 \x01(\t*O\n\x0b\x43ompression\x12\x14\n\x10\x43OMPRESSION_NONE\x10\x00\x12\x14\n\x10\x43OMPRESSION_ZSTD\x10\x01\x12\x14\n\x10\x43OMPRESSION_ZLIB\x10\x02*v\n\nColumnType\x12\x11\n\rCOLUMN_STRING\x10\x00\x12\x0e\n\nCOLUMN_INT\x10\x01\x12\x11\n\rCOLUMN_DOUBLE\x10\x02\x12\x0f\n\x0b\x43OLUMN_BOOL\x10\x03\x12\x10\n\x0c\x43OLUMN_BYTES\x10\x04\x12\x0f\n\x0b\x43OLUMN_JSON\x10\x05\x32\xd5\x01\n\nAgentComms\x12\x45\n\x08Register\x12\x1b.osiris.RegistrationRequest\x1a\x1c.osiris.RegistrationResponse\x12@\n\tHeartbeat\x12\x18.osiris.HeartbeatRequest\x1a\x19.osiris.HeartbeatResponse\x12>\n\x10SendQueryResults\x12\x13.osiris.QueryResult\x1a\x15.osiris.QueryResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'osiris_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_REGISTRATIONREQUEST']._serialized_start=54
-  _globals['_REGISTRATIONREQUEST']._serialized_end=128
-  _globals['_REGISTRATIONRESPONSE']._serialized_start=130
-  _globals['_REGISTRATIONRESPONSE']._serialized_end=168
-  _globals['_HEARTBEATREQUEST']._serialized_start=170
-  _globals['_HEARTBEATREQUEST']._serialized_end=206
-  _globals['_HEARTBEATRESPONSE']._serialized_start=208
-  _globals['_HEARTBEATRESPONSE']._serialized_end=289
-  _globals['_HIVEINSTRUCTION']._serialized_start=291
-  _globals['_HIVEINSTRUCTION']._serialized_end=341
-  _globals['_QUERYRESULT']._serialized_start=343
-  _globals['_QUERYRESULT']._serialized_end=454
-  _globals['_QUERYSUMMARY']._serialized_start=456
-  _globals['_QUERYSUMMARY']._serialized_end=504
-  _globals['_QUERYRESPONSE']._serialized_start=506
-  _globals['_QUERYRESPONSE']._serialized_end=537
-  _globals['_AGENTCOMMS']._serialized_start=540
-  _globals['_AGENTCOMMS']._serialized_end=753
+  _globals['_REGISTRATIONREQUEST_LABELSENTRY']._loaded_options = None
+  _globals['_REGISTRATIONREQUEST_LABELSENTRY']._serialized_options = b'8\001'
+  _globals['_HEARTBEATREQUEST_LABELSENTRY']._loaded_options = None
+  _globals['_HEARTBEATREQUEST_LABELSENTRY']._serialized_options = b'8\001'
+  _globals['_COMPRESSION']._serialized_start=1292
+  _globals['_COMPRESSION']._serialized_end=1371
+  _globals['_COLUMNTYPE']._serialized_start=1373
+  _globals['_COLUMNTYPE']._serialized_end=1491
+  _globals['_REGISTRATIONREQUEST']._serialized_start=55
+  _globals['_REGISTRATIONREQUEST']._serialized_end=267
+  _globals['_REGISTRATIONREQUEST_LABELSENTRY']._serialized_start=222
+  _globals['_REGISTRATIONREQUEST_LABELSENTRY']._serialized_end=267
+  _globals['_REGISTRATIONRESPONSE']._serialized_start=269
+  _globals['_REGISTRATIONRESPONSE']._serialized_end=350
+  _globals['_HEARTBEATREQUEST']._serialized_start=353
+  _globals['_HEARTBEATREQUEST']._serialized_end=542
+  _globals['_HEARTBEATREQUEST_LABELSENTRY']._serialized_start=222
+  _globals['_HEARTBEATREQUEST_LABELSENTRY']._serialized_end=267
+  _globals['_HEARTBEATRESPONSE']._serialized_start=544
+  _globals['_HEARTBEATRESPONSE']._serialized_end=625
+  _globals['_HIVEINSTRUCTION']._serialized_start=627
+  _globals['_HIVEINSTRUCTION']._serialized_end=677
+  _globals['_QUERYRESULT']._serialized_start=680
+  _globals['_QUERYRESULT']._serialized_end=828
+  _globals['_ENCODEDBATCH']._serialized_start=830
+  _globals['_ENCODEDBATCH']._serialized_end=937
+  _globals['_RESULTBATCH']._serialized_start=939
+  _globals['_RESULTBATCH']._serialized_end=1020
+  _globals['_COLUMN']._serialized_start=1023
+  _globals['_COLUMN']._serialized_end=1207
+  _globals['_QUERYSUMMARY']._serialized_start=1209
+  _globals['_QUERYSUMMARY']._serialized_end=1257
+  _globals['_QUERYRESPONSE']._serialized_start=1259
+  _globals['_QUERYRESPONSE']._serialized_end=1290
+  _globals['_AGENTCOMMS']._serialized_start=1494
+  _globals['_AGENTCOMMS']._serialized_end=1707
 # @@protoc_insertion_point(module_scope)
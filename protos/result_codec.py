@@ -0,0 +1,271 @@
+"""
+Encodage des résultats de requête en lots de colonnes typées.
+
+Un google.protobuf.Struct par ligne répète chaque nom de champ et encode
+tout nombre en double. Un ResultBatch regroupe les lignes d'un lot : les
+noms de champs ne sont transmis qu'une fois et chaque colonne porte un
+tableau typé (entiers zigzag, doubles, chaînes, booléens, octets), les
+valeurs nulles étant repérées par leur indice de ligne. Le lot sérialisé
+est ensuite compressé dans un EncodedBatch : zstd si le Hive a annoncé
+savoir le décoder (RegistrationResponse.compressions), zlib sinon.
+
+Le décodage reconstruit les lignes colonne par colonne, sans conversion
+Struct -> dict ligne à ligne.
+"""
+
+import json
+import logging
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.protobuf import struct_pb2
+
+from protos import osiris_pb2
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Lots plus petits que ce seuil (octets) transmis sans compression
+MIN_COMPRESS_SIZE = 512
+
+# Bornes d'un sint64
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+COMPRESSIONS = {
+    'none': osiris_pb2.COMPRESSION_NONE,
+    'zstd': osiris_pb2.COMPRESSION_ZSTD,
+    'zlib': osiris_pb2.COMPRESSION_ZLIB,
+}
+
+
+def _to_python(value: Any) -> Any:
+    """Valeur Python d'une valeur Struct (objets et listes imbriqués compris)."""
+    if isinstance(value, struct_pb2.Struct):
+        return {key: _to_python(item) for key, item in value.items()}
+    if isinstance(value, struct_pb2.ListValue):
+        return [_to_python(item) for item in value]
+    return value
+
+
+def _row_to_dict(row: Any) -> Dict[str, Any]:
+    if not isinstance(row, struct_pb2.Struct):
+        return row
+    values = {}
+    for key, value in row.items():
+        # Struct ne connaît que des doubles : les valeurs entières redeviennent des entiers
+        if isinstance(value, float) and value.is_integer() and INT64_MIN <= value <= INT64_MAX:
+            value = int(value)
+        values[key] = _to_python(value)
+    return values
+
+
+def _column_type(values: List[Any]) -> int:
+    """Type commun des valeurs non nulles d'une colonne, JSON à défaut."""
+    kinds = set()
+    for value in values:
+        if isinstance(value, bool):
+            kinds.add(bool)
+        elif isinstance(value, int):
+            if not INT64_MIN <= value <= INT64_MAX:
+                return osiris_pb2.COLUMN_JSON
+            kinds.add(int)
+        elif isinstance(value, (float, str, bytes)):
+            kinds.add(type(value))
+        else:
+            return osiris_pb2.COLUMN_JSON
+        if len(kinds) > 1 and not kinds <= {int, float}:
+            return osiris_pb2.COLUMN_JSON
+
+    if kinds == {bool}:
+        return osiris_pb2.COLUMN_BOOL
+    if kinds == {int}:
+        return osiris_pb2.COLUMN_INT
+    if kinds <= {int, float} and kinds:
+        return osiris_pb2.COLUMN_DOUBLE
+    if kinds == {bytes}:
+        return osiris_pb2.COLUMN_BYTES
+    return osiris_pb2.COLUMN_STRING
+
+
+def encode_rows(rows: Iterable[Any], source: str = '') -> osiris_pb2.ResultBatch:
+    """
+    Lot de colonnes typées à partir de lignes (dictionnaires ou Struct).
+    Les colonnes suivent l'ordre d'apparition des champs.
+    """
+    rows = [_row_to_dict(row) for row in rows]
+    names: Dict[str, None] = {}
+    for row in rows:
+        for name in row:
+            if name not in names:
+                names[name] = None
+
+    batch = osiris_pb2.ResultBatch(source=source, row_count=len(rows))
+    for name in names:
+        values, null_rows = [], []
+        for index, row in enumerate(rows):
+            value = row.get(name)
+            if value is None:
+                null_rows.append(index)
+            else:
+                values.append(value)
+
+        column = batch.columns.add(name=name, type=_column_type(values))
+        column.null_rows.extend(null_rows)
+        if column.type == osiris_pb2.COLUMN_INT:
+            column.int_values.extend(values)
+        elif column.type == osiris_pb2.COLUMN_DOUBLE:
+            column.double_values.extend(values)
+        elif column.type == osiris_pb2.COLUMN_BOOL:
+            column.bool_values.extend(values)
+        elif column.type == osiris_pb2.COLUMN_BYTES:
+            column.bytes_values.extend(values)
+        elif column.type == osiris_pb2.COLUMN_STRING:
+            column.string_values.extend(values)
+        else:
+            column.string_values.extend(json.dumps(value, default=str) for value in values)
+    return batch
+
+
+def decode_rows(batch: osiris_pb2.ResultBatch) -> List[Dict[str, Any]]:
+    """Lignes (dictionnaires) d'un lot de colonnes ; les valeurs absentes valent None."""
+    rows: List[Dict[str, Any]] = [{} for _ in range(batch.row_count)]
+    for column in batch.columns:
+        if column.type == osiris_pb2.COLUMN_INT:
+            values = column.int_values
+        elif column.type == osiris_pb2.COLUMN_DOUBLE:
+            values = column.double_values
+        elif column.type == osiris_pb2.COLUMN_BOOL:
+            values = column.bool_values
+        elif column.type == osiris_pb2.COLUMN_BYTES:
+            values = column.bytes_values
+        elif column.type == osiris_pb2.COLUMN_JSON:
+            values = [json.loads(value) for value in column.string_values]
+        else:
+            values = column.string_values
+
+        name = column.name
+        if not column.null_rows:
+            for row, value in zip(rows, values):
+                row[name] = value
+            continue
+
+        null_rows = set(column.null_rows)
+        values = iter(values)
+        for index, row in enumerate(rows):
+            row[name] = None if index in null_rows else next(values, None)
+    return rows
+
+
+def supported_compressions() -> List[int]:
+    """Compressions que ce processus sait décoder (zstd seulement si zstandard est installé)."""
+    compressions = [osiris_pb2.COMPRESSION_NONE, osiris_pb2.COMPRESSION_ZLIB]
+    if zstandard is not None:
+        compressions.append(osiris_pb2.COMPRESSION_ZSTD)
+    return compressions
+
+
+def decompress(encoded: osiris_pb2.EncodedBatch) -> bytes:
+    """
+    ResultBatch sérialisé d'un lot encodé.
+
+    Raises:
+        ValueError: Compression non prise en charge (zstandard absent) ou inconnue
+    """
+    if encoded.compression == osiris_pb2.COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise ValueError("Lot compressé en zstd mais zstandard n'est pas installé")
+        return zstandard.ZstdDecompressor().decompress(encoded.data, max_output_size=encoded.raw_size)
+    if encoded.compression == osiris_pb2.COMPRESSION_ZLIB:
+        return zlib.decompress(encoded.data)
+    if encoded.compression != osiris_pb2.COMPRESSION_NONE:
+        raise ValueError(f"Compression inconnue: {encoded.compression}")
+    return encoded.data
+
+
+def decode_batch(encoded: osiris_pb2.EncodedBatch) -> List[Dict[str, Any]]:
+    """Lignes d'un lot encodé."""
+    return decode_rows(osiris_pb2.ResultBatch.FromString(decompress(encoded)))
+
+
+def result_rows(result: osiris_pb2.QueryResult) -> List[Dict[str, Any]]:
+    """Lignes d'un QueryResult : lot de colonnes, ligne Struct (ancien format) ou aucune (résumé)."""
+    if result.HasField('batch'):
+        return decode_batch(result.batch)
+    if result.HasField('result'):
+        return [_row_to_dict(result.result)]
+    return []
+
+
+class ResultEncoder:
+    """
+    Encodage et compression des lots de résultats côté agent.
+    La compression demandée n'est utilisée que si le Hive sait la décoder
+    (compressions annoncées à l'enregistrement) ; zlib sinon.
+    """
+
+    def __init__(self, compression: str = 'zstd', level: int = 3):
+        """
+        Args:
+            compression: Compression préférée (zstd, zlib ou none) ; zlib si zstandard
+                         n'est pas installé ou si le Hive ne la prend pas en charge
+            level: Niveau de compression
+        """
+        compression = (compression or 'none').lower()
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Compression inconnue: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("zstandard not installed, falling back to zlib compression")
+            compression = 'zlib'
+        self.preferred = COMPRESSIONS[compression]
+        self.level = level
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if zstandard else None
+        # zlib tant que le Hive n'a pas annoncé ses compressions
+        self.compression = self.preferred if self.preferred != osiris_pb2.COMPRESSION_ZSTD else osiris_pb2.COMPRESSION_ZLIB
+        self.hive_compressions = {osiris_pb2.COMPRESSION_NONE, osiris_pb2.COMPRESSION_ZLIB}
+
+    def negotiate(self, hive_compressions: Iterable[int]):
+        """Retient la compression préférée si le Hive l'a annoncée, zlib sinon."""
+        self.hive_compressions = {osiris_pb2.COMPRESSION_NONE, osiris_pb2.COMPRESSION_ZLIB} | set(hive_compressions)
+        if self.preferred in self.hive_compressions:
+            self.compression = self.preferred
+        else:
+            self.compression = osiris_pb2.COMPRESSION_ZLIB
+        logger.info(f"Result batch compression: {osiris_pb2.Compression.Name(self.compression)}")
+
+    def _compress(self, data: bytes) -> Optional[bytes]:
+        if len(data) < MIN_COMPRESS_SIZE:
+            return None
+        if self.compression == osiris_pb2.COMPRESSION_ZSTD:
+            return self._zstd_compressor.compress(data)
+        if self.compression == osiris_pb2.COMPRESSION_ZLIB:
+            return zlib.compress(data, self.level)
+        return None
+
+    def _wrap(self, data: bytes, row_count: int) -> osiris_pb2.EncodedBatch:
+        encoded = osiris_pb2.EncodedBatch(row_count=row_count, raw_size=len(data))
+        compressed = self._compress(data)
+        if compressed is not None and len(compressed) < len(data):
+            encoded.compression = self.compression
+            encoded.data = compressed
+        else:
+            encoded.data = data
+        return encoded
+
+    def encode(self, rows: Iterable[Any], source: str = '') -> osiris_pb2.EncodedBatch:
+        """Lot encodé et compressé (non compressé s'il est petit ou si la compression n'y gagne rien)."""
+        batch = encode_rows(rows, source)
+        return self._wrap(batch.SerializeToString(), batch.row_count)
+
+    def recode(self, encoded: osiris_pb2.EncodedBatch) -> osiris_pb2.EncodedBatch:
+        """
+        Lot lisible par le Hive : un lot mis en spool avec une compression que le
+        Hive n'annonce pas (Hive remplacé, annonce reçue après l'encodage) est recompressé.
+        """
+        if encoded.compression in self.hive_compressions:
+            return encoded
+        return self._wrap(decompress(encoded), encoded.row_count)
@@ -0,0 +1,126 @@
+"""
+Banc de mesure de l'analyseur de logs Linux (collectors/linux/log_parser.py).
+
+Le corpus par défaut est généré de façon déterministe à partir de lignes
+typiques d'auth.log (sshd, pam_unix, sudo, CRON, systemd-logind) ; un
+fichier réel peut être fourni avec --corpus. Avec --min-rate, le script
+échoue si le débit de l'analyse ligne par ligne des événements
+d'authentification (celle des collecteurs) descend sous le seuil (lignes/s).
+
+    python scripts/benchmark_log_parser.py --lines 500000 --min-rate 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from collectors.linux.log_parser import LogParser  # noqa: E402
+
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Modèles de lignes d'auth.log et leur fréquence relative
+AUTH_TEMPLATES = [
+    (30, "sshd[{pid}]: Failed password for invalid user {user} from {ip} port {port} ssh2"),
+    (20, "sshd[{pid}]: Failed password for {user} from {ip} port {port} ssh2"),
+    (10, "sshd[{pid}]: Accepted publickey for {user} from {ip} port {port} ssh2: ED25519 SHA256:{key}"),
+    (10, "sshd[{pid}]: pam_unix(sshd:session): session opened for user {user}(uid=1000) by (uid=0)"),
+    (8, "sshd[{pid}]: Received disconnect from {ip} port {port}:11: disconnected by user"),
+    (8, "CRON[{pid}]: pam_unix(cron:session): session opened for user root(uid=0) by (uid=0)"),
+    (8, "CRON[{pid}]: pam_unix(cron:session): session closed for user root"),
+    (3, "sudo: {user} : TTY=pts/0 ; PWD=/home/{user} ; USER=root ; COMMAND=/usr/bin/systemctl restart nginx"),
+    (2, "systemd-logind[{pid}]: New session {port} of user {user}."),
+    (1, "sshd[{pid}]: error: kex_exchange_identification: Connection closed by remote host"),
+]
+
+USERS = ('root', 'admin', 'deploy', 'ubuntu', 'git', 'oracle', 'test', 'postgres')
+
+
+def generate_corpus(lines: int, seed: int = 42) -> bytes:
+    """Corpus auth.log déterministe de « lines » lignes."""
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in AUTH_TEMPLATES]
+    templates = [template for _, template in AUTH_TEMPLATES]
+    output = []
+    seconds = 0
+    for _ in range(lines):
+        seconds += rng.randint(0, 3)
+        day, remainder = divmod(seconds, 86400)
+        month = MONTHS[(day // 28) % 12]
+        message = rng.choices(templates, weights)[0].format(
+            pid=rng.randint(300, 65000),
+            user=rng.choice(USERS),
+            ip=f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            port=rng.randint(1024, 65535),
+            key=''.join(rng.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdef0123456789', k=16)),
+        )
+        output.append(
+            f"{month} {day % 28 + 1:2d} {remainder // 3600:02d}:{remainder // 60 % 60:02d}:{remainder % 60:02d} "
+            f"web-01 {message}"
+        )
+    return ('\n'.join(output) + '\n').encode('utf-8')
+
+
+def measure(name: str, function, lines: int, repeat: int) -> float:
+    """Meilleur débit (lignes/s) sur « repeat » exécutions."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    rate = lines / best
+    print(f"{name:<28} {rate:>14,.0f} lignes/s   ({best * 1000:.1f} ms)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de mesure de l'analyseur de logs")
+    parser.add_argument('--corpus', help="Fichier de log à analyser (corpus généré par défaut)")
+    parser.add_argument('--lines', type=int, default=200000, help="Nombre de lignes du corpus généré")
+    parser.add_argument('--repeat', type=int, default=5, help="Nombre d'exécutions par mesure")
+    parser.add_argument('--write-corpus', help="Écrit le corpus généré dans ce fichier et quitte")
+    parser.add_argument('--min-rate', type=float, help="Débit minimal attendu de l'analyse auth ligne par ligne (lignes/s)")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, 'rb') as f:
+            corpus = f.read()
+    else:
+        corpus = generate_corpus(args.lines)
+
+    if args.write_corpus:
+        with open(args.write_corpus, 'wb') as f:
+            f.write(corpus)
+        print(f"Corpus écrit dans {args.write_corpus}")
+        return
+
+    text_lines = corpus.decode('utf-8', 'replace').splitlines()
+    line_count = len(text_lines)
+    print(f"Corpus : {line_count:,} lignes, {len(corpus) / 1e6:.1f} Mo, Python {sys.version.split()[0]}")
+
+    reference = datetime.now()
+
+    def syslog_lines():
+        log_parser = LogParser(reference)
+        for line in text_lines:
+            log_parser.parse_line(line)
+
+    def auth_lines():
+        log_parser = LogParser(reference)
+        for line in text_lines:
+            log_parser.parse_auth_line(line)
+
+    measure("syslog, ligne par ligne", syslog_lines, line_count, args.repeat)
+    auth_rate = measure("auth, ligne par ligne", auth_lines, line_count, args.repeat)
+
+    if args.min_rate and auth_rate < args.min_rate:
+        print(f"✗ Débit auth ligne par ligne inférieur au seuil ({auth_rate:,.0f} < {args.min_rate:,.0f} lignes/s)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
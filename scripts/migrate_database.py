@@ -25,6 +25,27 @@ load_dotenv()
 # Ajouter le répertoire parent au path
 sys.path.append(str(Path(__file__).parent.parent))
 
+# Index composites des listes paginées (alertes, requêtes, événements).
+# Créés avec CONCURRENTLY pour ne pas bloquer les écritures sur une base en service.
+LISTING_INDEXES = [
+    ("idx_alerts_status_severity_created", "alerts", "status, severity, created_at DESC, id DESC"),
+    ("idx_alerts_status_created", "alerts", "status, created_at DESC, id DESC"),
+    ("idx_alerts_severity_created", "alerts", "severity, created_at DESC, id DESC"),
+    ("idx_alerts_case_created", "alerts", "case_id, created_at DESC, id DESC"),
+    ("idx_alerts_created", "alerts", "created_at DESC, id DESC"),
+    ("idx_case_queries_case_created", "case_queries", "case_id, created_at DESC, id DESC"),
+    ("idx_queries_case_created", "queries", "case_id, created_at, id"),
+    ("idx_queries_status_created", "queries", "status, created_at, id"),
+    ("idx_queries_created", "queries", "created_at, id"),
+    ("idx_timeline_case_timestamp", "timeline_events", "case_id, timestamp, id"),
+    ("idx_timeline_type_timestamp", "timeline_events", "event_type, timestamp, id"),
+    ("idx_timeline_source_timestamp", "timeline_events", "source, timestamp, id"),
+    ("idx_timeline_timestamp", "timeline_events", "timestamp, id"),
+]
+
+# Index simples remplacés par les index composites
+OBSOLETE_INDEXES = ["idx_alerts_severity", "idx_alerts_status"]
+
 class DatabaseMigrator:
     """Gestionnaire de migration des bases de données"""
     
@@ -138,6 +159,35 @@ class DatabaseMigrator:
         
         logger.info(f"{len(alerts)} alertes migrées")
     
+    async def create_listing_indexes(self):
+        """Crée les index composites des listes paginées"""
+        logger.info("Création des index des listes paginées...")
+        
+        created = 0
+        async with self.postgres_pool.acquire() as conn:
+            for name, table, columns in LISTING_INDEXES:
+                exists = await conn.fetchval("SELECT to_regclass($1)", table)
+                if not exists:
+                    continue
+                # Un index invalide (création concurrente interrompue) est recréé
+                await conn.execute(f"""
+                    DO $$ BEGIN
+                        IF EXISTS (
+                            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                            WHERE c.relname = '{name}' AND NOT i.indisvalid
+                        ) THEN
+                            EXECUTE 'DROP INDEX {name}';
+                        END IF;
+                    END $$
+                """)
+                await conn.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+                created += 1
+            
+            for name in OBSOLETE_INDEXES:
+                await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        
+        logger.info(f"{created} index vérifiés ou créés")
+    
     async def migrate_processes(self):
         """Migre les données de processus"""
         logger.info("Migration des processus...")
@@ -270,6 +320,7 @@ async def main():
         # Migration des données
         await migrator.migrate_cases()
         await migrator.migrate_alerts()
+        await migrator.create_listing_indexes()
         await migrator.migrate_processes()
         await migrator.migrate_network_connections()
         await migrator.migrate_files()